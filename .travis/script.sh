@@ -4,3 +4,16 @@ python -c "import onnx"
 python -c "import onnx_tf"
 export PYTHONPATH=$PWD
 python test/lenet_caffe_test.py
+python test/caffemodel_reader_test.py
+python test/conversion_cache_test.py
+python test/aio_test.py
+python test/profiler_test.py
+python test/folding_test.py
+python test/shape_inference_test.py
+python test/graph_passes_test.py
+python test/pruning_test.py
+python test/jobs_test.py
+python test/snapshot_test.py
+python test/patch_test.py
+python test/initializer_inputs_test.py
+python test/inner_product_test.py
@@ -0,0 +1,78 @@
+""" Benchmark of the import time of the converter entry points.
+
+Every module is imported in a fresh interpreter several times and the
+median wall time is reported, together with the heavy dependencies the
+import pulled in. Exits with an error if the Caffe converter loads any of
+the modules it is expected to load lazily.
+
+Usage: python benchmark/import_time_benchmark.py [--repeat 5]
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import subprocess
+import sys
+
+MODULES = [
+    "onnx_hub.caffe.caffe2onnx",
+    "onnx_hub.tf.tf2onnx",
+    "onnx_hub.tf.onnx2tf",
+]
+
+HEAVY_MODULES = [
+    "tensorflow",
+    "onnx_tf",
+    "onnx.optimizer",
+    "onnx_hub.caffe.proto.caffe_pb2",
+]
+
+# Heavy modules each entry point must not import.
+LAZY_MODULES = {
+    "onnx_hub.caffe.caffe2onnx": ["tensorflow", "onnx_tf", "onnx.optimizer"],
+}
+
+CHILD = """
+import json, sys, time
+start = time.time()
+import {module}
+elapsed = time.time() - start
+print(json.dumps([elapsed, [m for m in {heavy!r} if m in sys.modules]]))
+"""
+
+
+def measure(module):
+  out = subprocess.check_output([
+      sys.executable, "-c",
+      CHILD.format(module=module, heavy=HEAVY_MODULES)
+  ])
+  return json.loads(out.decode().strip().splitlines()[-1])
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--repeat", type=int, default=5)
+  parser.add_argument("modules", nargs="*", default=MODULES)
+  args = parser.parse_args()
+
+  failed = False
+  print("{:<28} {:>12}  {}".format("module", "median (ms)", "heavy imports"))
+  for module in args.modules:
+    try:
+      runs = [measure(module) for _ in range(args.repeat)]
+    except subprocess.CalledProcessError:
+      print("{:<28} {:>12}".format(module, "failed"))
+      continue
+    times = sorted(run[0] for run in runs)
+    loaded = runs[-1][1]
+    print("{:<28} {:>12.1f}  {}".format(module, times[len(times) // 2] * 1000,
+                                         ", ".join(loaded) or "-"))
+    unexpected = set(loaded) & set(LAZY_MODULES.get(module, []))
+    if unexpected:
+      print("  unexpected imports: {}".format(", ".join(sorted(unexpected))))
+      failed = True
+  sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,169 @@
+""" Benchmark of declaring initializers as graph inputs.
+
+Converts the same Caffe model with its weights declared both as graph
+inputs and initializers (initializers_as_inputs=True, the default) and
+as initializers only, then compares the time a backend takes to prepare
+each model and to run it. Models are the LeNet test model, if its files
+are present, and a synthetic VGG-style net.
+
+Usage: python benchmark/initializer_inputs_benchmark.py
+  [--backend onnx_tf|onnxruntime] [--repeat 5] [--runs 20]
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import time
+
+import numpy as np
+from google.protobuf import text_format
+
+from onnx_hub.caffe import caffe_helper
+from onnx_hub.caffe.caffemodel_reader import CaffeModelReader
+from onnx_hub.caffe.proto import caffe_pb2
+
+LENET_DIR = "onnx_hub/external/models/caffe/lenet"
+LENET_WEIGHTS = os.path.join(LENET_DIR, "lenet_iter_10000.caffemodel")
+LENET_MODEL = os.path.join(LENET_DIR, "lenet_workaround.prototxt")
+
+CONV = """
+layer {{ name: "conv{i}" type: "Convolution" bottom: "{bottom}" top: "conv{i}"
+  convolution_param {{ num_output: {channels} kernel_size: 3 pad: 1 }} }}
+layer {{ name: "relu{i}" type: "ReLU" bottom: "conv{i}" top: "relu{i}" }}
+"""
+POOL = """
+layer {{ name: "pool{i}" type: "Pooling" bottom: "{bottom}" top: "pool{i}"
+  pooling_param {{ pool: MAX kernel_size: 2 stride: 2 }} }}
+"""
+FC = """
+layer {{ name: "fc{i}" type: "InnerProduct" bottom: "{bottom}" top: "fc{i}"
+  inner_product_param {{ num_output: {num_output} }} }}
+"""
+
+
+def make_synthetic_net(blocks=4, channels=64, size=64, hidden=1024):
+  lines = [
+      'layer { name: "data" type: "Input" top: "data" input_param { '
+      'shape: { dim: 1 dim: 3 dim: %d dim: %d } } }' % (size, size)
+  ]
+  bottom = "data"
+  for i in range(blocks):
+    lines.append(CONV.format(i=i, bottom=bottom, channels=channels))
+    lines.append(POOL.format(i=i, bottom="relu{}".format(i)))
+    bottom = "pool{}".format(i)
+  lines.append('layer { name: "flat" type: "Reshape" bottom: "%s" '
+               'top: "flat" reshape_param { shape { dim: 0 dim: -1 } } }' %
+               bottom)
+  lines.append(FC.format(i=0, bottom="flat", num_output=hidden))
+  lines.append(FC.format(i=1, bottom="fc0", num_output=10))
+  lines.append('layer { name: "prob" type: "Softmax" bottom: "fc1" '
+               'top: "prob" }')
+  model = caffe_pb2.NetParameter()
+  text_format.Merge("\n".join(lines), model)
+
+  weights = caffe_pb2.NetParameter()
+  weights.CopyFrom(model)
+  rng = np.random.RandomState(0)
+  in_channels = 3
+  spatial = size
+  for layer in weights.layer:
+    if layer.type == "Convolution":
+      shapes = [(channels, in_channels, 3, 3), (channels,)]
+      in_channels = channels
+    elif layer.type == "Pooling":
+      spatial //= 2
+      continue
+    elif layer.type == "InnerProduct":
+      num_output = layer.inner_product_param.num_output
+      shapes = [(num_output, in_channels * spatial * spatial), (num_output,)]
+      in_channels, spatial = num_output, 1
+    else:
+      continue
+    for shape in shapes:
+      blob = layer.blobs.add()
+      blob.shape.dim.extend(shape)
+      blob.data.extend(
+          (rng.rand(int(np.prod(shape))).astype("f4") - 0.5) * 0.1)
+  return weights, model, [1, 3, size, size]
+
+
+def load_lenet():
+  if not os.path.exists(LENET_WEIGHTS):
+    return None
+  model = caffe_pb2.NetParameter()
+  with open(LENET_MODEL) as f:
+    text_format.Merge(f.read(), model)
+  return CaffeModelReader(LENET_WEIGHTS), model, [1, 1, 28, 28]
+
+
+def convert(weights, model, initializers_as_inputs):
+  return caffe_helper.caffe_model_to_onnx_model(
+      weights, model, "prob", initializers_as_inputs=initializers_as_inputs)
+
+
+def onnx_tf_backend(onnx_model):
+  from onnx_tf.backend import prepare
+  tf_rep = prepare(onnx_model)
+  return lambda x: tf_rep.run(x)
+
+
+def onnxruntime_backend(onnx_model):
+  import onnxruntime
+  onnxruntime.set_default_logger_severity(3)
+  session = onnxruntime.InferenceSession(onnx_model.SerializeToString())
+  input_name = session.get_inputs()[0].name
+  return lambda x: session.run(None, {input_name: x})
+
+
+BACKENDS = {
+    "onnx_tf": onnx_tf_backend,
+    "onnxruntime": onnxruntime_backend,
+}
+
+
+def median_time(func, repeat):
+  times = []
+  result = None
+  for _ in range(repeat):
+    start = time.time()
+    result = func()
+    times.append(time.time() - start)
+  return sorted(times)[len(times) // 2], result
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--backend", choices=sorted(BACKENDS),
+                      default="onnx_tf")
+  parser.add_argument("--repeat", type=int, default=5,
+                      help="Number of times each model is prepared.")
+  parser.add_argument("--runs", type=int, default=20,
+                      help="Number of inferences timed per model.")
+  args = parser.parse_args()
+  backend = BACKENDS[args.backend]
+
+  models = []
+  lenet = load_lenet()
+  if lenet is None:
+    print("Skipping LeNet, {} not found.".format(LENET_WEIGHTS))
+  else:
+    models.append(("lenet",) + lenet)
+  models.append(("synthetic",) + make_synthetic_net())
+
+  print("{:<10} {:<22} {:>8} {:>14} {:>12}".format(
+      "model", "initializers", "inputs", "prepare (ms)", "run (ms)"))
+  for name, weights, model, input_shape in models:
+    x = np.random.RandomState(0).rand(*input_shape).astype("f4")
+    for initializers_as_inputs in [True, False]:
+      onnx_model = convert(weights, model, initializers_as_inputs)
+      prepare_time, run = median_time(lambda: backend(onnx_model),
+                                      args.repeat)
+      run(x)
+      run_time, _ = median_time(lambda: run(x), args.runs)
+      print("{:<10} {:<22} {:>8} {:>14.2f} {:>12.3f}".format(
+          name, "as inputs" if initializers_as_inputs else "initializers only",
+          len(onnx_model.graph.input), prepare_time * 1000, run_time * 1000))
+
+
+if __name__ == "__main__":
+  main()
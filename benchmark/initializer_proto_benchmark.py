@@ -0,0 +1,97 @@
+""" Benchmark of IRGraph.initializer_proto.
+
+Compares building initializers through make_tensor with python lists of
+values (the former implementation) against raw_data serialization on a
+synthetic weight set. Each method runs in its own process so peak RSS is
+measured independently.
+
+Usage: python benchmark/initializer_proto_benchmark.py [--size-mb 1024]
+"""
+from __future__ import print_function
+
+import argparse
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+LAYER_MB = 64
+
+
+def make_consts(size_mb):
+  consts = {}
+  rng = np.random.RandomState(0)
+  remaining = size_mb
+  idx = 0
+  while remaining > 0:
+    mb = min(LAYER_MB, remaining)
+    consts["layer{}_0".format(idx)] = rng.rand(mb * 1024 * 256).astype("f4")
+    remaining -= mb
+    idx += 1
+  return consts
+
+
+def make_tensor_protos(consts):
+  from onnx.helper import make_tensor
+  from onnx.helper import mapping
+  return [
+      make_tensor(
+          name=name,
+          data_type=mapping.NP_TYPE_TO_TENSOR_TYPE[value.dtype],
+          dims=np.shape(value),
+          vals=value.flatten()) for name, value in consts.items()
+  ]
+
+
+def raw_data_protos(consts):
+  from onnx_hub.caffe.ir_wrapper import IRGraph
+  ir_graph = IRGraph()
+  for name, value in consts.items():
+    ir_graph.add_const(name, value)
+  return ir_graph.initializer_proto
+
+
+METHODS = {
+    "make_tensor": make_tensor_protos,
+    "raw_data": raw_data_protos,
+}
+
+
+def run_child(method, size_mb):
+  consts = make_consts(size_mb)
+  before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  start = time.time()
+  protos = METHODS[method](consts)
+  elapsed = time.time() - start
+  peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  nbytes = sum(len(p.SerializeToString()) for p in protos)
+  # ru_maxrss is in KB on Linux.
+  print("{} {:.3f} {:.1f} {}".format(method, elapsed, (peak - before) / 1024.,
+                                     nbytes))
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--size-mb", type=int, default=1024)
+  parser.add_argument("--method", choices=sorted(METHODS))
+  args = parser.parse_args()
+
+  if args.method:
+    run_child(args.method, args.size_mb)
+    return
+
+  print("Synthetic weights: {} MB".format(args.size_mb))
+  print("{:<12} {:>10} {:>16} {:>14}".format("method", "time (s)",
+                                             "extra RSS (MB)", "proto bytes"))
+  for method in sorted(METHODS):
+    out = subprocess.check_output([
+        sys.executable, __file__, "--method", method, "--size-mb",
+        str(args.size_mb)
+    ]).decode().strip().splitlines()[-1].split()
+    print("{:<12} {:>10} {:>16} {:>14}".format(*out))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,95 @@
+""" Benchmark of prototxt parsing.
+
+Compares text_format.Merge against onnx_hub.caffe.prototxt.parse_prototxt
+hitting its in-memory cache and its on-disk ConversionCache, on a
+synthetic ResNet-style deploy prototxt.
+
+Usage: python benchmark/prototxt_parse_benchmark.py [--blocks 500]
+"""
+from __future__ import print_function
+
+import argparse
+import shutil
+import tempfile
+import time
+
+from google.protobuf import text_format
+
+from onnx_hub.cache import ConversionCache
+from onnx_hub.caffe import prototxt
+from onnx_hub.caffe.proto import caffe_pb2
+
+BLOCK = """
+layer {{ name: "conv{i}" type: "Convolution" bottom: "{bottom}" top: "conv{i}"
+  convolution_param {{ num_output: 256 kernel_size: 3 pad: 1 stride: 1
+    bias_term: false }} }}
+layer {{ name: "bn{i}" type: "BatchNorm" bottom: "conv{i}" top: "conv{i}"
+  batch_norm_param {{ use_global_stats: true }} }}
+layer {{ name: "scale{i}" type: "Scale" bottom: "conv{i}" top: "conv{i}"
+  scale_param {{ bias_term: true }} }}
+layer {{ name: "sum{i}" type: "Eltwise" bottom: "{bottom}" bottom: "conv{i}"
+  top: "sum{i}" }}
+layer {{ name: "relu{i}" type: "ReLU" bottom: "sum{i}" top: "sum{i}" }}
+"""
+
+
+def make_prototxt(blocks):
+  lines = [
+      'name: "resnet"',
+      'layer { name: "data" type: "Input" top: "data" input_param { '
+      'shape: { dim: 1 dim: 256 dim: 56 dim: 56 } } }'
+  ]
+  bottom = "data"
+  for i in range(blocks):
+    lines.append(BLOCK.format(i=i, bottom=bottom))
+    bottom = "sum{}".format(i)
+  return "\n".join(lines).encode("utf-8")
+
+
+def timeit(func, repeat):
+  times = []
+  for _ in range(repeat):
+    start = time.time()
+    func()
+    times.append(time.time() - start)
+  return sorted(times)[len(times) // 2]
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--blocks", type=int, default=500)
+  parser.add_argument("--repeat", type=int, default=5)
+  args = parser.parse_args()
+
+  data = make_prototxt(args.blocks)
+  print("prototxt: {} layers, {:.1f} KiB".format(args.blocks * 5 + 1,
+                                                 len(data) / 1024.))
+
+  def text_format_merge():
+    text_format.Merge(data.decode("utf-8"), caffe_pb2.NetParameter())
+
+  cache_dir = tempfile.mkdtemp()
+  try:
+    cache = ConversionCache(cache_dir)
+    prototxt.parse_prototxt(data, cache)
+
+    def disk_cache_hit():
+      prototxt.clear_memory_cache()
+      prototxt.parse_prototxt(data, cache)
+
+    results = [
+        ("text_format.Merge", timeit(text_format_merge, args.repeat)),
+        ("memory cache hit",
+         timeit(lambda: prototxt.parse_prototxt(data), args.repeat)),
+        ("disk cache hit", timeit(disk_cache_hit, args.repeat)),
+    ]
+  finally:
+    shutil.rmtree(cache_dir)
+
+  for name, seconds in results:
+    print("{:<20} {:>10.2f} ms  {:>8.1f}x".format(name, seconds * 1000,
+                                                  results[0][1] / seconds))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,5 @@
+import sys
+
+from onnx_hub.cli import main
+
+sys.exit(main())
@@ -0,0 +1,158 @@
+""" asyncio counterparts of the converter entry points. Python 3 only.
+
+Conversions run in an executor, so they do not block the event loop:
+
+  converter = AsyncConverter(ProcessPoolExecutor(4), max_in_flight=8)
+  onnx_model = await converter.caffe2onnx(weights_bytes, prototxt_file)
+
+Inputs can be paths, bytes-like objects or binary file-like objects. The
+module level coroutines use a shared converter backed by a thread pool.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+_default_converter = None
+
+# get_event_loop is deprecated in coroutines, but get_running_loop is only
+# there from Python 3.7 on.
+_get_running_loop = getattr(asyncio, "get_running_loop",
+                            asyncio.get_event_loop)
+
+
+class AsyncConverter(object):
+  """ Runs conversions in an executor on behalf of an event loop.
+
+  Cancelling a conversion that has not started yet drops it. A conversion
+  already running in the executor can not be interrupted: it runs to
+  completion and its result is discarded, but it no longer counts towards
+  max_in_flight.
+  """
+
+  def __init__(self, executor=None, max_in_flight=None):
+    """
+    :param executor: concurrent.futures Executor to convert in. A
+      ProcessPoolExecutor converts in parallel, and a ThreadPoolExecutor
+      avoids pickling the inputs and outputs. Default is a thread pool.
+    :param max_in_flight: Maximum number of conversions submitted to the
+      executor at a time. Further calls wait for a free slot. Default is
+      unlimited.
+    """
+    self.executor = executor or ThreadPoolExecutor()
+    self.max_in_flight = max_in_flight
+    # Made in the loop the conversions run in, c.f. _get_semaphore.
+    self._semaphore = None
+    self._semaphore_loop = None
+    self._in_flight = 0
+
+  @property
+  def in_flight(self):
+    """ Number of conversions submitted and not finished. """
+    return self._in_flight
+
+  async def caffe2onnx(self, weights, model, **kwargs):
+    """ Async caffe2onnx.load.
+
+    :param weights: The caffemodel, as a path, bytes or file-like object.
+    :param model: The prototxt, as a path, bytes or file-like object.
+    :param kwargs: Other args of caffe2onnx.load.
+    :return: ONNX Model Proto object.
+    """
+    weights = await self._read(weights)
+    model = await self._read(model)
+    return await self._run(_caffe2onnx, weights, model, kwargs)
+
+  async def tf2onnx(self, graph_def, **kwargs):
+    """ Async tf2onnx.load.
+
+    :param graph_def: The frozen GraphDef, as a path, bytes or file-like
+      object.
+    :param kwargs: Other args of tf2onnx.load.
+    :return: ONNX Model Proto object.
+    """
+    graph_def = await self._read(graph_def)
+    return await self._run(_tf2onnx, graph_def, kwargs)
+
+  async def onnx2tf(self, onnx_model, output_path):
+    """ Async onnx2tf.load.
+
+    :param onnx_model: The ONNX model, as a path, bytes or file-like
+      object.
+    :param output_path: Path to export the TensorFlow graph to.
+    """
+    onnx_model = await self._read(onnx_model)
+    return await self._run(_onnx2tf, onnx_model, output_path)
+
+  def shutdown(self, wait=True):
+    self.executor.shutdown(wait=wait)
+
+  async def _read(self, source):
+    # File-like objects are read in a thread, so they neither block the
+    # loop nor need to be pickled for a process pool.
+    if hasattr(source, "read"):
+      loop = _get_running_loop()
+      return await loop.run_in_executor(None, source.read)
+    return source
+
+  async def _run(self, func, *args):
+    if not self.max_in_flight:
+      return await self._submit(func, *args)
+    async with self._get_semaphore():
+      return await self._submit(func, *args)
+
+  def _get_semaphore(self):
+    # Before Python 3.10, a semaphore is bound to the default loop when it
+    # is made, so it can not be made in __init__, which may run outside
+    # asyncio.run. A new one is made for each loop the converter runs in.
+    loop = _get_running_loop()
+    if self._semaphore_loop is not loop:
+      self._semaphore = asyncio.Semaphore(self.max_in_flight)
+      self._semaphore_loop = loop
+    return self._semaphore
+
+  async def _submit(self, func, *args):
+    loop = _get_running_loop()
+    self._in_flight += 1
+    try:
+      # Cancelling the awaiting task cancels the executor future, which
+      # drops it if it has not started.
+      return await loop.run_in_executor(self.executor, func, *args)
+    finally:
+      self._in_flight -= 1
+
+
+def get_default_converter():
+  global _default_converter
+  if _default_converter is None:
+    _default_converter = AsyncConverter()
+  return _default_converter
+
+
+async def caffe2onnx(weights, model, **kwargs):
+  return await get_default_converter().caffe2onnx(weights, model, **kwargs)
+
+
+async def tf2onnx(graph_def, **kwargs):
+  return await get_default_converter().tf2onnx(graph_def, **kwargs)
+
+
+async def onnx2tf(onnx_model, output_path):
+  return await get_default_converter().onnx2tf(onnx_model, output_path)
+
+
+# Executor entry points. They are module level so process pools can pickle
+# them, and import the converters lazily so workers only load what they use.
+
+
+def _caffe2onnx(weights, model, kwargs):
+  from onnx_hub.caffe import caffe2onnx
+  return caffe2onnx.load(weights, model, **kwargs)
+
+
+def _tf2onnx(graph_def, kwargs):
+  from onnx_hub.tf import tf2onnx
+  return tf2onnx.load(graph_def, **kwargs)
+
+
+def _onnx2tf(onnx_model, output_path):
+  from onnx_hub.tf import onnx2tf
+  return onnx2tf.load(onnx_model, output_path)
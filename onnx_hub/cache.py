@@ -0,0 +1,144 @@
+import errno
+import hashlib
+import json
+import os
+import tempfile
+
+import onnx
+
+from onnx_hub.inputs import is_path
+
+# Bump to invalidate entries written by older converters.
+CACHE_FORMAT_VERSION = 1
+
+# File suffix of entries holding ONNX models, the default.
+MODEL_SUFFIX = ".onnx"
+_TMP_SUFFIX = ".tmp"
+_CHUNK_SIZE = 1 << 20
+
+
+class ConversionCache(object):
+  """ Content-addressed on-disk cache of serialized conversion outputs.
+  Entries are keyed by a hash of the input files' contents and the
+  conversion options, so renamed or touched inputs still hit the cache.
+  The total size is capped at `max_size` bytes by evicting the least
+  recently used entries.
+
+  Several processes can share one cache directory. Entries are written to
+  a temporary file and renamed into place, so readers never see partial
+  entries, and entries removed by another process are treated as misses.
+  """
+
+  def __init__(self, cache_dir, max_size=1 << 30):
+    self.cache_dir = cache_dir
+    self.max_size = max_size
+    try:
+      os.makedirs(cache_dir)
+    except OSError as e:
+      if e.errno != errno.EEXIST:
+        raise
+
+  def key(self, inputs, **options):
+    """ Make the key of a conversion.
+
+    :param inputs: List of inputs, as paths of files or bytes-like objects
+      with their contents, e.g. InputBuffer.buffer.
+    :param options: Conversion options, e.g. converter name and opset.
+      Values must be JSON serializable.
+    :return: Hex digest.
+    """
+    h = hashlib.sha256()
+    h.update(
+        json.dumps([CACHE_FORMAT_VERSION, onnx.__version__, options],
+                   sort_keys=True).encode("utf-8"))
+    for data in inputs:
+      if is_path(data):
+        with open(data, "rb") as f:
+          for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            h.update(chunk)
+      else:
+        h.update(data)
+      # Separate inputs so moving bytes between files changes the key.
+      h.update(b"\0")
+    return h.hexdigest()
+
+  def get(self, key, suffix=MODEL_SUFFIX):
+    """ Get a cached entry and mark it as recently used.
+
+    :param key: Key made by ConversionCache.key.
+    :param suffix: File suffix telling what the entry holds, as given to
+      put.
+    :return: Bytes or None.
+    """
+    path = self._path(key, suffix)
+    try:
+      with open(path, "rb") as f:
+        data = f.read()
+      os.utime(path, None)
+    except (IOError, OSError):
+      return None
+    return data
+
+  def put(self, key, data, suffix=MODEL_SUFFIX):
+    """ Store an entry, evicting old entries if the cache is full.
+
+    :param key: Key made by ConversionCache.key.
+    :param data: Bytes to store.
+    :param suffix: File suffix telling what the entry holds, e.g.
+      `.netparam` for parsed Caffe topologies. Defaults to ONNX models.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=_TMP_SUFFIX)
+    try:
+      with os.fdopen(fd, "wb") as f:
+        f.write(data)
+      os.rename(tmp_path, self._path(key, suffix))
+    except BaseException:
+      _remove(tmp_path)
+      raise
+    self.evict()
+
+  def get_model(self, key):
+    data = self.get(key)
+    if data is None:
+      return None
+    return onnx.load_model_from_string(data)
+
+  def put_model(self, key, model):
+    self.put(key, model.SerializeToString())
+
+  def evict(self):
+    """ Remove least recently used entries until the cache fits max_size.
+    """
+    entries = []
+    for name in os.listdir(self.cache_dir):
+      # Temporary files are entries still being written.
+      if name.endswith(_TMP_SUFFIX):
+        continue
+      path = os.path.join(self.cache_dir, name)
+      try:
+        st = os.stat(path)
+      except OSError:
+        continue
+      entries.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+      if total <= self.max_size:
+        break
+      _remove(path)
+      total -= size
+
+  def clear(self):
+    for name in os.listdir(self.cache_dir):
+      if not name.endswith(_TMP_SUFFIX):
+        _remove(os.path.join(self.cache_dir, name))
+
+  def _path(self, key, suffix=MODEL_SUFFIX):
+    return os.path.join(self.cache_dir, key + suffix)
+
+
+def _remove(path):
+  try:
+    os.remove(path)
+  except OSError:
+    pass
@@ -0,0 +1,135 @@
+import numpy as np
+
+from onnx_hub.caffe.wire_format import WIRETYPE_FIXED32
+from onnx_hub.caffe.wire_format import WIRETYPE_FIXED64
+from onnx_hub.caffe.wire_format import WIRETYPE_LENGTH_DELIMITED
+from onnx_hub.caffe.wire_format import WIRETYPE_VARINT
+from onnx_hub.caffe.wire_format import decode_varint
+from onnx_hub.caffe.wire_format import iter_fields
+
+# BlobProto field numbers, c.f. caffe.proto.
+_BLOB_LEGACY_DIMS = (1, 2, 3, 4)  # num, channels, height, width
+_BLOB_DATA = 5
+_BLOB_SHAPE = 7
+_BLOB_DOUBLE_DATA = 8
+# BlobShape.dim
+_SHAPE_DIM = 1
+
+_FLOAT = np.dtype("<f4")
+_DOUBLE = np.dtype("<f8")
+
+
+def blob_to_array(blob):
+  """ Get the values of a blob as a float32 numpy array of its shape.
+
+  :param blob: BlobProto object, or a numpy array already decoded by
+    decode_blob which is returned as is.
+  :return: numpy array.
+  """
+  if isinstance(blob, np.ndarray):
+    return blob
+  # A parsed blob is read from its fields, as serializing it for
+  # decode_blob would copy it once more.
+  if blob.data:
+    data = np.array(blob.data, dtype=_FLOAT)
+  elif blob.double_data:
+    data = np.array(blob.double_data, dtype=_DOUBLE).astype(_FLOAT)
+  else:
+    data = np.zeros([0], dtype=_FLOAT)
+  if blob.HasField("shape"):
+    return data.reshape(list(blob.shape.dim))
+  legacy_dims = ["num", "channels", "height", "width"]
+  if any(blob.HasField(dim) for dim in legacy_dims):
+    return data.reshape([getattr(blob, dim) for dim in legacy_dims])
+  return data
+
+
+def decode_blob(buf, start=0, end=None):
+  """ Decode a serialized BlobProto into a float32 numpy array.
+  Packed `data` is wrapped with np.frombuffer without copying, so the
+  result is read-only and keeps buf alive. `double_data` is converted to
+  float32, and unpacked encodings are gathered from their elements.
+
+  :param buf: Buffer holding the serialized blob, e.g. bytes or mmap.
+  :param start: Offset of the blob in buf.
+  :param end: Offset right after the blob. Default is the end of buf.
+  :return: numpy array shaped like the blob.
+  """
+  end = len(buf) if end is None else end
+  shape = None
+  legacy_dims = {}
+  float_spans = []
+  float_elems = []
+  double_spans = []
+  double_elems = []
+  for field_number, wire_type, value_start, value_end in iter_fields(
+      buf, start, end):
+    if field_number == _BLOB_DATA:
+      if wire_type == WIRETYPE_LENGTH_DELIMITED:
+        float_spans.append((value_start, value_end))
+      elif wire_type == WIRETYPE_FIXED32:
+        float_elems.append(value_start)
+    elif field_number == _BLOB_DOUBLE_DATA:
+      if wire_type == WIRETYPE_LENGTH_DELIMITED:
+        double_spans.append((value_start, value_end))
+      elif wire_type == WIRETYPE_FIXED64:
+        double_elems.append(value_start)
+    elif field_number == _BLOB_SHAPE:
+      shape = _decode_shape(buf, value_start, value_end)
+    elif field_number in _BLOB_LEGACY_DIMS and wire_type == WIRETYPE_VARINT:
+      legacy_dims[field_number] = decode_varint(buf, value_start)[0]
+
+  if float_spans or float_elems:
+    data = _gather(buf, _FLOAT, float_spans, float_elems)
+  elif double_spans or double_elems:
+    data = _gather(buf, _DOUBLE, double_spans, double_elems).astype(_FLOAT)
+  else:
+    data = np.zeros([0], dtype=_FLOAT)
+
+  if shape is None and legacy_dims:
+    shape = [legacy_dims.get(i, 0) for i in _BLOB_LEGACY_DIMS]
+  if shape is None:
+    return data
+  return data.reshape(shape)
+
+
+def _decode_shape(buf, start, end):
+  dims = []
+  for field_number, wire_type, value_start, value_end in iter_fields(
+      buf, start, end):
+    if field_number != _SHAPE_DIM:
+      continue
+    if wire_type == WIRETYPE_LENGTH_DELIMITED:
+      pos = value_start
+      while pos < value_end:
+        dim, pos = decode_varint(buf, pos)
+        dims.append(dim)
+    else:
+      dims.append(decode_varint(buf, value_start)[0])
+  return dims
+
+
+def _gather(buf, dtype, spans, elems):
+  arrays = [
+      np.frombuffer(buf, dtype=dtype, count=(e - s) // dtype.itemsize,
+                    offset=s) for s, e in spans
+  ]
+  if elems:
+    arrays.append(_gather_unpacked(buf, dtype, elems))
+  if len(arrays) == 1:
+    return arrays[0]
+  return np.concatenate(arrays)
+
+
+def _gather_unpacked(buf, dtype, offsets):
+  # Unpacked elements are each preceded by their tag. When they are
+  # contiguous they sit at a fixed stride and can still be viewed in place.
+  if len(offsets) > 1:
+    stride = offsets[1] - offsets[0]
+    if all(b - a == stride for a, b in zip(offsets, offsets[1:])):
+      return np.ndarray(
+          shape=(len(offsets),), dtype=dtype, buffer=buf,
+          offset=offsets[0], strides=(stride,))
+  return np.array([
+      np.frombuffer(buf, dtype=dtype, count=1, offset=o)[0] for o in offsets
+  ], dtype=dtype)
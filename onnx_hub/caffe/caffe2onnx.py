@@ -1,17 +1,168 @@
-from onnx_hub.caffe.proto import caffe_pb2
-from google.protobuf import text_format
+import os
+import tempfile
+
 import onnx
+from onnx import TensorProto
+from onnx import defs
+
+from onnx_hub.caffe import caffe_helper
+from onnx_hub.caffe.caffemodel_reader import CaffeModelReader
+from onnx_hub.caffe.external_data import ExternalDataPatcher
+from onnx_hub.caffe.prototxt import parse_prototxt
+from onnx_hub.inputs import InputBuffer
+from onnx_hub.profiler import get_profiler
+
+def load(weights_path, model_path, external_data=None, memory_budget=None,
+         cache=None, dynamic_batch=False, initializers_as_inputs=True,
+         opt_level=0, output=None, profiler=None):
+    """Converts a caffemodel and its prototxt to an ONNX model.
+
+    :param weights_path: The caffemodel, as a path, bytes-like object or
+      binary file-like object, c.f. onnx_hub.inputs.
+    :param model_path: The prototxt, as a path, bytes-like object or
+      binary file-like object.
+    :param external_data: Optional ExternalDataWriter to store initializers
+      in external data files, c.f. caffe_helper.caffe_model_to_onnx_model.
+    :param memory_budget: Optional number of bytes of weights to hold in
+      memory before streaming them to external_data.
+    :param cache: Optional ConversionCache. The result is looked up by the
+      contents of both inputs and stored after conversion, except with
+      external_data. The parsed prototxt is cached in any case, c.f.
+      onnx_hub.caffe.prototxt.
+    :param dynamic_batch: Declare the batch dim of inputs and of the
+      tensors computed from them as dynamic, c.f.
+      onnx_hub.caffe.shape_inference.
+    :param initializers_as_inputs: Also declare initializers as graph
+      inputs. Set to False to let backends treat weights as constants.
+    :param opt_level: Optimization level from 0 to 3 of the graph passes,
+      c.f. onnx_hub.caffe.passes.pass_manager.
+    :param output: Optional list of the names of the blobs to output. By
+      default the blobs no layer reads are, c.f.
+      onnx_hub.caffe.pruning.detect_outputs. Layers none of them depends
+      on are not converted.
+    :param profiler: Optional Profiler to time the conversion phases with,
+      c.f. onnx_hub.profiler.
 
-import onnx_hub.caffe.handler
-import caffe_helper
+    :returns: ONNX Model Proto object.
+    """
+    profiler = get_profiler(profiler)
+    # The caffemodel is memory-mapped or viewed in place, and its blobs are
+    # decoded layer by layer while the graph is built.
+    with CaffeModelReader(weights_path) as weights, \
+            InputBuffer(model_path) as prototxt:
+        cache_key = None
+        if cache is not None and external_data is None:
+            with profiler.phase("cache_lookup"):
+                cache_key = cache.key(
+                        [weights.buffer, prototxt.buffer],
+                        converter="caffe2onnx",
+                        output=output,
+                        opset=defs.onnx_opset_version(),
+                        dynamic_batch=dynamic_batch,
+                        initializers_as_inputs=initializers_as_inputs,
+                        opt_level=opt_level)
+                onnx_model = cache.get_model(cache_key)
+            if onnx_model is not None:
+                return onnx_model
 
-def load(weights_path, model_path):
-    weights = caffe_pb2.NetParameter()
-    weights.ParseFromString(open(weights_path, "rb").read())
+        with profiler.phase("parse_prototxt"):
+            model = parse_prototxt(prototxt.buffer, cache)
 
-    model = caffe_pb2.NetParameter()
-    text_format.Merge(open(model_path).read(), model)
-    onnx_model = caffe_helper.caffe_model_to_onnx_model(
-            weights, model, 'prob')
+        onnx_model = caffe_helper.caffe_model_to_onnx_model(
+                weights, model, output, external_data=external_data,
+                memory_budget=memory_budget, dynamic_batch=dynamic_batch,
+                initializers_as_inputs=initializers_as_inputs,
+                opt_level=opt_level, profiler=profiler)
 
+    if cache_key is not None:
+        with profiler.phase("cache_store"):
+            cache.put_model(cache_key, onnx_model)
     return onnx_model
+
+def load_snapshots(weights_paths, model_path, output=None, profiler=None):
+    """Converts caffemodels sharing one prototxt, e.g. training snapshots.
+    Handlers only run for the first caffemodel; the others just have their
+    weights decoded, c.f. caffe_helper.SnapshotConverter.
+
+    :param weights_paths: Iterable of caffemodels, as paths, bytes-like
+      objects or binary file-like objects.
+    :param model_path: The prototxt, as a path, bytes-like object or
+      binary file-like object.
+    :param output: Optional list of the names of the blobs to output,
+      c.f. load.
+    :param profiler: Optional Profiler to time the conversion phases with,
+      c.f. onnx_hub.profiler.
+
+    :returns: Generator of ONNX Model Proto objects, in the order of
+      weights_paths.
+    """
+    with InputBuffer(model_path) as prototxt:
+        model = parse_prototxt(prototxt.buffer)
+    converter = caffe_helper.SnapshotConverter(model, output)
+    for weights_path in weights_paths:
+        with CaffeModelReader(weights_path) as weights:
+            onnx_model = converter.convert(weights, profiler=profiler)
+        yield onnx_model
+
+
+def patch(onnx_path, weights_path, model_path, output_path=None,
+          external_data=None, profiler=None):
+    """Loads the weights of a caffemodel into a model converted before
+    from the same prototxt, without converting it again. The initializers
+    of the model must match the weights in type and shape, so models
+    converted with an opt_level or optimizer passes are rejected with
+    ValueError, c.f. SnapshotConverter.from_onnx_model.
+
+    :param onnx_path: Path of the converted ONNX model.
+    :param weights_path: The caffemodel, as a path, bytes-like object or
+      binary file-like object.
+    :param model_path: The prototxt, as a path, bytes-like object or
+      binary file-like object.
+    :param output_path: Path to save the patched model to. By default the
+      model is patched in place: external data is overwritten in its
+      files, and the model file itself is only rewritten if it embeds
+      initializers.
+    :param external_data: Optional ExternalDataWriter for the new weights
+      when saving to output_path. It must write to the directory of
+      output_path.
+    :param profiler: Optional Profiler to time the conversion phases with,
+      c.f. onnx_hub.profiler.
+
+    :returns: The patched ONNX Model Proto object, without its external
+      data loaded.
+    """
+    onnx_model = onnx.load(onnx_path, load_external_data=False)
+    with InputBuffer(model_path) as prototxt:
+        model = parse_prototxt(prototxt.buffer)
+    converter = caffe_helper.SnapshotConverter.from_onnx_model(
+            onnx_model, model)
+
+    in_place = output_path is None
+    if in_place:
+        external_data = ExternalDataPatcher(
+                os.path.dirname(os.path.abspath(onnx_path)),
+                onnx_model.graph.initializer)
+    try:
+        with CaffeModelReader(weights_path) as weights:
+            patched_model = converter.convert(
+                    weights, external_data=external_data, profiler=profiler)
+    finally:
+        if in_place:
+            external_data.close()
+
+    if in_place:
+        if all(tensor.data_location == TensorProto.EXTERNAL
+               for tensor in patched_model.graph.initializer):
+            return patched_model
+        output_path = onnx_path
+    # Saved to a temporary file first, so the model is never truncated.
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    fd, tmp_path = tempfile.mkstemp(dir=output_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(patched_model.SerializeToString())
+        os.rename(tmp_path, output_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return patched_model
@@ -1,12 +1,41 @@
+import collections
+import itertools
+import logging
+import numbers
+import warnings
+
+import onnx
+from onnx import ModelProto
+from onnx import checker
 from onnx import defs
+from onnx import numpy_helper
 from onnx.helper import make_model
+from onnx.helper import make_node
 from onnx.helper import make_opsetid
-from onnx.optimizer import optimize
+from onnx.helper import mapping
 
-from onnx_tf.common import exception
+from onnx_hub.caffe import folding
+from onnx_hub.caffe import pruning
+from onnx_hub.caffe import shape_inference
+from onnx_hub.caffe.caffemodel_reader import CaffeModelLayer
+from onnx_hub.caffe.caffemodel_reader import CaffeModelReader
+from onnx_hub.caffe.conversion_context import ConversionContext
 from onnx_hub.caffe.handler.caffe2onnx_handler import Caffe2OnnxHandler
 from onnx_hub.caffe.ir_wrapper import IRGraph
+from onnx_hub.caffe.ir_wrapper import layer_consts
+from onnx_hub.caffe.passes.pass_manager import PassManager
 from onnx_hub.caffe.handler.c2o import *
+from onnx_hub.profiler import get_profiler
+
+logger = logging.getLogger(__name__)
+
+# Metadata key listing the graph passes a converted model was optimized
+# with. They rename or remove initializers, so such models can not be
+# reused by SnapshotConverter.from_onnx_model.
+GRAPH_PASSES_KEY = "onnx_hub.graph_passes"
+
+# Resolved handlers per opset, c.f. get_all_caffe2onnx_handlers.
+_handlers_cache = {}
 
 def get_all_caffe2onnx_handlers(opset_dict):
   """ Get a dict of all caffe2onnx handler classes.
@@ -15,13 +44,37 @@ def get_all_caffe2onnx_handlers(opset_dict):
   :param opset_dict: A dict of opset. e.g. {'domain': version, ...}
   :return: Dict.
   """
+  return _get_caffe2onnx_registry(opset_dict)[0]
+
+
+def make_conversion_context(opset_dict, **kwargs):
+  """ Make the context of a conversion to the given opset.
+
+  :param opset_dict: A dict of opset. e.g. {'domain': version, ...}
+  :param kwargs: Other args of ConversionContext.
+  :return: ConversionContext.
+  """
+  handlers, versions = _get_caffe2onnx_registry(opset_dict)
+  return ConversionContext(opset_dict, handlers, versions, **kwargs)
+
+
+def _get_caffe2onnx_registry(opset_dict):
+  # Schemas are only queried the first time an opset is seen. The cached
+  # registry is never mutated, so it can be shared between threads.
+  key = tuple(sorted(opset_dict.items()))
+  if key not in _handlers_cache:
+    _handlers_cache[key] = _resolve_caffe2onnx_handlers(opset_dict)
+  return _handlers_cache[key]
+
+
+def _resolve_caffe2onnx_handlers(opset_dict):
   handlers = {}
+  versions = {}
   for handler in Caffe2OnnxHandler.__subclasses__():
     handler.check_cls()
 
     domain = handler.DOMAIN
     version = opset_dict[domain]
-    handler.VERSION = version
 
     since_version = 1
     if handler.ONNX_OP and defs.has(handler.ONNX_OP, domain=handler.DOMAIN):
@@ -35,17 +88,154 @@ def get_all_caffe2onnx_handlers(opset_dict):
                     "when call make_node method in handler.".format(
                         handler.ONNX_OP or "Undefined", handler.DOMAIN or
                         "ai.onnx"))
-    handler.SINCE_VERSION = since_version
+    versions[handler] = (version, since_version)
 
     for caffe_layer in handler.TF_OP:
       handlers.setdefault(domain, {})[caffe_layer] = handler
-  return handlers
+  return handlers, versions
 
 def merge_caffe_model(weights, model):
-  for layer in model.layer:
-    for weight_layer in weights.layer:
-      if layer.name == weight_layer.name:
-        layer.blobs.MergeFrom(weight_layer.blobs)
+  """ Pair the layers of a prototxt model with their caffemodel weights.
+  Layers are matched by name, and blobs are referenced rather than copied
+  into model. A CaffeModelReader is looked up through its lazy index, so
+  it is only indexed as far as the layers converted so far.
+
+  :param weights: caffemodel Proto object or CaffeModelReader.
+  :param model: Proto object from prototxt file.
+  :return: MergedWeights.
+  """
+  return MergedWeights(weights, model)
+
+
+class MergedWeights(object):
+  """ The caffemodel layers holding the blobs of the layers of a prototxt,
+  i.e. LayerParameter, V1LayerParameter or CaffeModelLayer. If a name
+  repeats in the caffemodel, its first layer is used, as
+  CaffeModelReader.get_layer does.
+  """
+
+  def __init__(self, weights, model):
+    """
+    :param weights: caffemodel Proto object or CaffeModelReader.
+    :param model: Proto object from prototxt file.
+    """
+    self.model = model
+    if isinstance(weights, CaffeModelReader):
+      self._weight_layers = weights
+      self._get_layer = weights.get_layer
+    else:
+      self._weight_layers = list(
+          itertools.chain(weights.layer, weights.layers))
+      index = {}
+      for weight_layer in self._weight_layers:
+        index.setdefault(weight_layer.name, weight_layer)
+      self._get_layer = index.get
+
+  def get(self, name):
+    """ Get the caffemodel layer of a prototxt layer.
+
+    :param name: Layer name.
+    :return: The caffemodel layer, or None.
+    """
+    return self._get_layer(name)
+
+  def log_unmatched(self):
+    """ Log the prototxt layers without weights, the caffemodel layers with
+    blobs but no prototxt layer, and the names repeated in the caffemodel.
+    This indexes the rest of a CaffeModelReader, so it is done once the
+    layers are converted.
+    """
+    names = set(layer.name for layer in self.model.layer)
+    missing = [
+        layer.name for layer in self.model.layer
+        if layer.type not in ["Input", "Data"] and self.get(layer.name) is None
+    ]
+    seen = set()
+    unused = []
+    repeated = []
+    for weight_layer in self._weight_layers:
+      if weight_layer.name in seen:
+        repeated.append(weight_layer.name)
+        continue
+      seen.add(weight_layer.name)
+      if weight_layer.name not in names and _num_blobs(weight_layer) > 0:
+        unused.append(weight_layer.name)
+
+    if missing:
+      logger.info("Layers without weights in caffemodel: {}.".format(
+          ", ".join(missing)))
+    if unused:
+      logger.warning("Weights without layer in prototxt: {}.".format(
+          ", ".join(sorted(unused))))
+    if repeated:
+      logger.warning("Layers repeated in caffemodel, only the first of each "
+                     "is used: {}.".format(", ".join(sorted(set(repeated)))))
+
+
+def _num_blobs(weight_layer):
+  if isinstance(weight_layer, CaffeModelLayer):
+    return weight_layer.num_blobs
+  return len(weight_layer.blobs)
+
+
+def _inference_layers(model, output=None):
+  """ Get the layers to convert for some outputs, c.f. pruning.
+
+  :param model: NetParameter from the prototxt.
+  :param output: List of output blob names, or None to detect them.
+  :return: Tuple of (list of LayerParameter, list of (blob name, output
+    name)), c.f. pruning.resolve_outputs.
+  """
+  layers, aliases = pruning.inference_layers(model)
+  if output is None:
+    output = pruning.detect_outputs(layers, model.input)
+    logger.info("Detected outputs: {}.".format(", ".join(output)))
+  output = pruning.resolve_outputs(output, aliases)
+  return pruning.reachable_layers(
+      layers, [blob for blob, _ in output], model.input), output
+
+
+def _conversion_layers(layers, weights=None):
+  """ Pick the layers to convert, folding BatchNorm and Scale layers where
+  possible, c.f. folding.plan_folds.
+
+  :param layers: List of LayerParameter run at inference, in prototxt
+    order, c.f. pruning.inference_layers.
+  :param weights: Optional MergedWeights, or dict of layer name to the
+    layer holding its blobs. By default blobs are read from the layers
+    themselves.
+  :return: Generator of (LayerParameter, layer holding its blobs or None,
+    list of (LayerParameter, layer holding its blobs) folded into it).
+    Layers with others folded into them are copies, c.f.
+    folding.fused_layer.
+  """
+
+  def weights_layer(layer):
+    if weights is None:
+      return layer
+    return weights.get(layer.name)
+
+  layers_by_name = dict((layer.name, layer) for layer in layers)
+
+  def has_blobs(name):
+    blobs_layer = weights_layer(layers_by_name[name])
+    return blobs_layer is not None and _num_blobs(blobs_layer) > 0
+
+  folds = folding.plan_folds(layers, has_blobs)
+  folded = dict((follower.name, name) for name, followers in folds.items()
+                for follower in followers)
+
+  for layer in layers:
+    if layer.name in folded:
+      logger.info("Layer {} has been folded into {}.".format(
+          layer.name, folded[layer.name]))
+      continue
+    followers = folds.get(layer.name, [])
+    fused = [(follower, weights_layer(follower)) for follower in followers]
+    layer_weights = weights_layer(layer)
+    if followers:
+      layer = folding.fused_layer(layer, followers)
+    yield layer, layer_weights, fused
 
 
 def caffe_model_to_onnx_graph(caffemodel,
@@ -53,27 +243,80 @@ def caffe_model_to_onnx_graph(caffemodel,
                               opset=((defs.ONNX_DOMAIN,
                                       defs.onnx_opset_version()),),
                               name="graph",
-                              ignore_unimplemented=False):
+                              ignore_unimplemented=False,
+                              weights=None,
+                              external_data=None,
+                              memory_budget=None,
+                              check_nodes=True,
+                              input_shapes=None,
+                              dynamic_batch=False,
+                              initializers_as_inputs=True,
+                              opt_level=0,
+                              pass_manager=None,
+                              profiler=None):
   """Converts a Caffe model Proto to an ONNX graph
 
   This function converts a Caffe model proto to an equivalent
-  representation of ONNX graph.
+  representation of ONNX graph. Only the layers run at inference are
+  converted, c.f. pruning.inference_layers.
 
   :param caffemodel: Caffe Proto object.
-  :param output: List of Tensorflow NodeDef object specifying which nodes
-    to be taken as outputs of the ONNX graph.
+  :param output: List of names of the blobs to be taken as outputs of the
+    ONNX graph, or None to detect them, c.f. pruning.detect_outputs.
+    Layers none of them depends on are not converted. Tops of removed
+    Dropout layers, and tops renamed after in-place layers, are output
+    under their requested name through an Identity, c.f.
+    pruning.resolve_outputs.
   :param opset: Opset, which should be ((str domain: int version number),).
   :param name: The name of the output ONNX Graph.
   :param ignore_unimplemented: Convert to ONNX model and ignore all the operators
     that are not currently supported by onnx-hub.
     This is an experimental feature. By enabling this feature,
     the graph would not be guaranteed to match the ONNX specifications.
+  :param weights: Optional MergedWeights, or dict of layer name to the
+    layer holding its blobs, c.f. merge_caffe_model. If given, blobs are
+    read from it instead of from the layers of caffemodel.
+  :param external_data: Optional ExternalDataWriter. If given, initializers
+    are written to external data files instead of embedded in the graph.
+  :param memory_budget: Optional number of bytes of converted weights to
+    hold in memory. Requires external_data. Once exceeded, pending weights
+    are written out and released, so layers are streamed to disk one by
+    one. 0 flushes after every layer.
+  :param check_nodes: Check every node against its ONNX schema as soon as
+    its handler makes it.
+  :param input_shapes: Optional dict of input name to shape, for inputs
+    whose shape the prototxt does not declare or to override it.
+  :param dynamic_batch: Declare the first dim of inputs, and of the
+    tensors computed from them, as dynamic.
+  :param initializers_as_inputs: Also declare initializers as graph
+    inputs. If False, only the data placeholders are inputs, which
+    requires IR version 4 or later.
+  :param opt_level: Optimization level from 0 to 3 of the graph passes
+    run once all nodes are made, c.f. passes.pass_manager.
+  :param pass_manager: Optional PassManager to run instead of the passes
+    of opt_level. Its report tells what the passes did.
+  :param profiler: Optional Profiler to time the conversion phases with.
 
   :returns: The equivalent ONNX Graph Proto object.
   """
-  ir_graph = IRGraph(name)
-  exception.IGNORE_UNIMPLEMENTED = ignore_unimplemented
-  training_ops_to_remove = ["DropOut"]
+  profiler = get_profiler(profiler)
+  ir_graph = IRGraph(name, initializers_as_inputs=initializers_as_inputs)
+  with profiler.phase("prune_layers"):
+    layers, resolved_output = _inference_layers(caffemodel, output)
+  output = [name for _, name in resolved_output]
+  with profiler.phase("infer_shapes"):
+    shapes = shape_inference.infer_shapes(
+        caffemodel, input_shapes, dynamic_batch, layers)
+    for blob, name in resolved_output:
+      if blob != name and blob in shapes:
+        shapes[name] = shapes[blob]
+    ir_graph.set_shapes(shapes)
+  used = set(blob for blob, _ in resolved_output)
+  for layer in layers:
+    used.update(layer.bottom)
+  for input_name in caffemodel.input:
+    if input_name in used:
+      ir_graph.add_placeholder(input_name)
 
   opset_dict = {}
   for domain, version in opset:
@@ -81,37 +324,68 @@ def caffe_model_to_onnx_graph(caffemodel,
       domain = defs.ONNX_DOMAIN
     opset_dict[domain] = version
 
-  handlers = get_all_caffe2onnx_handlers(opset_dict)
+  ctx = make_conversion_context(
+      opset_dict,
+      ignore_unimplemented=ignore_unimplemented,
+      check_nodes=check_nodes)
 
-  for node in caffemodel.layer:
-    if node.type in training_ops_to_remove:
-      logger.info(
-          "A training op with name {} type {} has been removed.".format(
-              node.name, node.type))
-    else:
-      ir_graph.add_node(node)
-      if node.type == "Input":
-        continue
-      handler = handlers.get(defs.ONNX_DOMAIN, {}).get(node.type, None)
-      node_proto = None
-      if handler:
+  if memory_budget is not None and external_data is None:
+    raise ValueError("memory_budget requires external_data.")
+  pending_weights_layers = []
+
+  for node, weights_layer, fused in _conversion_layers(layers, weights):
+    with profiler.phase("add_node", op=node.type):
+      ir_graph.add_node(node, weights_layer, fused)
+    if node.type == "Input":
+      continue
+    handler = ctx.get_handler(node.type)
+    node_proto = None
+    if handler:
+      with profiler.phase("handle", op=node.type):
         node_proto = handler.handle(
             node,
+            ctx=ctx,
             consts=ir_graph.consts,
             data_type_cast_map=ir_graph.data_type_cast_map)
-      else:
-        exception.OP_UNIMPLEMENTED_EXCEPT(
-            node.type,
-            domain=None if defs.ONNX_DOMAIN in handlers else defs.ONNX_DOMAIN)
+    else:
+      ctx.op_unimplemented(
+          node.type,
+          domain=None if defs.ONNX_DOMAIN in ctx.handlers
+          else defs.ONNX_DOMAIN)
 
-      if node_proto is None:
-        node_proto = Caffe2OnnxHandler.make_node_from_caffe_layer(
-            node, op_type=node.type, should_check=False)
-      ir_graph.add_node_proto(node_proto)
+    if node_proto is None:
+      node_proto = Caffe2OnnxHandler.make_node_from_caffe_node(
+          node, list(node.bottom), op_type=node.type, should_check=False)
+    ir_graph.add_node_proto(node_proto)
 
+    if memory_budget is not None:
+      pending_weights_layers.extend(
+          layer for layer in [weights_layer] + [w for _, w in fused]
+          if isinstance(layer, CaffeModelLayer))
+      if ir_graph.pending_const_bytes > memory_budget:
+        with profiler.phase("flush_consts"):
+          ir_graph.flush_consts(external_data)
+        for pending in pending_weights_layers:
+          pending.release()
+        pending_weights_layers = []
+
+  # Outputs that were the tops of removed Dropout layers or renamed.
+  for blob, name in resolved_output:
+    if blob != name:
+      ir_graph.add_node_proto(make_node("Identity", [blob], [name]))
+      ir_graph.add_var(name)
   ir_graph.set_output(output)
 
-  return ir_graph.make_graph_proto()
+  if pass_manager is None and opt_level:
+    pass_manager = PassManager.from_opt_level(opt_level)
+  if pass_manager is not None:
+    with profiler.phase("optimize_graph"):
+      pass_manager.run(ir_graph, profiler)
+
+  with profiler.phase("initializer_proto"):
+    initializer = ir_graph.make_initializer_proto(external_data)
+  with profiler.phase("make_graph"):
+    return ir_graph.make_graph_proto(initializer=initializer)
 
 
 def caffe_model_to_onnx_model(weights,
@@ -121,16 +395,26 @@ def caffe_model_to_onnx_model(weights,
                               producer_name="onnx-hub",
                               graph_name="graph",
                               ignore_unimplemented=False,
-                              optimizer_passes=None):
+                              optimizer_passes=None,
+                              external_data=None,
+                              memory_budget=None,
+                              check_graph=False,
+                              input_shapes=None,
+                              dynamic_batch=False,
+                              initializers_as_inputs=True,
+                              opt_level=0,
+                              pass_manager=None,
+                              profiler=None):
   """Converts a Caffe model Proto to an ONNX model
 
   This function converts a Caffe model proto to an equivalent
   representation of ONNX model.
 
-  :param weights: caffemodel Proto object.
+  :param weights: caffemodel Proto object or CaffeModelReader.
   :param model: Proto object from prototxt file.
   :param output: List of string or a string specifying the name
-    of the output graph node.
+    of the output graph node, or None to detect them, c.f.
+    caffe_model_to_onnx_graph.
   :param opset: Opset version number, list or tuple.
     Default is 0 means using latest version with domain ''.
     List or tuple items should be (str domain, int version number).
@@ -143,28 +427,225 @@ def caffe_model_to_onnx_model(weights,
   :param optimizer_passes: List of optimization names c.f.
     https://github.com/onnx/onnx/blob/master/onnx/optimizer.py for available
     optimization passes.
+  :param external_data: Optional ExternalDataWriter. If given, initializers
+    are written to external data files as they are produced, which allows
+    models larger than the 2GB protobuf limit. The returned model must be
+    saved in the writer's base_dir.
+  :param memory_budget: Optional number of bytes of converted weights to
+    hold in memory, c.f. caffe_model_to_onnx_graph. Peak memory stays
+    bounded when weights is a CaffeModelReader.
+  :param check_graph: Check the whole model once after conversion instead
+    of checking every node as it is made. Can not be combined with
+    ignore_unimplemented, whose custom nodes fail the check.
+  :param input_shapes: Optional dict of input name to shape, c.f.
+    caffe_model_to_onnx_graph.
+  :param dynamic_batch: Make the batch dim dynamic, c.f.
+    caffe_model_to_onnx_graph.
+  :param initializers_as_inputs: Also declare initializers as graph
+    inputs. Set to False to let backends treat weights as constants.
+    Requires IR version 4 or later.
+  :param opt_level: Optimization level from 0 to 3 of the onnx-hub graph
+    passes, c.f. caffe_model_to_onnx_graph. They run before
+    optimizer_passes.
+  :param pass_manager: Optional PassManager to run instead, c.f.
+    caffe_model_to_onnx_graph.
+  :param profiler: Optional Profiler to time the conversion phases with,
+    c.f. onnx_hub.profiler.
 
   :returns: The equivalent ONNX Model Proto object.
   """
+  profiler = get_profiler(profiler)
 
-  if not isinstance(opset, (int, long, list, tuple)):
+  if not isinstance(opset, (numbers.Integral, list, tuple)):
     raise TypeError("opset is expected to int, list or tuple, but {}.".format(
         type(opset)))
-  if isinstance(opset, (int, long)):
+  if isinstance(opset, numbers.Integral):
     opset = [(defs.ONNX_DOMAIN, opset or defs.onnx_opset_version())]
   opset_imports = [make_opsetid(item[0], item[1]) for item in opset]
 
-  if not isinstance(output, (list, tuple)):
+  if output is not None and not isinstance(output, (list, tuple)):
     output = [output]
 
-  merge_caffe_model(weights, model)
-  onnx_graph = caffe_model_to_onnx_graph(
-      model, output, opset, graph_name, ignore_unimplemented)
-  onnx_model = make_model(
-      onnx_graph, producer_name=producer_name, opset_imports=opset_imports)
+  if not initializers_as_inputs and onnx.IR_VERSION < 4:
+    raise ValueError(
+        "Initializers must be inputs before IR version 4, but the IR "
+        "version is {}.".format(onnx.IR_VERSION))
+
+  if check_graph and ignore_unimplemented:
+    raise ValueError(
+        "check_graph can not be combined with ignore_unimplemented.")
+
+  with profiler.phase("merge_caffe_model"):
+    merged_weights = merge_caffe_model(weights, model)
+  if pass_manager is None and opt_level:
+    pass_manager = PassManager.from_opt_level(opt_level)
+  with profiler.phase("convert_graph"):
+    onnx_graph = caffe_model_to_onnx_graph(
+        model, output, opset, graph_name, ignore_unimplemented,
+        weights=merged_weights, external_data=external_data,
+        memory_budget=memory_budget, check_nodes=not check_graph,
+        input_shapes=input_shapes, dynamic_batch=dynamic_batch,
+        initializers_as_inputs=initializers_as_inputs,
+        pass_manager=pass_manager, profiler=profiler)
+  merged_weights.log_unmatched()
+  with profiler.phase("make_model"):
+    onnx_model = make_model(
+        onnx_graph, producer_name=producer_name, opset_imports=opset_imports)
+
+  if check_graph:
+    with profiler.phase("check_model"):
+      checker.check_model(onnx_model)
 
   if isinstance(optimizer_passes, (list, tuple)) and optimizer_passes:
-    onnx_model = optimize(onnx_model, optimizer_passes)
+    # The optimizer is only loaded when passes are requested.
+    from onnx.optimizer import optimize
+    with profiler.phase("optimize"):
+      onnx_model = optimize(onnx_model, optimizer_passes)
 
+  graph_passes = []
+  if pass_manager is not None:
+    graph_passes.extend(graph_pass.NAME for graph_pass in pass_manager.passes)
+  if isinstance(optimizer_passes, (list, tuple)):
+    graph_passes.extend(optimizer_passes)
+  if graph_passes:
+    entry = onnx_model.metadata_props.add()
+    entry.key = GRAPH_PASSES_KEY
+    entry.value = ",".join(graph_passes)
   return onnx_model
 
+
+
+class SnapshotConverter(object):
+  """ Converts caffemodels sharing one prototxt, e.g. training snapshots.
+  The first caffemodel is converted as usual. The graph made for it is
+  kept without its initializers, and later caffemodels only have their
+  weights decoded into new initializers, without running any handler.
+  """
+
+  def __init__(self, model, output, **kwargs):
+    """
+    :param model: Proto object from prototxt file.
+    :param output: List of string or a string specifying the name
+      of the output graph node, or None to detect them.
+    :param kwargs: Other args of caffe_model_to_onnx_model, except
+      optimizer_passes, opt_level and pass_manager, which may rewrite
+      initializers.
+    """
+    for name in ["optimizer_passes", "opt_level", "pass_manager"]:
+      if kwargs.get(name):
+        raise ValueError("{} can not be used with snapshots.".format(name))
+    self.model = model
+    self.output = output
+    self._kwargs = kwargs
+    self._template = None
+    # Name to (data type, dims) of the initializers, in graph order.
+    self._initializers = collections.OrderedDict()
+
+  @classmethod
+  def from_onnx_model(cls, onnx_model, model):
+    """ Make a converter reusing a model converted before, e.g. to load
+    the weights of another caffemodel into it.
+
+    :param onnx_model: ONNX Model Proto object converted from model. Its
+      external data does not need to be loaded. Models optimized with
+      graph passes, e.g. converted with an opt_level, are rejected with
+      ValueError, since their initializers no longer match the layers.
+    :param model: Proto object from prototxt file.
+    :return: SnapshotConverter.
+    """
+    for entry in onnx_model.metadata_props:
+      if entry.key == GRAPH_PASSES_KEY:
+        raise ValueError(
+            "The model was optimized with the graph passes {}, which "
+            "rename or remove initializers. Convert it again instead."
+            .format(entry.value))
+    converter = cls(model, [output.name for output in onnx_model.graph.output])
+    converter._set_template(onnx_model)
+    return converter
+
+  def convert(self, weights, external_data=None, profiler=None):
+    """ Convert a caffemodel.
+
+    :param weights: caffemodel Proto object or CaffeModelReader.
+    :param external_data: Optional ExternalDataWriter for the initializers
+      of this caffemodel, c.f. caffe_model_to_onnx_model.
+    :param profiler: Optional Profiler to time the conversion phases with.
+    :return: ONNX Model Proto object.
+    """
+    if self._template is None:
+      onnx_model = caffe_model_to_onnx_model(
+          weights,
+          self.model,
+          self.output,
+          external_data=external_data,
+          profiler=profiler,
+          **self._kwargs)
+      self._set_template(onnx_model)
+      return onnx_model
+
+    profiler = get_profiler(profiler)
+    with profiler.phase("merge_caffe_model"):
+      merged_weights = merge_caffe_model(weights, self.model)
+    layers, _ = _inference_layers(
+        self.model, [output.name for output in self._template.graph.output])
+    # Every weight is checked before the first payload is written, so a
+    # caffemodel not matching the topology leaves patched external data
+    # untouched.
+    checked = []
+    found = set()
+    for layer, weights_layer, fused in _conversion_layers(
+        layers, merged_weights):
+      with profiler.phase("decode_weights", op=layer.type):
+        consts = list(layer_consts(layer, weights_layer, fused))
+      for name, value in consts:
+        if name not in self._initializers:
+          raise ValueError(
+              "Weights of {} have no initializer in the converted "
+              "topology.".format(name))
+        self._check_const(name, value)
+        found.add(name)
+      checked.append((layer, consts, [weights_layer] + [w for _, w in fused]))
+
+    missing = [name for name in self._initializers if name not in found]
+    if missing:
+      raise ValueError("Weights of {} are missing from the caffemodel.".format(
+          ", ".join(missing)))
+    merged_weights.log_unmatched()
+
+    initializers = {}
+    for layer, consts, weights_layers in checked:
+      with profiler.phase("initializer_proto", op=layer.type):
+        for name, value in consts:
+          if external_data is not None:
+            initializers[name] = external_data.make_tensor(name, value)
+          else:
+            initializers[name] = numpy_helper.from_array(value, name)
+      if external_data is not None:
+        # Their payloads are written out, so their pages can be dropped.
+        for released in weights_layers:
+          if isinstance(released, CaffeModelLayer):
+            released.release()
+    with profiler.phase("make_model"):
+      onnx_model = ModelProto()
+      onnx_model.CopyFrom(self._template)
+      onnx_model.graph.initializer.extend(
+          initializers[name] for name in self._initializers)
+    return onnx_model
+
+  def _set_template(self, onnx_model):
+    self._template = ModelProto()
+    self._template.CopyFrom(onnx_model)
+    del self._template.graph.initializer[:]
+    self._initializers.clear()
+    for tensor in onnx_model.graph.initializer:
+      self._initializers[tensor.name] = (tensor.data_type, tuple(tensor.dims))
+
+  def _check_const(self, name, value):
+    data_type, dims = self._initializers[name]
+    if (mapping.NP_TYPE_TO_TENSOR_TYPE[value.dtype] != data_type or
+        tuple(value.shape) != dims):
+      raise ValueError(
+          "Weights of {} have type {} and shape {}, but the converted "
+          "topology expects {} and {}.".format(
+              name, value.dtype, list(value.shape),
+              mapping.TENSOR_TYPE_TO_NP_TYPE[data_type], list(dims)))
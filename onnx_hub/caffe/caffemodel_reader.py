@@ -0,0 +1,154 @@
+import mmap
+
+from onnx_hub.caffe.blob_decoder import decode_blob
+from onnx_hub.caffe.proto import caffe_pb2
+from onnx_hub.caffe.wire_format import WIRETYPE_LENGTH_DELIMITED
+from onnx_hub.caffe.wire_format import WIRETYPE_VARINT
+from onnx_hub.caffe.wire_format import decode_varint
+from onnx_hub.caffe.wire_format import iter_fields
+from onnx_hub.inputs import InputBuffer
+
+# NetParameter field numbers, c.f. caffe.proto.
+_NET_LAYER = 100
+_NET_LAYERS = 2
+
+# (name, type, blobs) field numbers of LayerParameter and V1LayerParameter.
+_LAYER_FIELDS = {
+    _NET_LAYER: (1, 2, 7),
+    _NET_LAYERS: (4, 5, 6),
+}
+
+
+class CaffeModelLayer(object):
+  """ A layer record of a caffemodel, decoded on demand.
+  Only name and type are read when the layer is indexed; blobs are
+  decoded from the underlying buffer every time `blobs` is accessed and
+  are not cached, so they can be released as soon as the caller is done.
+  Blobs are float32 numpy arrays viewing the buffer where possible,
+  c.f. decode_blob.
+  """
+
+  def __init__(self, buf, name, type, blob_spans):
+    self._buf = buf
+    self.name = name
+    self.type = type
+    self._blob_spans = blob_spans
+
+  @property
+  def num_blobs(self):
+    return len(self._blob_spans)
+
+  @property
+  def blobs(self):
+    return [decode_blob(self._buf, start, end)
+            for start, end in self._blob_spans]
+
+  def release(self):
+    """ Hint that the blobs of this layer are no longer needed, so the
+    pages of the memory map backing them can be dropped. Arrays still
+    viewing them stay valid and fault the pages back in on access.
+    """
+    if not self._blob_spans or not hasattr(self._buf, "madvise"):
+      return
+    start = self._blob_spans[0][0] // mmap.PAGESIZE * mmap.PAGESIZE
+    self._buf.madvise(mmap.MADV_DONTNEED, start,
+                      self._blob_spans[-1][1] - start)
+
+
+class CaffeModelReader(object):
+  """ Memory-mapped reader for binary caffemodel files.
+  The file is never read as a whole, c.f. onnx_hub.inputs.InputBuffer.
+  Layer records are indexed lazily in file order the first time they are
+  needed, and their blobs are only decoded when `CaffeModelLayer.blobs`
+  is accessed.
+  Both `layer` (LayerParameter) and legacy `layers` (V1LayerParameter)
+  records are supported.
+  """
+
+  def __init__(self, source):
+    """
+    :param source: Path, bytes-like object or binary file-like object of
+      the caffemodel.
+    """
+    self._input = InputBuffer(source)
+    self._buf = self._input.buffer
+    self._pos = 0
+    self._end = len(self._buf)
+    self._layers = []
+    self._layers_by_name = {}
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close()
+
+  def __iter__(self):
+    idx = 0
+    while True:
+      if idx < len(self._layers):
+        yield self._layers[idx]
+        idx += 1
+      elif self._index_next() is None:
+        return
+
+  def get_layer(self, name):
+    """ Get a layer by name, indexing further into the file if needed.
+
+    :param name: Layer name.
+    :return: CaffeModelLayer or None.
+    """
+    layer = self._layers_by_name.get(name)
+    while layer is None:
+      layer = self._index_next()
+      if layer is None:
+        return None
+      if layer.name != name:
+        layer = None
+    return layer
+
+  @property
+  def buffer(self):
+    """ The serialized caffemodel, e.g. to hash it without a copy. """
+    return self._buf
+
+  def close(self):
+    self._input.close()
+
+  def _index_next(self):
+    for field_number, wire_type, start, end in iter_fields(
+        self._buf, self._pos, self._end):
+      self._pos = end
+      if (field_number in _LAYER_FIELDS and
+          wire_type == WIRETYPE_LENGTH_DELIMITED):
+        layer = self._make_layer(_LAYER_FIELDS[field_number], start, end)
+        self._layers.append(layer)
+        self._layers_by_name.setdefault(layer.name, layer)
+        return layer
+    return None
+
+  def _make_layer(self, field_numbers, start, end):
+    name_field, type_field, blobs_field = field_numbers
+    name = ""
+    layer_type = ""
+    blob_spans = []
+    for field_number, wire_type, value_start, value_end in iter_fields(
+        self._buf, start, end):
+      if field_number == blobs_field:
+        blob_spans.append((value_start, value_end))
+      elif field_number == name_field:
+        name = _decode_str(self._buf, value_start, value_end)
+      elif field_number == type_field:
+        if wire_type == WIRETYPE_VARINT:
+          layer_type = caffe_pb2.V1LayerParameter.LayerType.Name(
+              decode_varint(self._buf, value_start)[0])
+        else:
+          layer_type = _decode_str(self._buf, value_start, value_end)
+    return CaffeModelLayer(self._buf, name, layer_type, blob_spans)
+
+
+def _decode_str(buf, start, end):
+  value = buf[start:end]
+  if isinstance(value, memoryview):
+    value = value.tobytes()
+  return value.decode("utf-8")
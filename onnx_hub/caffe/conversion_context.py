@@ -0,0 +1,51 @@
+from onnx import defs
+
+from onnx_hub.caffe import exception
+
+
+class ConversionContext(object):
+  """ Settings of one Caffe to ONNX conversion.
+  Handlers receive it as the `ctx` kwarg of `handle` and read their opset
+  versions and check flags from it instead of from class attributes or
+  module globals. Conversions with different settings can therefore run
+  concurrently in one process.
+  """
+
+  def __init__(self,
+               opset_dict,
+               handlers,
+               versions,
+               ignore_unimplemented=False,
+               check_nodes=True):
+    """
+    :param opset_dict: A dict of opset. e.g. {'domain': version, ...}
+    :param handlers: Dict of handlers per domain and Caffe layer type,
+      c.f. caffe_helper.get_all_caffe2onnx_handlers.
+    :param versions: Dict of handler class to (version, since_version).
+    :param ignore_unimplemented: Warn instead of raising on layers
+      without handler.
+    :param check_nodes: Check nodes against their schema when made.
+    """
+    self.opset_dict = opset_dict
+    self.handlers = handlers
+    self.ignore_unimplemented = ignore_unimplemented
+    self.check_nodes = check_nodes
+    self._versions = versions
+
+  def get_handler(self, layer_type, domain=defs.ONNX_DOMAIN):
+    return self.handlers.get(domain, {}).get(layer_type, None)
+
+  def version(self, handler):
+    """ Opset version a handler converts to. """
+    return self._versions[handler][0]
+
+  def since_version(self, handler):
+    """ Version of the handler's ONNX op schema in use. """
+    return self._versions[handler][1]
+
+  def op_unimplemented(self, op, version=None, domain=None):
+    """ Report a layer that can not be converted.
+    Raise NotImplementedError unless ignore_unimplemented is set.
+    """
+    exception.OP_UNIMPLEMENTED_EXCEPT(
+        op, version, domain, ignore=self.ignore_unimplemented)
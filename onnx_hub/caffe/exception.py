@@ -0,0 +1,30 @@
+""" Unimplemented layer reporting for the Caffe converter.
+Mirrors onnx_tf.common.exception so the Caffe path does not have to
+import onnx_tf, and TensorFlow with it.
+"""
+import warnings
+
+IGNORE_UNIMPLEMENTED = False
+
+
+class OpUnimplementedException(object):
+
+  def __call__(self, op, version=None, domain=None, ignore=None):
+    """ Raise NotImplementedError for op, or only warn if ignore is set.
+    ignore defaults to the module wide IGNORE_UNIMPLEMENTED.
+    """
+    if ignore is None:
+      ignore = IGNORE_UNIMPLEMENTED
+    message = "{} is not implemented".format(op)
+    if version is not None:
+      message += " for version {}".format(version)
+    if domain is not None:
+      message += " in domain `{}`".format(domain)
+    if ignore:
+      warnings.warn(message + ". It would be ignored as "
+                    "ignore_unimplemented set to True.")
+    else:
+      raise NotImplementedError(message + ".")
+
+
+OP_UNIMPLEMENTED_EXCEPT = OpUnimplementedException()
@@ -0,0 +1,172 @@
+import os
+
+import numpy as np
+from onnx import TensorProto
+from onnx import numpy_helper
+from onnx.helper import mapping
+
+
+class ExternalDataWriter(object):
+  """ Writes initializer payloads to ONNX external data files.
+  Every tensor is written as soon as it is made, at an offset aligned to
+  `alignment` bytes so runtimes can mmap it in place. Tensors smaller than
+  `size_threshold` bytes stay embedded in the model.
+  If `max_file_size` is set, data is split into several files named
+  location, location.1, location.2, ...
+
+  The model referencing the data must be saved in `base_dir`, since
+  external data locations are relative to the model file.
+  """
+
+  def __init__(self,
+               base_dir,
+               location,
+               alignment=4096,
+               max_file_size=None,
+               size_threshold=1024):
+    self.base_dir = base_dir
+    self.location = location
+    self.alignment = alignment
+    self.max_file_size = max_file_size
+    self.size_threshold = size_threshold
+    self.locations = []
+    self._file = None
+    self._offset = 0
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close()
+
+  def make_tensor(self, name, value):
+    """ Make a TensorProto, writing its payload to external data.
+
+    :param name: Tensor name.
+    :param value: numpy array.
+    :return: TensorProto.
+    """
+    if value.nbytes < self.size_threshold:
+      return numpy_helper.from_array(value, name)
+
+    value = np.asarray(value, dtype=value.dtype.newbyteorder("<"))
+    location, offset = self._reserve(value.nbytes)
+    value.tofile(self._file)
+    self._offset += value.nbytes
+
+    tensor = TensorProto()
+    tensor.name = name
+    tensor.data_type = mapping.NP_TYPE_TO_TENSOR_TYPE[value.dtype]
+    tensor.dims.extend(value.shape)
+    tensor.data_location = TensorProto.EXTERNAL
+    for key, entry in (("location", location), ("offset", offset),
+                       ("length", value.nbytes)):
+      external_data = tensor.external_data.add()
+      external_data.key = key
+      external_data.value = str(entry)
+    return tensor
+
+  def close(self):
+    if self._file is not None:
+      self._file.close()
+      self._file = None
+
+  def _reserve(self, nbytes):
+    offset = self._aligned(self._offset)
+    if (self._file is None or
+        (self.max_file_size and self._offset > 0 and
+         offset + nbytes > self.max_file_size)):
+      self._open_next()
+      offset = 0
+    if offset > self._offset:
+      self._file.write(b"\0" * (offset - self._offset))
+      self._offset = offset
+    return self.locations[-1], offset
+
+  def _open_next(self):
+    self.close()
+    location = self.location
+    if self.locations:
+      location = "{}.{}".format(self.location, len(self.locations))
+    self._file = open(os.path.join(self.base_dir, location), "wb")
+    self._offset = 0
+    self.locations.append(location)
+
+  def _aligned(self, offset):
+    if not self.alignment:
+      return offset
+    return (offset + self.alignment - 1) // self.alignment * self.alignment
+
+
+class ExternalDataPatcher(object):
+  """ Overwrites the payloads of existing initializers in place.
+  It stands in for an ExternalDataWriter when only the values of a model's
+  initializers change, e.g. to load new weights into a model converted
+  before. External payloads are written over the old ones in their files,
+  which keep their layout; embedded initializers are remade.
+
+  Payloads are written one by one, so an interrupted patch leaves a mix
+  of old and new weights.
+  """
+
+  def __init__(self, base_dir, tensors):
+    """
+    :param base_dir: Directory of the model file.
+    :param tensors: Existing TensorProto initializers, whose external data
+      is not loaded.
+    """
+    self.base_dir = base_dir
+    self._tensors = dict((tensor.name, tensor) for tensor in tensors)
+    self._files = {}
+    # Lengths are checked up front, so no payload is written before a
+    # mismatch is found.
+    for tensor in self._tensors.values():
+      info = dict((entry.key, entry.value) for entry in tensor.external_data)
+      if tensor.data_location != TensorProto.EXTERNAL or "length" not in info:
+        continue
+      nbytes = int(np.prod(tensor.dims, dtype=np.int64)) * np.dtype(
+          mapping.TENSOR_TYPE_TO_NP_TYPE[tensor.data_type]).itemsize
+      if int(info["length"]) != nbytes:
+        raise ValueError("{} holds {} bytes of external data, not {}.".format(
+            tensor.name, info["length"], nbytes))
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close()
+
+  def make_tensor(self, name, value):
+    """ Write the new value of an initializer.
+
+    :param name: Tensor name.
+    :param value: numpy array of the same type and shape as the tensor.
+    :return: TensorProto.
+    """
+    tensor = self._tensors[name]
+    if tensor.data_location != TensorProto.EXTERNAL:
+      return numpy_helper.from_array(value, name)
+
+    info = dict((entry.key, entry.value) for entry in tensor.external_data)
+    value = np.asarray(value, dtype=value.dtype.newbyteorder("<"))
+    if "length" in info and int(info["length"]) != value.nbytes:
+      raise ValueError("{} holds {} bytes of external data, not {}.".format(
+          name, info["length"], value.nbytes))
+    f = self._open(info["location"])
+    f.seek(int(info.get("offset", 0)))
+    value.tofile(f)
+
+    patched = TensorProto()
+    patched.CopyFrom(tensor)
+    return patched
+
+  def close(self):
+    for f in self._files.values():
+      f.close()
+    self._files = {}
+
+  def _open(self, location):
+    if location not in self._files:
+      self._files[location] = open(os.path.join(self.base_dir, location),
+                                   "r+b")
+    return self._files[location]
@@ -0,0 +1,177 @@
+""" Folding of BatchNorm and Scale layers.
+
+At inference time a Caffe BatchNorm layer, and the Scale layer usually
+following it, compute a per channel affine function y = a * x + b. When
+they directly follow a Convolution or InnerProduct layer, the function is
+folded into its weights and bias, and the layers are dropped. A Scale
+layer following a BatchNorm layer elsewhere is folded into it, so the
+pair becomes a single BatchNormalization node.
+
+Folds are planned from the topology before conversion, so a layer's
+consts are final as soon as it is converted, which keeps the conversion
+streaming, c.f. caffe_helper.caffe_model_to_onnx_graph.
+"""
+import numpy as np
+
+from onnx_hub.caffe.blob_decoder import blob_to_array
+
+# Layer types other layers can be folded into, and the types of the
+# layers each of them can absorb, in order.
+_FOLDS = {
+    "Convolution": ["BatchNorm", "Scale"],
+    "InnerProduct": ["BatchNorm", "Scale"],
+    "BatchNorm": ["Scale"],
+}
+
+
+def plan_folds(layers, has_blobs):
+  """ Find the layers to fold into the layer before them.
+
+  :param layers: List of LayerParameter, in prototxt order.
+  :param has_blobs: Function telling if a layer has weights, by name.
+  :return: Dict of the name of a layer to the list of LayerParameter to
+    fold into it.
+  """
+  layers = list(layers)
+  folds = {}
+  folded = set()
+  for idx, head in enumerate(layers):
+    if (head.type not in _FOLDS or head.name in folded or
+        not _is_foldable(head, has_blobs)):
+      continue
+    followers = []
+    top = head.top[0]
+    pos = idx
+    for follower_type in _FOLDS[head.type]:
+      reader, reader_pos = _only_reader(layers, pos, top)
+      if (reader is None or reader.type != follower_type or
+          not _is_foldable(reader, has_blobs)):
+        continue
+      followers.append(reader)
+      top = reader.top[0]
+      pos = reader_pos
+    if followers:
+      folds[head.name] = followers
+      folded.update(follower.name for follower in followers)
+  return folds
+
+
+def fused_layer(layer, followers):
+  """ Get a copy of a layer rewritten to stand in for the layers folded
+  into it: it outputs their output and, if it can, has a bias.
+
+  :param layer: LayerParameter.
+  :param followers: List of LayerParameter folded into layer.
+  :return: LayerParameter.
+  """
+  fused = type(layer)()
+  fused.CopyFrom(layer)
+  fused.top[0] = followers[-1].top[0]
+  if layer.type == "Convolution":
+    fused.convolution_param.bias_term = True
+  elif layer.type == "InnerProduct":
+    fused.inner_product_param.bias_term = True
+  return fused
+
+
+def affine(layer, blobs):
+  """ Get the per channel affine function of a BatchNorm or Scale layer.
+
+  :param layer: LayerParameter.
+  :param blobs: Its blobs as numpy arrays.
+  :return: Tuple of float64 arrays (a, b), with y = a * x + b.
+  """
+  if layer.type == "BatchNorm":
+    mean, var = batch_norm_stats(blobs)
+    a = 1. / np.sqrt(var + layer.batch_norm_param.eps)
+    return a, -mean * a
+  gamma = blobs[0].astype("f8").reshape(-1)
+  beta = (blobs[1].astype("f8").reshape(-1)
+          if len(blobs) > 1 else np.zeros_like(gamma))
+  return gamma, beta
+
+
+def batch_norm_stats(blobs):
+  """ Get the mean and variance of a BatchNorm layer.
+  Caffe stores them multiplied by a moving average factor, in blob 2.
+
+  :param blobs: Its blobs as numpy arrays.
+  :return: Tuple of float64 arrays (mean, var).
+  """
+  factor = float(blobs[2].reshape(-1)[0]) if len(blobs) > 2 else 1.
+  factor = 0. if factor == 0 else 1. / factor
+  return (blobs[0].astype("f8").reshape(-1) * factor,
+          blobs[1].astype("f8").reshape(-1) * factor)
+
+
+def fold_consts(layer, blobs, fused):
+  """ Fold layers into the blobs of the layer before them.
+  BatchNorm and Scale layers get the inputs of a BatchNormalization node
+  even if nothing is folded into them.
+
+  :param layer: LayerParameter of a Convolution, InnerProduct, BatchNorm
+    or Scale layer.
+  :param blobs: Its blobs as numpy arrays.
+  :param fused: List of (LayerParameter, layer holding its blobs) folded
+    into layer.
+  :return: List of numpy arrays. Weights and bias for Convolution and
+    InnerProduct, and scale, bias, mean and var for BatchNorm and Scale.
+  """
+  if layer.type == "Scale":
+    # Unit variance and zero epsilon make BatchNormalization a plain
+    # per channel affine function, for inputs of any rank.
+    gamma, beta = affine(layer, blobs)
+    return [gamma.astype("f4"), beta.astype("f4"),
+            np.zeros(gamma.shape, "f4"), np.ones(gamma.shape, "f4")]
+
+  a = None
+  b = None
+  for follower, weights_layer in fused:
+    follower_a, follower_b = affine(
+        follower, [blob_to_array(blob) for blob in weights_layer.blobs])
+    if a is None:
+      a, b = follower_a, follower_b
+    else:
+      a, b = a * follower_a, b * follower_a + follower_b
+
+  if layer.type == "BatchNorm":
+    mean, var = batch_norm_stats(blobs)
+    if a is None:
+      a, b = np.ones_like(mean), np.zeros_like(mean)
+    return [a.astype("f4"), b.astype("f4"),
+            mean.astype("f4"), var.astype("f4")]
+
+  weights = blobs[0]
+  bias = (blobs[1].astype("f8").reshape(-1) if len(blobs) > 1 else
+          np.zeros(a.size))
+  shape = (-1,) + (1,) * (weights.ndim - 1)
+  if layer.type == "InnerProduct" and layer.inner_product_param.transpose:
+    shape = (1, -1)
+  return [(weights * a.reshape(shape)).astype("f4"),
+          (bias * a + b).astype("f4")]
+
+
+def _is_foldable(layer, has_blobs):
+  if len(layer.bottom) != 1 or len(layer.top) != 1:
+    return False
+  if layer.type == "Scale" and (layer.scale_param.axis != 1 or
+                                layer.scale_param.num_axes != 1):
+    return False
+  return has_blobs(layer.name)
+
+
+def _only_reader(layers, pos, blob):
+  """ Find the layer reading blob after layers[pos], if it is the only
+  one reading this version of it.
+  """
+  reader = None
+  reader_pos = None
+  for idx in range(pos + 1, len(layers)):
+    layer = layers[idx]
+    if blob in layer.bottom:
+      if reader is not None:
+        return None, None
+      reader, reader_pos = layer, idx
+    if blob in layer.top:
+      break
+  return reader, reader_pos
@@ -1,7 +1,15 @@
-import os
-import pkgutil
-
+# Handler modules are listed explicitly rather than discovered with
+# pkgutil.walk_packages, which scans the file system on every import.
 __all__ = [
-    modname for _, modname, _ in pkgutil.walk_packages(
-        path=[os.path.split(__file__)[0]])
+    "batch_norm",
+    "batch_norm_mixin",
+    "conv_mixin",
+    "convolution",
+    "gemm",
+    "max_pool",
+    "pool_mixin",
+    "relu",
+    "reshape",
+    "scale",
+    "softmax",
 ]
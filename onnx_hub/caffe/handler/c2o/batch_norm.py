@@ -0,0 +1,27 @@
+from onnx_hub.caffe.handler.caffe2onnx_handler import Caffe2OnnxHandler
+from onnx_hub.caffe.handler.handler import onnx_op
+from onnx_hub.caffe.handler.handler import tf_op
+from .batch_norm_mixin import BatchNormMixin
+
+
+@onnx_op("BatchNormalization")
+@tf_op("BatchNorm")
+class BatchNorm(BatchNormMixin, Caffe2OnnxHandler):
+  """
+    Converts BatchNorm layers not folded into the layer before them, with
+    the Scale layer following them if any folded in,
+    c.f. onnx_hub.caffe.folding.
+  """
+
+  @classmethod
+  def version_6(cls, node, **kwargs):
+    return cls.batch_norm_op(
+        node, node.batch_norm_param.eps, is_test=1, **kwargs)
+
+  @classmethod
+  def version_7(cls, node, **kwargs):
+    return cls.batch_norm_op(node, node.batch_norm_param.eps, **kwargs)
+
+  @classmethod
+  def version_9(cls, node, **kwargs):
+    return cls.batch_norm_op(node, node.batch_norm_param.eps, **kwargs)
@@ -0,0 +1,18 @@
+class BatchNormMixin(object):
+
+  @classmethod
+  def args_check(cls, node, **kwargs):
+    if node.name + "_0" not in kwargs["consts"]:
+      raise RuntimeError("{} layer {} has no weights.".format(
+          node.type, node.name))
+
+  @classmethod
+  def batch_norm_op(cls, node, epsilon, **kwargs):
+    # Scale, bias, mean and var consts, c.f. folding.fold_consts.
+    inputs = [node.bottom[0]] + [node.name + "_" + str(i) for i in range(4)]
+
+    node_kwargs = {}
+    if "is_test" in kwargs:
+      node_kwargs["is_test"] = kwargs["is_test"]
+    return cls.make_node_from_caffe_node(
+        node, inputs, epsilon=epsilon, ctx=kwargs["ctx"], **node_kwargs)
@@ -19,7 +19,8 @@ class ConvMixin(object):
         group=n_groups,
         kernel_shape=kernel_shape,
         strides=strides,
-        dilations=dilations)
+        dilations=dilations,
+        ctx=kwargs["ctx"])
 
     if not isinstance(conv_node, list):
       conv_node = [conv_node]
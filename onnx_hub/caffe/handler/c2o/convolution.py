@@ -1,7 +1,6 @@
-from onnx_tf.common import exception
 from onnx_hub.caffe.handler.caffe2onnx_handler import Caffe2OnnxHandler
-from onnx_tf.handlers.handler import onnx_op
-from onnx_tf.handlers.handler import tf_op
+from onnx_hub.caffe.handler.handler import onnx_op
+from onnx_hub.caffe.handler.handler import tf_op
 from .conv_mixin import ConvMixin
 
 
@@ -0,0 +1,49 @@
+from onnx_hub.caffe.handler.caffe2onnx_handler import Caffe2OnnxHandler
+from onnx_hub.caffe.handler.handler import onnx_op
+from onnx_hub.caffe.handler.handler import tf_op
+
+
+@onnx_op("Gemm")
+@tf_op("InnerProduct")
+class Gemm(Caffe2OnnxHandler):
+  """
+    Converts InnerProduct layers to a single Gemm with the bias fused in.
+    Weights keep the Caffe (num_output, input) layout and are read
+    transposed with transB, so they are not copied. Layers without a bias
+    get a zero one, c.f. ir_wrapper.layer_consts, as Gemm requires it
+    before version 11.
+    The input is expected to be 2D, e.g. flattened by a Reshape layer.
+  """
+
+  @classmethod
+  def _common(cls, node, ctx, **attrs):
+    trans_b = 0 if node.inner_product_param.transpose else 1
+    return [cls.make_node_from_caffe_node(
+        node, [node.bottom[0], node.name+'_0', node.name+'_1'],
+        transB=trans_b,
+        ctx=ctx,
+        **attrs)]
+
+  @classmethod
+  def version_1(cls, node, **kwargs):
+    return cls._common(node, kwargs["ctx"], broadcast=1)
+
+  @classmethod
+  def version_6(cls, node, **kwargs):
+    return cls._common(node, kwargs["ctx"], broadcast=1)
+
+  @classmethod
+  def version_7(cls, node, **kwargs):
+    return cls._common(node, kwargs["ctx"])
+
+  @classmethod
+  def version_9(cls, node, **kwargs):
+    return cls._common(node, kwargs["ctx"])
+
+  @classmethod
+  def version_11(cls, node, **kwargs):
+    return cls._common(node, kwargs["ctx"])
+
+  @classmethod
+  def version_13(cls, node, **kwargs):
+    return cls._common(node, kwargs["ctx"])
@@ -3,12 +3,12 @@ from .conv_mixin import ConvMixin
 
 class PoolMixin(object):
 
-  @staticmethod
-  def args_check(node, **kwargs):
+  @classmethod
+  def args_check(cls, node, **kwargs):
     if "count_include_pad" in kwargs:
       if cls.ONNX_OP != "AveragePool":
         raise RuntimeError("count_include_pad is only for AveragePool.")
-      if cls.SINCE_VERSION < 7:
+      if kwargs["ctx"].since_version(cls) < 7:
         raise RuntimeError("count_include_pad is added since version 7.")
 
   @classmethod
@@ -25,6 +25,7 @@ class PoolMixin(object):
         pads=pads,
         kernel_shape=kernel_shape,
         strides=strides,
+        ctx=kwargs["ctx"],
         **node_kwargs)
 
   @classmethod
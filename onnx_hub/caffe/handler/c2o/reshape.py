@@ -1,7 +1,6 @@
-from onnx_tf.common import exception
 from onnx_hub.caffe.handler.caffe2onnx_handler import Caffe2OnnxHandler
-from onnx_tf.handlers.handler import onnx_op
-from onnx_tf.handlers.handler import tf_op
+from onnx_hub.caffe.handler.handler import onnx_op
+from onnx_hub.caffe.handler.handler import tf_op
 
 
 @onnx_op("Reshape")
@@ -10,4 +9,6 @@ class Reshape(Caffe2OnnxHandler):
 
   @classmethod
   def version_5(cls, node, **kwargs):
-    return cls.make_node_from_caffe_node(node, [node.bottom[0], node.name+'_0'])
+    return cls.make_node_from_caffe_node(
+        node, [node.bottom[0], node.name+'_0'],
+        ctx=kwargs["ctx"])
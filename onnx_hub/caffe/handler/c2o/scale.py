@@ -0,0 +1,34 @@
+from onnx_hub.caffe.handler.caffe2onnx_handler import Caffe2OnnxHandler
+from onnx_hub.caffe.handler.handler import onnx_op
+from onnx_hub.caffe.handler.handler import tf_op
+from .batch_norm_mixin import BatchNormMixin
+
+
+@onnx_op("BatchNormalization")
+@tf_op("Scale")
+class Scale(BatchNormMixin, Caffe2OnnxHandler):
+  """
+    Converts Scale layers not folded into the layer before them, as a
+    BatchNormalization with zero mean, unit variance and zero epsilon.
+    Only scales by a blob along axis 1 are supported.
+  """
+
+  @classmethod
+  def args_check(cls, node, **kwargs):
+    if len(node.bottom) != 1:
+      raise RuntimeError("Scale by a second bottom is not supported.")
+    if node.scale_param.axis != 1 or node.scale_param.num_axes != 1:
+      raise RuntimeError("Scale is only supported along axis 1.")
+    super(Scale, cls).args_check(node, **kwargs)
+
+  @classmethod
+  def version_6(cls, node, **kwargs):
+    return cls.batch_norm_op(node, 0., is_test=1, **kwargs)
+
+  @classmethod
+  def version_7(cls, node, **kwargs):
+    return cls.batch_norm_op(node, 0., **kwargs)
+
+  @classmethod
+  def version_9(cls, node, **kwargs):
+    return cls.batch_norm_op(node, 0., **kwargs)
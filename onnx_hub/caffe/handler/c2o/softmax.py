@@ -1,6 +1,6 @@
 from onnx_hub.caffe.handler.caffe2onnx_handler import Caffe2OnnxHandler
-from onnx_tf.handlers.handler import onnx_op
-from onnx_tf.handlers.handler import tf_op
+from onnx_hub.caffe.handler.handler import onnx_op
+from onnx_hub.caffe.handler.handler import tf_op
 
 
 @onnx_op("Softmax")
@@ -9,4 +9,6 @@ class Softmax(Caffe2OnnxHandler):
 
   @classmethod
   def version_1(cls, node, **kwargs):
-    return cls.make_node_from_caffe_node(node, [node.bottom[0]], axis=1)
+    return cls.make_node_from_caffe_node(
+        node, [node.bottom[0]], axis=1,
+        ctx=kwargs["ctx"])
@@ -9,10 +9,10 @@ import onnx
 from onnx import checker
 from onnx import helper
 
-from onnx_tf.handlers.handler import Handler
-from onnx_tf.common import deprecated
-from onnx_tf.common import get_perm_from_formats
-from onnx_tf.common import get_unique_suffix
+from onnx_hub.caffe.handler.handler import Handler
+
+# Checker contexts per (domain, version), c.f. Caffe2OnnxHandler.check_node.
+_checker_contexts = {}
 
 
 class Caffe2OnnxHandler(Handler):
@@ -43,6 +43,7 @@ class Caffe2OnnxHandler(Handler):
                 doc_string=None,
                 version=0,
                 should_check=True,
+                ctx=None,
                 **kwargs):
     """ Make a NodeProto from scratch.
     The main api is same to onnx.helper.make_node without any default value.
@@ -52,14 +53,20 @@ class Caffe2OnnxHandler(Handler):
     :param outputs: Outputs names.
     :param name: optional unique identifier.
     :param doc_string: optional documentation string.
-    :param version: Version used for check node. Default is cls.VERSION.
+    :param version: Version used for check node. Default is the version
+      of the handler in ctx.
     :param should_check: Should check flag.
     Should set to False if is an unimplemented customized op.
+    :param ctx: ConversionContext. Nodes are not checked if its check_nodes
+      is False.
     :param kwargs: Other args.
     :return: NodeProto.
     """
     node = helper.make_node(op_type, inputs, outputs, name, doc_string,
                             **kwargs)
+    if ctx is not None:
+      version = version or ctx.version(cls)
+      should_check = should_check and ctx.check_nodes
     if should_check:
       cls.check_node(node, version)
     else:
@@ -76,6 +83,7 @@ class Caffe2OnnxHandler(Handler):
                                doc_string=None,
                                version=0,
                                should_check=True,
+                               ctx=None,
                                **kwargs):
     """ Helper method to make node.
     The main api is almost same to onnx.helper.make_node with default value
@@ -87,9 +95,12 @@ class Caffe2OnnxHandler(Handler):
     :param op_type: ONNX op name. Default is cls.ONNX_OP.
     :param name: Node name. Default is node.name.
     :param doc_string: optional documentation string.
-    :param version: Version used for check node. Default is cls.VERSION.
+    :param version: Version used for check node. Default is the version
+      of the handler in ctx.
     :param should_check: Should check flag.
     Should set to False if is an unimplemented customized op.
+    :param ctx: ConversionContext. Nodes are not checked if its check_nodes
+      is False.
     :param kwargs: Other args.
     :return: NodeProto.
     """
@@ -103,10 +114,13 @@ class Caffe2OnnxHandler(Handler):
         doc_string=doc_string,
         **kwargs)
 
+    if ctx is not None:
+      version = version or ctx.version(cls)
+      should_check = should_check and ctx.check_nodes
     if should_check:
       cls.check_node(onnx_node, version)
     else:
-      warnings.warn("Skipped check for {}.".format(node.op_type))
+      warnings.warn("Skipped check for {}.".format(onnx_node.op_type))
 
     return onnx_node
 
@@ -115,8 +129,11 @@ class Caffe2OnnxHandler(Handler):
     version = version or cls.VERSION
     if version == 0:
       raise ValueError("version can not be 0.")
-    ctx = checker.C.CheckerContext()
-    ctx.ir_version = onnx.IR_VERSION
-    ctx.opset_imports = {cls.DOMAIN: version}
+    ctx = _checker_contexts.get((cls.DOMAIN, version))
+    if ctx is None:
+      ctx = checker.C.CheckerContext()
+      ctx.ir_version = onnx.IR_VERSION
+      ctx.opset_imports = {cls.DOMAIN: version}
+      _checker_contexts[(cls.DOMAIN, version)] = ctx
     checker.check_node(node, ctx=ctx)
 
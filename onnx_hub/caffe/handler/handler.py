@@ -0,0 +1,81 @@
+import warnings
+
+from onnx import defs
+
+
+class Handler(object):
+  """ This class is the base of caffe2onnx handlers.
+  It provides the dispatch of onnx_tf.handlers.handler.Handler without
+  importing onnx_tf, so converting Caffe models does not load TensorFlow.
+  Handlers implement `version_<n>` methods, and `handle` calls the one
+  matching the since version of the conversion context.
+  """
+
+  ONNX_OP = None
+  # Caffe layer types handled, named after the onnx_tf frontend attribute.
+  TF_OP = []
+
+  DOMAIN = defs.ONNX_DOMAIN
+  VERSION = 0
+  SINCE_VERSION = 0
+
+  @classmethod
+  def check_cls(cls):
+    if not cls.ONNX_OP:
+      warnings.warn(
+          "{} doesn't have ONNX_OP. "
+          "Please use onnx_op decorator to register ONNX_OP.".format(
+              cls.__name__))
+
+  @classmethod
+  def args_check(cls, node, **kwargs):
+    """ Check args. e.g. if shape info is in graph.
+    Raise exception if failed.
+
+    :param node: LayerParameter object.
+    :param kwargs: Other args.
+    """
+    pass
+
+  @classmethod
+  def handle(cls, node, **kwargs):
+    """ Main method in handler. It will find corresponding versioned handle
+    method, whose name format is `version_%d`. So prefix `version_` is
+    reserved in handler subclass.
+
+    :param node: LayerParameter object.
+    :param kwargs: Other args. `ctx` is the ConversionContext.
+    :return: NodeProto or list of NodeProto.
+    """
+    ctx = kwargs["ctx"]
+    since_version = ctx.since_version(cls)
+    ver_handle = getattr(cls, "version_{}".format(since_version), None)
+    if ver_handle:
+      cls.args_check(node, **kwargs)
+      return ver_handle(node, **kwargs)
+    ctx.op_unimplemented(node.type, since_version)
+    return None
+
+
+def domain(d):
+  return property_register("DOMAIN", d)
+
+
+def onnx_op(op):
+  return property_register("ONNX_OP", op)
+
+
+def tf_op(op):
+  ops = op
+  if not isinstance(ops, list):
+    ops = [ops]
+  return property_register("TF_OP", ops)
+
+
+def property_register(name, value):
+
+  def deco(cls):
+    setattr(cls, name, value)
+    return cls
+
+  return deco
@@ -7,18 +7,61 @@ from onnx import TensorProto
 from onnx import ValueInfoProto
 from onnx import numpy_helper
 from onnx.helper import make_graph
-from onnx.helper import make_tensor
 from onnx.helper import make_tensor_value_info
 from onnx.helper import mapping
 
-from onnx_tf.common import attr_converter
-from onnx_tf.common import attr_translator
-from onnx_tf.common import data_type
-from onnx_tf.common import IS_PYTHON3
-
+from onnx_hub.caffe.blob_decoder import blob_to_array
+from onnx_hub.caffe.folding import fold_consts
 from onnx_hub.caffe.proto.caffe_pb2 import LayerParameter
 
 
+def layer_consts(node, weights_layer=None, fused=()):
+  """ Get the consts a Caffe layer adds to the graph, c.f.
+  IRGraph.add_node.
+
+  :param node: LayerParameter object.
+  :param weights_layer: Optional layer to take blobs from instead of node,
+    e.g. a CaffeModelLayer. Its blobs are only decoded here.
+  :param fused: List of (LayerParameter, layer holding its blobs) of the
+    layers folded into node, c.f. folding.plan_folds.
+  :return: List of (name, numpy array).
+  """
+  if node.type in ["Input", "Data"]:
+    return []
+  if node.type == 'Reshape':
+    return [(node.name+'_0',
+             np.array(node.reshape_param.shape.dim, dtype="i8"))]
+  consts = []
+  blobs = (weights_layer if weights_layer is not None else node).blobs
+  np_blobs = [blob_to_array(blob) for blob in blobs]
+  if node.type == 'InnerProduct' and np_blobs:
+    np_blobs = inner_product_blobs(node, np_blobs)
+  if np_blobs and (fused or node.type in ["BatchNorm", "Scale"]):
+    np_blobs = fold_consts(node, np_blobs, fused)
+  for blob_idx, np_blob in enumerate(np_blobs):
+    consts.append((node.name+'_'+str(blob_idx), np_blob))
+  return consts
+
+
+def inner_product_blobs(node, np_blobs):
+  """ Get the Gemm weights and bias of an InnerProduct layer.
+  Weights keep their Caffe layout, reshaped without copying to 2D as
+  legacy blobs are 4D. A zero bias is made if the layer has none.
+
+  :param node: LayerParameter object.
+  :param np_blobs: Its blobs as numpy arrays.
+  :return: List of numpy arrays [weights, bias].
+  """
+  num_output = node.inner_product_param.num_output
+  if node.inner_product_param.transpose:
+    weights = np_blobs[0].reshape(-1, num_output)
+  else:
+    weights = np_blobs[0].reshape(num_output, -1)
+  bias = (np_blobs[1].reshape(-1) if len(np_blobs) > 1 else
+          np.zeros(num_output, weights.dtype))
+  return [weights, bias]
+
+
 class IRNode(object):
 
   def __init__(self,
@@ -58,27 +101,44 @@ class IRGraph(object):
   This class holds all information ONNX graph needs.
   """
 
-  def __init__(self, name=None, graph_proto=None):
+  def __init__(self,
+               name=None,
+               graph_proto=None,
+               initializers_as_inputs=True):
+    """
+    :param initializers_as_inputs: Also declare consts as graph inputs, as
+      required before IR version 4. Otherwise only placeholders are
+      inputs, and backends may treat consts as constants.
+    """
     self._name = name or ""
+    self._initializers_as_inputs = initializers_as_inputs
     self._nodes = []
     self._var_names = []
     self._output_names = []
     self._placeholer_names = []
     self._consts = {}
+    # Initializers already written out by flush_consts, and the dtype and
+    # shape of the consts they were made from.
+    self._initializers = []
+    self._flushed_consts = []
 
     self._nodes_proto = []
     self._data_type_cast_map = {}
+    # Shapes of blobs known before conversion, c.f. set_shapes.
+    self._shapes = {}
 
   # This list holds the protobuf objects of type ValueInfoProto
   # representing the input to the converted ONNX graph.
   @property
   def inputs(self):
     inputs = []
-    for name, value in self._consts.items():
-      inputs.append([name, value.dtype, value.shape])
+    if self._initializers_as_inputs:
+      inputs.extend(list(entry) for entry in self._flushed_consts)
+      for name, value in self._consts.items():
+        inputs.append([name, value.dtype, value.shape])
     for ph in self._placeholer_names:
       # treat placeholder as fp32
-      inputs.append([ph, np.dtype('f4'), [u'?']*4])
+      inputs.append([ph, np.dtype('f4'), self._shapes.get(ph, [u'?']*4)])
     return inputs
 
   @property
@@ -104,7 +164,8 @@ class IRGraph(object):
   def output_proto(self):
     out_proto = []
     for output_name in self.output_names:
-      proto = make_tensor_value_info(output_name, TensorProto.FLOAT, [u'?']*4)
+      proto = make_tensor_value_info(output_name, TensorProto.FLOAT,
+                                     self._shapes.get(output_name, [u'?']*4))
       out_proto.append(proto)
     return out_proto
 
@@ -125,14 +186,44 @@ class IRGraph(object):
   def consts(self):
     return self._consts
 
+  # Number of bytes held by consts not flushed yet.
+  @property
+  def pending_const_bytes(self):
+    return sum(value.nbytes for value in self._consts.values())
+
+  # Names of all consts, including those flushed to external data,
+  # whose values are no longer in consts.
+  @property
+  def const_names(self):
+    return set(self._consts) | set(
+        entry[0] for entry in self._flushed_consts)
+
+  # Number of elements of all consts, including flushed ones.
+  @property
+  def param_count(self):
+    count = sum(value.size for value in self._consts.values())
+    for _, _, shape in self._flushed_consts:
+      count += int(np.prod(shape))
+    return count
+
+  # This list holds the NodeProto made by handlers, in topological
+  # order. Graph passes rewrite it in place, c.f. onnx_hub.caffe.passes.
+  @property
+  def node_protos(self):
+    return self._nodes_proto
+
+  # Shapes of blobs known before conversion, c.f. set_shapes.
+  @property
+  def shapes(self):
+    return self._shapes
+
+  # Initializers are serialized through raw_data straight from the
+  # numpy buffers instead of going through python lists of values.
   @property
   def initializer_proto(self):
     init_proto = []
     for name, value in self._consts.items():
-      onnx_dtype = mapping.NP_TYPE_TO_TENSOR_TYPE[value.dtype]
-      proto = make_tensor(
-        name=name, data_type=onnx_dtype, dims=np.shape(value), vals=value.flatten())
-      init_proto.append(proto)
+      init_proto.append(numpy_helper.from_array(value, name))
     return init_proto
 
   # A map holds nodes name and new data type. Will be used to
@@ -142,30 +233,42 @@ class IRGraph(object):
     return self._data_type_cast_map
 
   # This list holds the protobuf objects of type ValueInfoProto
-  # representing the all nodes' outputs to the converted ONNX graph.
-  #@property
-  #def value_info_proto(self):
+  # representing the all nodes' outputs to the converted ONNX graph,
+  # except graph outputs, for those whose shape is known.
+  @property
+  def value_info_proto(self):
+    value_info = []
+    seen = set(self._output_names)
+    for node_proto in self._nodes_proto:
+      for output_name in node_proto.output:
+        if output_name in seen or output_name not in self._shapes:
+          continue
+        seen.add(output_name)
+        value_info.append(make_tensor_value_info(
+            output_name, TensorProto.FLOAT, self._shapes[output_name]))
+    return value_info
+
+  def add_node(self, node, weights_layer=None, fused=()):
+    """ Add a Caffe layer to the graph.
 
-  def add_node(self, node):
+    :param node: LayerParameter object.
+    :param weights_layer: Optional layer to take blobs from instead of node,
+      e.g. a CaffeModelLayer. Its blobs are only decoded here.
+    :param fused: List of (LayerParameter, layer holding its blobs) of the
+      layers folded into node, c.f. layer_consts.
+    """
     if isinstance(node, LayerParameter):
       if node.type in ["Input", "Data"]:
         for top in node.top:
-          self._placeholer_names.append(top)
+          self.add_placeholder(top)
         return
-      elif node.type == 'Reshape':
-        self.add_const(node.name+'_0',
-                np.array(node.reshape_param.shape.dim, dtype="i4"))
+      for name, value in layer_consts(node, weights_layer, fused):
+        self.add_const(name, value)
+      if node.type == 'Reshape':
         return
 
       ir_node = IRNode(node, node.name, node.type, node.bottom, node.top)
       self._nodes.append(ir_node)
-      for blob_idx in range(len(node.blobs)):
-        blob = node.blobs[blob_idx]
-        np_blob = np.array(blob.data, dtype="f4")
-        np_blob = np.reshape(np_blob, blob.shape.dim)
-        if node.type == 'InnerProduct':
-          np_blob = np_blob.transpose()
-        self.add_const(node.name+'_'+str(blob_idx), np_blob)
 
       for bottom in node.bottom:
         self.add_var(bottom)
@@ -175,6 +278,19 @@ class IRGraph(object):
     else:
       raise RuntimeError("Unsupported node type.")
 
+  def add_placeholder(self, name):
+    self._placeholer_names.append(name)
+    self.add_var(name)
+
+  def set_shapes(self, shapes):
+    """ Set the shapes of blobs, c.f. shape_inference.infer_shapes.
+    They are declared for inputs, outputs and node outputs, which are
+    otherwise of unknown shape.
+
+    :param shapes: Dict of blob name to list of dims.
+    """
+    self._shapes = dict(shapes)
+
   def add_var(self, var_name):
     if var_name not in self._var_names:
       self._var_names.append(var_name)
@@ -182,6 +298,20 @@ class IRGraph(object):
   def add_const(self, name, data):
     self._consts[name] = data
 
+  def remove_const(self, name):
+    """ Remove a const, and its initializer if it was flushed. Its payload
+    stays in the external data file.
+
+    :param name: Const name.
+    """
+    if name in self._consts:
+      del self._consts[name]
+      return
+    self._initializers = [
+        tensor for tensor in self._initializers if tensor.name != name]
+    self._flushed_consts = [
+        entry for entry in self._flushed_consts if entry[0] != name]
+
   def set_output(self, output_names):
     for output_name in output_names:
       if output_name in self._var_names:
@@ -194,6 +324,41 @@ class IRGraph(object):
       node_proto = [node_proto]
     self._nodes_proto.extend(node_proto)
 
-  def make_graph_proto(self):
+  def make_initializer_proto(self, external_data=None):
+    """ Make initializers, optionally storing them as external data.
+
+    :param external_data: Optional ExternalDataWriter to write payloads to.
+    :return: List of TensorProto.
+    """
+    if external_data is None:
+      return self._initializers + self.initializer_proto
+    init_proto = list(self._initializers)
+    for name, value in self._consts.items():
+      init_proto.append(external_data.make_tensor(name, value))
+    return init_proto
+
+  def flush_consts(self, external_data):
+    """ Write all pending consts to external data and release them.
+    Their initializers are kept, and so are their inputs, if any.
+
+    :param external_data: ExternalDataWriter to write payloads to.
+    """
+    for name, value in self._consts.items():
+      self._initializers.append(external_data.make_tensor(name, value))
+      self._flushed_consts.append((name, value.dtype, value.shape))
+    self._consts.clear()
+
+  def make_graph_proto(self, external_data=None, initializer=None):
+    """ Make the GraphProto.
+
+    :param external_data: Optional ExternalDataWriter, c.f.
+      make_initializer_proto.
+    :param initializer: Initializers made by make_initializer_proto.
+      Made from external_data if not given.
+    :return: GraphProto.
+    """
+    if initializer is None:
+      initializer = self.make_initializer_proto(external_data)
     return make_graph(self._nodes_proto, self._name, self.input_proto,
-                      self.output_proto, initializer=self.initializer_proto)
+                      self.output_proto, initializer=initializer,
+                      value_info=self.value_info_proto)
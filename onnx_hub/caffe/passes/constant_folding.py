@@ -0,0 +1,82 @@
+import numpy as np
+from onnx.helper import mapping
+
+from onnx_hub.caffe.passes.graph_pass import GraphPass
+from onnx_hub.caffe.passes.graph_pass import get_attribute
+from onnx_hub.caffe.passes.graph_pass import graph_pass
+from onnx_hub.caffe.passes.graph_pass import is_written
+
+
+def _reshape(node, x, shape=None):
+  shape = get_attribute(node, "shape") if shape is None else shape.tolist()
+  shape = [x.shape[idx] if dim == 0 else dim for idx, dim in enumerate(shape)]
+  return x.reshape(shape)
+
+
+def _flatten(node, x):
+  axis = get_attribute(node, "axis", 1)
+  axis = axis + x.ndim if axis < 0 else axis
+  return x.reshape(int(np.prod(x.shape[:axis])), -1)
+
+
+def _unsqueeze(node, x, axes=None):
+  axes = get_attribute(node, "axes") if axes is None else axes.tolist()
+  for axis in sorted(axis + x.ndim + 1 if axis < 0 else axis
+                     for axis in axes):
+    x = np.expand_dims(x, axis)
+  return x
+
+
+def _squeeze(node, x, axes=None):
+  axes = get_attribute(node, "axes") if axes is None else axes.tolist()
+  return np.squeeze(x, axis=None if axes is None else tuple(axes))
+
+
+def _cast(node, x):
+  return x.astype(mapping.TENSOR_TYPE_TO_NP_TYPE[get_attribute(node, "to")])
+
+
+# ONNX op type to function(node, *input values) returning its output value.
+_FOLDERS = {
+    "Add": lambda node, a, b: a + b,
+    "Cast": _cast,
+    "Concat": lambda node, *xs: np.concatenate(
+        xs, axis=get_attribute(node, "axis", 0)),
+    "Flatten": _flatten,
+    "Identity": lambda node, x: x,
+    "Mul": lambda node, a, b: a * b,
+    "Reshape": _reshape,
+    "Squeeze": _squeeze,
+    "Sub": lambda node, a, b: a - b,
+    "Transpose": lambda node, x: np.transpose(x, get_attribute(node, "perm")),
+    "Unsqueeze": _unsqueeze,
+}
+
+
+@graph_pass("fold_constants")
+class FoldConstants(GraphPass):
+  """ Computes nodes whose inputs are all consts held in memory, and
+  replaces them with a const holding their output.
+  """
+
+  @classmethod
+  def run(cls, ir_graph):
+    nodes = ir_graph.node_protos
+    consts = ir_graph.consts
+    outputs = set(ir_graph.output_names)
+    folded = 0
+    idx = 0
+    while idx < len(nodes):
+      node = nodes[idx]
+      if (node.op_type not in _FOLDERS or len(node.output) != 1 or
+          node.output[0] in outputs or
+          not all(name in consts for name in node.input) or
+          is_written(nodes, idx + 1, node.output[0])):
+        idx += 1
+        continue
+      value = _FOLDERS[node.op_type](node, *[consts[name]
+                                             for name in node.input])
+      ir_graph.add_const(node.output[0], np.asarray(value))
+      del nodes[idx]
+      folded += 1
+    return folded
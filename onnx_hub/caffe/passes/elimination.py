@@ -0,0 +1,100 @@
+import numbers
+
+from onnx_hub.caffe.passes.graph_pass import GraphPass
+from onnx_hub.caffe.passes.graph_pass import consumers
+from onnx_hub.caffe.passes.graph_pass import graph_pass
+from onnx_hub.caffe.passes.graph_pass import is_written
+from onnx_hub.caffe.passes.graph_pass import replace_input
+
+
+def _is_input_rewritten(nodes, idx, node):
+  """ Tell if readers of the output of nodes[idx] can not read its input
+  instead, because a later node writes the input. In-place nodes are
+  always removable.
+  """
+  return (node.input[0] != node.output[0] and
+          is_written(nodes, idx + 1, node.input[0]))
+
+
+@graph_pass("eliminate_identity")
+class EliminateIdentity(GraphPass):
+  """ Removes Identity nodes, and Dropout nodes whose mask is unused,
+  which are identities at inference time.
+  """
+
+  @classmethod
+  def run(cls, ir_graph):
+    nodes = ir_graph.node_protos
+    outputs = set(ir_graph.output_names)
+    readers = consumers(nodes)
+    removed = 0
+    idx = 0
+    while idx < len(nodes):
+      node = nodes[idx]
+      if (node.op_type not in ["Identity", "Dropout"] or
+          node.output[0] in outputs or
+          any(name in readers or name in outputs
+              for name in node.output[1:]) or
+          _is_input_rewritten(nodes, idx, node)):
+        idx += 1
+        continue
+      replace_input(nodes, idx + 1, node.output[0], node.input[0])
+      del nodes[idx]
+      removed += 1
+    return removed
+
+
+@graph_pass("eliminate_nop_reshape")
+class EliminateNopReshape(GraphPass):
+  """ Removes Reshape and Flatten nodes whose input already has the
+  shape of their output, according to the inferred shapes.
+  """
+
+  @classmethod
+  def run(cls, ir_graph):
+    nodes = ir_graph.node_protos
+    shapes = ir_graph.shapes
+    outputs = set(ir_graph.output_names)
+    removed = 0
+    idx = 0
+    while idx < len(nodes):
+      node = nodes[idx]
+      input_shape = shapes.get(node.input[0]) if node.input else None
+      output_shape = shapes.get(node.output[0])
+      if (node.op_type not in ["Reshape", "Flatten"] or
+          node.output[0] in outputs or input_shape is None or
+          list(input_shape) != list(output_shape or []) or
+          not all(isinstance(dim, numbers.Integral) for dim in input_shape) or
+          _is_input_rewritten(nodes, idx, node)):
+        idx += 1
+        continue
+      replace_input(nodes, idx + 1, node.output[0], node.input[0])
+      del nodes[idx]
+      removed += 1
+    return removed
+
+
+@graph_pass("eliminate_dead_nodes")
+class EliminateDeadNodes(GraphPass):
+  """ Removes nodes none of the graph outputs depend on, then consts no
+  node reads.
+  """
+
+  @classmethod
+  def run(cls, ir_graph):
+    nodes = ir_graph.node_protos
+    live = set(ir_graph.output_names)
+    kept = []
+    for node in reversed(nodes):
+      if any(name in live for name in node.output):
+        kept.append(node)
+        live.update(node.input)
+    removed = len(nodes) - len(kept)
+    if removed:
+      kept.reverse()
+      del nodes[:]
+      nodes.extend(kept)
+    for name in ir_graph.const_names - live:
+      ir_graph.remove_const(name)
+      removed += 1
+    return removed
@@ -0,0 +1,124 @@
+import numpy as np
+
+from onnx_hub.caffe.passes.graph_pass import GraphPass
+from onnx_hub.caffe.passes.graph_pass import consumers
+from onnx_hub.caffe.passes.graph_pass import get_attribute
+from onnx_hub.caffe.passes.graph_pass import graph_pass
+
+
+@graph_pass("fuse_consecutive_reshapes")
+class FuseConsecutiveReshapes(GraphPass):
+  """ Makes a Reshape read the input of the Reshape before it, when it is
+  the only reader of its output and its own shape does not copy dims
+  with 0. The first Reshape is left to eliminate_dead_nodes.
+  """
+
+  @classmethod
+  def run(cls, ir_graph):
+    nodes = ir_graph.node_protos
+    consts = ir_graph.consts
+    outputs = set(ir_graph.output_names)
+    readers = consumers(nodes)
+    producers = {}
+    fused = 0
+    for idx, node in enumerate(nodes):
+      producer_idx = producers.get(node.input[0]) if node.input else None
+      for name in node.output:
+        producers[name] = idx
+      if node.op_type != "Reshape" or producer_idx is None:
+        continue
+      producer = nodes[producer_idx]
+      if (producer.op_type != "Reshape" or len(node.input) != 2 or
+          node.input[0] in outputs or len(readers[node.input[0]]) != 1 or
+          node.input[1] not in consts or 0 in consts[node.input[1]]):
+        continue
+      # The input of the first Reshape must not be written in between,
+      # e.g. by a Caffe in-place layer.
+      if any(producer.input[0] in nodes[between].output
+             for between in range(producer_idx, idx)):
+        continue
+      node.input[0] = producer.input[0]
+      fused += 1
+    return fused
+
+
+@graph_pass("fuse_bias_add")
+class FuseBiasAdd(GraphPass):
+  """ Fuses an Add of a per channel const into the bias of the Conv or
+  Gemm before it, when it is the only reader of its output.
+  """
+
+  @classmethod
+  def run(cls, ir_graph):
+    nodes = ir_graph.node_protos
+    consts = ir_graph.consts
+    outputs = set(ir_graph.output_names)
+    readers = consumers(nodes)
+    fused = 0
+    idx = 0
+    while idx < len(nodes):
+      node = nodes[idx]
+      add_idx = cls._fusable_add(ir_graph, node, readers, outputs)
+      if add_idx is None:
+        idx += 1
+        continue
+      add = nodes[add_idx]
+      addend = consts[[name for name in add.input
+                       if name != node.output[0]][0]].reshape(-1)
+      bias_name = node.input[2] if len(node.input) > 2 else None
+      bias = consts[bias_name].reshape(-1) if bias_name is not None else 0
+      new_bias_name = add.output[0] + "_bias"
+      ir_graph.add_const(new_bias_name,
+                         (bias + addend).astype(addend.dtype))
+      if bias_name is None:
+        node.input.append(new_bias_name)
+      else:
+        node.input[2] = new_bias_name
+      node.output[0] = add.output[0]
+      del nodes[add_idx]
+      readers = consumers(nodes)
+      fused += 1
+      idx += 1
+    return fused
+
+  @classmethod
+  def _fusable_add(cls, ir_graph, node, readers, outputs):
+    """ Get the index of the Add node to fuse into node, or None. """
+    consts = ir_graph.consts
+    if node.op_type not in ["Conv", "Gemm"] or node.input[1] not in consts:
+      return None
+    if len(node.input) > 2 and node.input[2] not in consts:
+      return None
+    if node.op_type == "Gemm" and (get_attribute(node, "beta", 1.) != 1. or
+                                   get_attribute(node, "broadcast", 1) != 1):
+      return None
+    output = node.output[0]
+    if output in outputs or len(readers.get(output, [])) != 1:
+      return None
+    add_idx = readers[output][0]
+    add = ir_graph.node_protos[add_idx]
+    if add.op_type != "Add" or len(add.input) != 2 or add.attribute:
+      return None
+    others = [name for name in add.input if name != output]
+    if len(others) != 1 or others[0] not in consts:
+      return None
+    addend = consts[others[0]]
+    weights = consts[node.input[1]]
+    if node.op_type == "Conv":
+      channels = weights.shape[0]
+      # Only (C, 1, ..., 1) and (1, C, 1, ..., 1) add per channel.
+      channel_shapes = [
+          (channels,) + (1,) * (weights.ndim - 2),
+          (1, channels) + (1,) * (weights.ndim - 2),
+      ]
+    else:
+      trans_b = get_attribute(node, "transB", 0)
+      channels = weights.shape[0] if trans_b else weights.shape[1]
+      channel_shapes = [(channels,), (1, channels)]
+    if tuple(addend.shape) not in channel_shapes:
+      return None
+    if (len(node.input) > 2 and np.broadcast(
+        consts[node.input[2]].reshape(-1), addend.reshape(-1)).shape !=
+        (channels,)):
+      return None
+    return add_idx
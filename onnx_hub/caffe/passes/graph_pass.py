@@ -0,0 +1,108 @@
+""" Base class and helpers of graph passes.
+
+A graph pass rewrites an IRGraph in place once its nodes are made: it
+edits IRGraph.node_protos and the consts. Passes only read the values of
+consts still held in memory, so consts already flushed to external data
+are treated as opaque.
+"""
+from onnx import numpy_helper
+
+# Name to pass class, c.f. graph_pass.
+_passes = {}
+
+
+class GraphPass(object):
+  """ This class is the base of graph passes.
+  Passes implement `run`, and are registered by name with the graph_pass
+  decorator.
+  """
+
+  NAME = None
+
+  @classmethod
+  def run(cls, ir_graph):
+    """ Rewrite the graph once.
+
+    :param ir_graph: IRGraph.
+    :return: Number of rewrites made. The pass manager runs passes again
+      until none makes any.
+    """
+    raise NotImplementedError()
+
+
+def graph_pass(name):
+  """ Register a GraphPass subclass under a name. """
+
+  def deco(cls):
+    cls.NAME = name
+    _passes[name] = cls
+    return cls
+
+  return deco
+
+
+def get_pass(name):
+  """ Get a registered pass by name. Raise ValueError if unknown. """
+  if name not in _passes:
+    raise ValueError("Unknown graph pass {}, expected one of {}.".format(
+        name, ", ".join(sorted(_passes))))
+  return _passes[name]
+
+
+def consumers(nodes):
+  """ Map every value name to the indices of the nodes reading it.
+
+  :param nodes: List of NodeProto.
+  :return: Dict of name to list of int.
+  """
+  readers = {}
+  for idx, node in enumerate(nodes):
+    for name in node.input:
+      readers.setdefault(name, []).append(idx)
+  return readers
+
+
+def replace_input(nodes, start, old, new):
+  """ Make the nodes from start on read new instead of old, until a node
+  writes old again, as Caffe in-place layers do.
+
+  :param nodes: List of NodeProto.
+  :param start: Index of the first node to rewrite.
+  :param old: Value name to replace.
+  :param new: Value name to read instead.
+  """
+  for node in nodes[start:]:
+    for idx, name in enumerate(node.input):
+      if name == old:
+        node.input[idx] = new
+    if old in node.output:
+      return
+
+
+def is_written(nodes, start, name):
+  """ Tell if a node from start on writes name, as Caffe in-place layers
+  do. Readers of a value are only rewired when the value they are rewired
+  to is not overwritten in between.
+
+  :param nodes: List of NodeProto.
+  :param start: Index of the first node to look at.
+  :param name: Value name.
+  :return: Bool.
+  """
+  return any(name in node.output for node in nodes[start:])
+
+
+def get_attribute(node, name, default=None):
+  """ Get the value of a node attribute, or default if it is not set. """
+  for attribute in node.attribute:
+    if attribute.name == name:
+      if attribute.HasField("t"):
+        return numpy_helper.to_array(attribute.t)
+      for field in ["f", "i", "s"]:
+        if attribute.HasField(field):
+          return getattr(attribute, field)
+      for field in ["floats", "ints", "strings"]:
+        if getattr(attribute, field):
+          return list(getattr(attribute, field))
+      return default
+  return default
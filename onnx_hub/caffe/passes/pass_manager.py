@@ -0,0 +1,159 @@
+""" Pass manager running graph passes over an IRGraph.
+
+Passes run in a declared order, and the whole sequence is repeated until
+no pass rewrites anything, so passes enabling each other need not be
+ordered perfectly:
+
+  pass_manager = PassManager.from_opt_level(2)
+  onnx_model = caffe_helper.caffe_model_to_onnx_model(
+      weights, model, "prob", pass_manager=pass_manager)
+  print(pass_manager.format_report())
+
+Optimization levels:
+  O0: no pass.
+  O1: removal of identities and of nodes and consts the outputs do not
+    depend on.
+  O2: O1 and constant folding and reshape simplification.
+  O3: O2 and fusion of bias additions into Conv and Gemm.
+"""
+import time
+
+# Pass modules are imported to register their passes.
+from onnx_hub.caffe.passes import constant_folding
+from onnx_hub.caffe.passes import elimination
+from onnx_hub.caffe.passes import fusion
+from onnx_hub.caffe.passes.graph_pass import get_pass
+from onnx_hub.profiler import get_profiler
+
+_O1 = ["eliminate_identity", "eliminate_dead_nodes"]
+_O2 = [
+    "eliminate_identity",
+    "fold_constants",
+    "fuse_consecutive_reshapes",
+    "eliminate_nop_reshape",
+    "eliminate_dead_nodes",
+]
+_O3 = [
+    "eliminate_identity",
+    "fold_constants",
+    "fuse_consecutive_reshapes",
+    "eliminate_nop_reshape",
+    "fuse_bias_add",
+    "eliminate_dead_nodes",
+]
+
+# Pass names per optimization level, in the order they run.
+OPT_LEVELS = {0: [], 1: _O1, 2: _O2, 3: _O3}
+
+
+class PassManager(object):
+  """ Runs graph passes over an IRGraph until a fixpoint and records what
+  each of them did.
+  """
+
+  def __init__(self, passes, max_iterations=10):
+    """
+    :param passes: List of pass names, in the order to run them, c.f.
+      graph_pass.graph_pass.
+    :param max_iterations: Maximum number of times the whole sequence
+      runs. It stops earlier once a run rewrites nothing.
+    """
+    self.passes = [get_pass(name) for name in passes]
+    self.max_iterations = max_iterations
+    self.iterations = 0
+    self._stats = dict((graph_pass.NAME, _PassStats(graph_pass.NAME))
+                       for graph_pass in self.passes)
+
+  @classmethod
+  def from_opt_level(cls, opt_level, **kwargs):
+    """ Make a pass manager running the passes of an optimization level.
+
+    :param opt_level: Int from 0 to 3, c.f. OPT_LEVELS.
+    :param kwargs: Other args of PassManager.
+    :return: PassManager.
+    """
+    if opt_level not in OPT_LEVELS:
+      raise ValueError("Unknown opt_level {}, expected one of {}.".format(
+          opt_level, ", ".join(str(level) for level in sorted(OPT_LEVELS))))
+    return cls(OPT_LEVELS[opt_level], **kwargs)
+
+  def run(self, ir_graph, profiler=None):
+    """ Run the passes over a graph whose outputs are set.
+
+    :param ir_graph: IRGraph, rewritten in place.
+    :param profiler: Optional Profiler. Every pass run is recorded as a
+      `graph_pass` phase with the pass name as op.
+    :return: Total number of rewrites.
+    """
+    profiler = get_profiler(profiler)
+    total = 0
+    for _ in range(self.max_iterations):
+      self.iterations += 1
+      rewrites = 0
+      for graph_pass in self.passes:
+        stats = self._stats[graph_pass.NAME]
+        nodes = len(ir_graph.node_protos)
+        params = ir_graph.param_count
+        start = time.time()
+        with profiler.phase("graph_pass", op=graph_pass.NAME):
+          count = graph_pass.run(ir_graph)
+        stats.add(count, time.time() - start,
+                  len(ir_graph.node_protos) - nodes,
+                  ir_graph.param_count - params)
+        rewrites += count
+      total += rewrites
+      if not rewrites:
+        break
+    return total
+
+  def report(self):
+    """ Summarize what the passes did.
+
+    :return: List of dicts in the order the passes run, with name, runs,
+      rewrites, wall_time in seconds, and node_delta and param_delta, the
+      changes in the number of nodes and of const elements.
+    """
+    return [self._stats[graph_pass.NAME].to_dict()
+            for graph_pass in self.passes]
+
+  def format_report(self):
+    """ Format the report as a table.
+
+    :return: String.
+    """
+    lines = ["{:<26} {:>5} {:>9} {:>10} {:>8} {:>12}".format(
+        "pass", "runs", "rewrites", "wall (ms)", "nodes", "params")]
+    for row in self.report():
+      lines.append("{:<26} {:>5} {:>9} {:>10.2f} {:>+8} {:>+12}".format(
+          row["name"], row["runs"], row["rewrites"], row["wall_time"] * 1000,
+          row["node_delta"], row["param_delta"]))
+    lines.append("{} iteration(s).".format(self.iterations))
+    return "\n".join(lines)
+
+
+class _PassStats(object):
+
+  def __init__(self, name):
+    self.name = name
+    self.runs = 0
+    self.rewrites = 0
+    self.wall_time = 0.
+    self.node_delta = 0
+    self.param_delta = 0
+
+  def add(self, rewrites, wall_time, node_delta, param_delta):
+    self.runs += 1
+    self.rewrites += rewrites
+    self.wall_time += wall_time
+    self.node_delta += node_delta
+    self.param_delta += param_delta
+
+  def to_dict(self):
+    return {
+        "name": self.name,
+        "runs": self.runs,
+        "rewrites": self.rewrites,
+        "wall_time": self.wall_time,
+        "node_delta": self.node_delta,
+        "param_delta": self.param_delta,
+    }
@@ -0,0 +1,68 @@
+""" Cached parsing of prototxt files.
+
+Parsing a prototxt with text_format is slow for deep networks, while
+parsing the same NetParameter from its binary serialization is fast. So
+parsed topologies are kept in binary form, keyed by a hash of the prototxt
+contents: in memory for the lifetime of the process and, if given, in a
+ConversionCache shared across processes. Converting several caffemodels
+of one architecture then parses its prototxt only once.
+"""
+import collections
+import hashlib
+import threading
+
+from google.protobuf import text_format
+
+from onnx_hub.caffe.proto import caffe_pb2
+
+# File suffix of parsed topologies in a ConversionCache.
+CACHE_SUFFIX = ".netparam"
+
+# Number of parsed topologies kept in memory.
+MEMORY_CACHE_SIZE = 32
+
+_parsed = collections.OrderedDict()
+_parsed_lock = threading.Lock()
+
+
+def parse_prototxt(prototxt, cache=None):
+  """ Parse a prototxt, reusing earlier parses of the same contents.
+
+  :param prototxt: The prototxt as a bytes-like object, e.g.
+    InputBuffer.buffer.
+  :param cache: Optional ConversionCache to also keep parsed topologies in.
+  :return: A new NetParameter, which the caller may modify.
+  """
+  digest = hashlib.sha256(prototxt).hexdigest()
+  with _parsed_lock:
+    serialized = _parsed.pop(digest, None)
+    if serialized is not None:
+      _parsed[digest] = serialized
+
+  cache_key = None
+  if serialized is None and cache is not None:
+    cache_key = cache.key([prototxt], converter="prototxt")
+    serialized = cache.get(cache_key, suffix=CACHE_SUFFIX)
+
+  if serialized is None:
+    model = caffe_pb2.NetParameter()
+    text = prototxt.tobytes() if isinstance(prototxt, memoryview) else (
+        bytes(prototxt[:]))
+    text_format.Merge(text.decode("utf-8"), model)
+    serialized = model.SerializeToString()
+    if cache_key is not None:
+      cache.put(cache_key, serialized, suffix=CACHE_SUFFIX)
+  else:
+    model = caffe_pb2.NetParameter()
+    model.ParseFromString(serialized)
+
+  with _parsed_lock:
+    _parsed[digest] = serialized
+    while len(_parsed) > MEMORY_CACHE_SIZE:
+      _parsed.popitem(last=False)
+  return model
+
+
+def clear_memory_cache():
+  with _parsed_lock:
+    _parsed.clear()
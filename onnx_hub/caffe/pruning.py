@@ -0,0 +1,210 @@
+""" Pruning of a Caffe net to the layers run at inference.
+
+Layers are filtered as Caffe does for a net in the TEST phase, with the
+include and exclude rules of each layer checked against the net state.
+Layers only used for training, e.g. losses and Accuracy, are removed, and
+so are the layers reading blobs that no remaining layer produces. Dropout
+is an identity at inference, so it is removed too and the layers after it
+read its bottom instead of its top.
+
+Only the layers the requested outputs depend on are then kept, c.f.
+reachable_layers. Removed layers are never converted, so their weights are
+never decoded.
+"""
+import logging
+
+from onnx_hub.caffe.proto import caffe_pb2
+
+logger = logging.getLogger(__name__)
+
+# Layer types only used for training, which produce nothing inference needs.
+TRAINING_LAYERS = [
+    "Accuracy",
+    "ContrastiveLoss",
+    "EuclideanLoss",
+    "HingeLoss",
+    "InfogainLoss",
+    "MultinomialLogisticLoss",
+    "SigmoidCrossEntropyLoss",
+    "Silence",
+    "SoftmaxWithLoss",
+]
+
+# Layer types passing their bottom through at inference.
+IDENTITY_LAYERS = ["Dropout"]
+
+
+def inference_state(model):
+  """ Get the state to filter a net with at inference: the TEST phase,
+  with the level and stages of the net state in the prototxt.
+
+  :param model: NetParameter from the prototxt.
+  :return: NetState.
+  """
+  state = caffe_pb2.NetState()
+  state.CopyFrom(model.state)
+  state.phase = caffe_pb2.TEST
+  return state
+
+
+def state_meets_rule(state, rule):
+  """ Tell if a net state meets a NetStateRule, c.f. Caffe's
+  Net::StateMeetsRule.
+
+  :param state: NetState.
+  :param rule: NetStateRule.
+  :return: Bool.
+  """
+  if rule.HasField("phase") and rule.phase != state.phase:
+    return False
+  if rule.HasField("min_level") and state.level < rule.min_level:
+    return False
+  if rule.HasField("max_level") and state.level > rule.max_level:
+    return False
+  stages = set(state.stage)
+  if any(stage not in stages for stage in rule.stage):
+    return False
+  if any(stage in stages for stage in rule.not_stage):
+    return False
+  return True
+
+
+def is_included(layer, state):
+  """ Tell if a layer is part of the net in a state, c.f. Caffe's
+  Net::FilterNet. A layer with include rules must meet one of them, and
+  must meet none of its exclude rules.
+
+  :param layer: LayerParameter.
+  :param state: NetState.
+  :return: Bool.
+  """
+  if layer.include:
+    return any(state_meets_rule(state, rule) for rule in layer.include)
+  return not any(state_meets_rule(state, rule) for rule in layer.exclude)
+
+
+def inference_layers(model, state=None):
+  """ Prune the layers of a net to those run at inference.
+
+  :param model: NetParameter from the prototxt.
+  :param state: Optional NetState to filter layers with. Defaults to
+    inference_state(model).
+  :return: Tuple of (list of LayerParameter in prototxt order, dict of
+    aliases). Layers reading the bottom of a removed Dropout are copies
+    rewired to it. Aliases map the tops of removed Dropout layers, and the
+    tops renamed after them, to the blobs holding their final value,
+    c.f. resolve_outputs.
+  """
+  state = inference_state(model) if state is None else state
+  available = set(model.input)
+  # Top of a removed identity layer to the blob readers read instead.
+  aliases = {}
+  layers = []
+  for layer in model.layer:
+    if not is_included(layer, state):
+      logger.info("Layer {} is not in the {} phase.".format(
+          layer.name, caffe_pb2.Phase.Name(state.phase)))
+      continue
+    if layer.type in TRAINING_LAYERS:
+      logger.info("A training layer with name {} type {} has been "
+                  "removed.".format(layer.name, layer.type))
+      continue
+    bottoms = [aliases.get(bottom, bottom) for bottom in layer.bottom]
+    missing = [bottom for bottom in bottoms if bottom not in available]
+    if missing:
+      logger.info("Layer {} has been removed as no layer at inference "
+                  "produces {}.".format(layer.name, ", ".join(missing)))
+      continue
+    if layer.type in IDENTITY_LAYERS and len(bottoms) == 1:
+      logger.info("An identity layer with name {} type {} has been "
+                  "removed.".format(layer.name, layer.type))
+      for top in layer.top:
+        if top != bottoms[0]:
+          aliases[top] = bottoms[0]
+      continue
+
+    tops = list(layer.top)
+    for idx, top in enumerate(tops):
+      # Readers of a blob aliased to this top still need its value from
+      # before this layer, so the top gets a name of its own.
+      if any(alias != top and target == top
+             for alias, target in aliases.items()):
+        tops[idx] = "{}_{}".format(top, layer.name)
+        aliases[top] = tops[idx]
+      else:
+        aliases.pop(top, None)
+    if bottoms != list(layer.bottom) or tops != list(layer.top):
+      rewired = type(layer)()
+      rewired.CopyFrom(layer)
+      rewired.bottom[:] = bottoms
+      rewired.top[:] = tops
+      layer = rewired
+    available.update(layer.top)
+    layers.append(layer)
+  return layers, aliases
+
+
+def detect_outputs(layers, inputs=()):
+  """ Detect the outputs of a net: the blobs written by a layer and read
+  by no layer after it. Inputs of the net are never outputs, even if
+  unread, e.g. the labels of a Data layer.
+
+  :param layers: List of LayerParameter in prototxt order.
+  :param inputs: Names of the net inputs.
+  :return: List of blob names, in the order they are last written.
+  """
+  unread = []
+  for layer in layers:
+    for bottom in layer.bottom:
+      if bottom in unread:
+        unread.remove(bottom)
+    for top in layer.top:
+      if top in unread:
+        unread.remove(top)
+      if top not in inputs and layer.type not in ["Input", "Data"]:
+        unread.append(top)
+  return unread
+
+
+def resolve_outputs(outputs, aliases):
+  """ Resolve the names of requested outputs to the blobs holding their
+  value at the end of the pruned net. The top of a removed Dropout holds
+  the value of the blob it aliases, and a top renamed after an in-place
+  layer holds the value of its new name. Both keep the requested name, so
+  they need an identity from that blob.
+
+  :param outputs: Requested output blob names.
+  :param aliases: Aliases from inference_layers.
+  :return: List of (blob name, output name). They differ for the outputs
+    needing an identity.
+  """
+  return [(aliases.get(output, output), output) for output in outputs]
+
+
+def reachable_layers(layers, outputs, inputs=()):
+  """ Keep the layers the outputs depend on, going backward from them.
+
+  :param layers: List of LayerParameter in prototxt order.
+  :param outputs: Names of the blobs to compute.
+  :param inputs: Names of the net inputs.
+  :return: List of LayerParameter in prototxt order.
+  """
+  produced = set(inputs)
+  for layer in layers:
+    produced.update(layer.top)
+  missing = [output for output in outputs if output not in produced]
+  if missing:
+    raise ValueError("Outputs {} are not produced by any layer.".format(
+        ", ".join(missing)))
+
+  live = set(outputs)
+  kept = []
+  for layer in reversed(layers):
+    if any(top in live for top in layer.top):
+      kept.append(layer)
+      live.update(layer.bottom)
+    else:
+      logger.info("Layer {} has been removed as no output depends on "
+                  "it.".format(layer.name))
+  kept.reverse()
+  return kept
@@ -0,0 +1,202 @@
+""" Static shape inference over Caffe layers.
+
+Shapes start from the inputs declared in the prototxt, i.e. Input layers'
+input_param and the net's input_shape or input_dim, and are propagated
+layer by layer in prototxt order. They describe the tensors of the
+converted ONNX graph, so they follow the converted nodes where those
+differ from Caffe, e.g. pooling rounds its output size down.
+
+A dim is an int, or BATCH_DIM for the batch dim of inputs made dynamic.
+Blobs whose shape can not be inferred, e.g. the outputs of layer types
+without a rule below, are left out, and so is everything computed from
+them.
+"""
+import numbers
+
+import numpy as np
+
+# Symbolic name of dynamic batch dims, c.f. infer_shapes.
+BATCH_DIM = "N"
+
+
+def infer_shapes(model, input_shapes=None, dynamic_batch=False, layers=None):
+  """ Infer the shapes of the blobs of a Caffe net.
+
+  :param model: NetParameter from the prototxt.
+  :param input_shapes: Optional dict of input name to shape, overriding
+    or completing the shapes declared in the prototxt.
+  :param dynamic_batch: Make the first dim of every input dynamic.
+  :param layers: Optional layers to go through instead of those of model,
+    e.g. pruned ones, c.f. pruning.inference_layers.
+  :return: Dict of blob name to list of dims. A blob written by several
+    layers, e.g. in-place ones, maps to its last shape.
+  """
+  input_shapes = input_shapes or {}
+  shapes = {}
+
+  def set_input(name, shape):
+    shape = list(input_shapes.get(name, shape))
+    if dynamic_batch and shape:
+      shape[0] = BATCH_DIM
+    shapes[name] = shape
+
+  net_shapes = _net_input_shapes(model)
+  for idx, name in enumerate(model.input):
+    if name in input_shapes or idx < len(net_shapes):
+      set_input(name, net_shapes[idx] if idx < len(net_shapes) else None)
+
+  for layer in model.layer if layers is None else layers:
+    if layer.type in ["Input", "Data"]:
+      declared = [list(shape.dim) for shape in layer.input_param.shape]
+      for idx, top in enumerate(layer.top):
+        shape = (declared[min(idx, len(declared) - 1)]
+                 if declared else None)
+        if top in input_shapes or shape is not None:
+          set_input(top, shape)
+      continue
+    func = _SHAPE_FUNCS.get(layer.type)
+    bottoms = [shapes.get(bottom) for bottom in layer.bottom]
+    if func is None or not bottoms or any(b is None for b in bottoms):
+      for top in layer.top:
+        shapes.pop(top, None)
+      continue
+    top_shape = func(layer, bottoms)
+    for top in layer.top:
+      if top_shape is None:
+        shapes.pop(top, None)
+      else:
+        shapes[top] = top_shape
+  return shapes
+
+
+def _net_input_shapes(model):
+  if model.input_shape:
+    return [list(shape.dim) for shape in model.input_shape]
+  dims = list(model.input_dim)
+  return [dims[idx:idx + 4] for idx in range(0, len(dims), 4)]
+
+
+def _identity(layer, bottoms):
+  return list(bottoms[0])
+
+
+def _spatial_params(layer, bottom):
+  if layer.type == "Convolution":
+    param = layer.convolution_param
+    kernel = _pair(param.kernel_h, param.kernel_w, param.kernel_size, 1)
+    stride = _pair(param.stride_h, param.stride_w, param.stride, 1)
+    pad = _pair(param.pad_h, param.pad_w, param.pad, 0)
+    dilation = _pair(0, 0, param.dilation, 1)
+  else:
+    param = layer.pooling_param
+    if param.global_pooling:
+      return list(bottom[2:4]), [1, 1], [0, 0], [1, 1]
+    kernel = _pair(param.kernel_h, param.kernel_w, [param.kernel_size], 1)
+    stride = _pair(param.stride_h, param.stride_w, [param.stride], 1)
+    pad = _pair(param.pad_h, param.pad_w, [param.pad], 0)
+    dilation = [1, 1]
+  return kernel, stride, pad, dilation
+
+
+def _pair(h, w, values, default):
+  if h or w:
+    return [h, w]
+  values = [value for value in values if value] or [default]
+  return [values[0], values[-1]]
+
+
+def _sliding_window(layer, bottoms):
+  bottom = bottoms[0]
+  if len(bottom) != 4:
+    return None
+  kernel, stride, pad, dilation = _spatial_params(layer, bottom)
+  spatial = []
+  for size, k, s, p, d in zip(bottom[2:4], kernel, stride, pad, dilation):
+    if not _is_static([size]):
+      return None
+    spatial.append((size + 2 * p - (d * (k - 1) + 1)) // s + 1)
+  channels = (layer.convolution_param.num_output
+              if layer.type == "Convolution" else bottom[1])
+  return [bottom[0], channels] + spatial
+
+
+def _inner_product(layer, bottoms):
+  axis = _axis(layer.inner_product_param.axis, bottoms[0])
+  return list(bottoms[0][:axis]) + [layer.inner_product_param.num_output]
+
+
+def _reshape(layer, bottoms):
+  # Caffe and ONNX agree: 0 copies the input dim and -1 is inferred.
+  bottom = bottoms[0]
+  shape = []
+  copied = []
+  infer = None
+  for idx, dim in enumerate(layer.reshape_param.shape.dim):
+    if dim == 0:
+      if idx >= len(bottom):
+        return None
+      shape.append(bottom[idx])
+      copied.append(idx)
+    elif dim == -1:
+      infer = idx
+      shape.append(-1)
+    else:
+      shape.append(dim)
+  if infer is not None:
+    # Copied dims cancel out, so a dynamic batch dim can be copied.
+    total = [dim for idx, dim in enumerate(bottom) if idx not in copied]
+    known = [dim for idx, dim in enumerate(shape)
+             if idx != infer and idx not in copied]
+    if not _is_static(total + known):
+      return None
+    shape[infer] = int(np.prod(total)) // int(np.prod(known))
+  return shape
+
+
+def _concat(layer, bottoms):
+  axis = _axis(layer.concat_param.axis, bottoms[0])
+  sizes = [bottom[axis] for bottom in bottoms]
+  shape = list(bottoms[0])
+  if not _is_static(sizes):
+    return None
+  shape[axis] = sum(sizes)
+  return shape
+
+
+def _flatten(layer, bottoms):
+  bottom = bottoms[0]
+  axis = _axis(layer.flatten_param.axis, bottom)
+  end_axis = _axis(layer.flatten_param.end_axis, bottom)
+  flattened = bottom[axis:end_axis + 1]
+  if not _is_static(flattened):
+    return None
+  return (list(bottom[:axis]) + [int(np.prod(flattened))] +
+          list(bottom[end_axis + 1:]))
+
+
+def _is_static(dims):
+  return all(isinstance(dim, numbers.Integral) for dim in dims)
+
+
+def _axis(axis, shape):
+  return axis + len(shape) if axis < 0 else axis
+
+
+# Layer type to function(layer, list of bottom shapes) returning the shape
+# of its tops, or None if it can not be inferred.
+_SHAPE_FUNCS = {
+    "BatchNorm": _identity,
+    "Concat": _concat,
+    "Convolution": _sliding_window,
+    "Dropout": _identity,
+    "Eltwise": _identity,
+    "Flatten": _flatten,
+    "InnerProduct": _inner_product,
+    "Pooling": _sliding_window,
+    "ReLU": _identity,
+    "Reshape": _reshape,
+    "Scale": _identity,
+    "Sigmoid": _identity,
+    "Softmax": _identity,
+    "TanH": _identity,
+}
@@ -0,0 +1,72 @@
+""" Minimal protobuf wire-format helpers.
+
+These helpers walk serialized messages field by field without building
+protobuf objects, so large caffemodels can be indexed straight out of a
+memory map. Only the subset of the wire format Caffe uses is handled.
+"""
+import sys
+
+WIRETYPE_VARINT = 0
+WIRETYPE_FIXED64 = 1
+WIRETYPE_LENGTH_DELIMITED = 2
+WIRETYPE_START_GROUP = 3
+WIRETYPE_END_GROUP = 4
+WIRETYPE_FIXED32 = 5
+
+if sys.version_info[0] >= 3:
+  _byte_at = lambda buf, pos: buf[pos]
+else:
+  _byte_at = lambda buf, pos: ord(buf[pos])
+
+
+def decode_varint(buf, pos):
+  """ Decode a base 128 varint.
+
+  :param buf: Buffer supporting indexing, e.g. bytes or mmap.
+  :param pos: Offset of the first byte of the varint.
+  :return: Tuple of (value, offset right after the varint).
+  """
+  result = 0
+  shift = 0
+  while True:
+    b = _byte_at(buf, pos)
+    pos += 1
+    result |= (b & 0x7f) << shift
+    if not b & 0x80:
+      return result, pos
+    shift += 7
+    if shift >= 64:
+      raise ValueError("Too many bytes when decoding varint.")
+
+
+def iter_fields(buf, start, end):
+  """ Iterate over the fields of a serialized message.
+
+  :param buf: Buffer holding the message.
+  :param start: Offset of the first byte of the message.
+  :param end: Offset right after the last byte of the message.
+  :return: Generator of (field_number, wire_type, value_start, value_end).
+    For length-delimited fields the span covers the payload only.
+  """
+  pos = start
+  while pos < end:
+    tag, pos = decode_varint(buf, pos)
+    field_number = tag >> 3
+    wire_type = tag & 0x7
+    if wire_type == WIRETYPE_VARINT:
+      _, value_end = decode_varint(buf, pos)
+    elif wire_type == WIRETYPE_FIXED64:
+      value_end = pos + 8
+    elif wire_type == WIRETYPE_LENGTH_DELIMITED:
+      length, pos = decode_varint(buf, pos)
+      value_end = pos + length
+    elif wire_type == WIRETYPE_FIXED32:
+      value_end = pos + 4
+    else:
+      raise ValueError(
+          "Unsupported wire type {} for field {}.".format(
+              wire_type, field_number))
+    if value_end > end:
+      raise ValueError("Truncated message at field {}.".format(field_number))
+    yield field_number, wire_type, pos, value_end
+    pos = value_end
@@ -0,0 +1,157 @@
+""" Command line interface, c.f. `python -m onnx_hub --help`. """
+from __future__ import print_function
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+
+from onnx_hub import jobs
+
+
+def convert_command(args):
+  manifest = jobs.load_manifest(args.manifest)
+  cache = _make_cache(args)
+  if args.trace_dir and not os.path.isdir(args.trace_dir):
+    os.makedirs(args.trace_dir)
+  for job in manifest:
+    if args.profile:
+      job["profile"] = True
+    if args.trace_dir:
+      job["trace"] = os.path.join(
+          args.trace_dir, os.path.basename(job["output"]) + ".trace.json")
+  job_types = set(job["type"] for job in manifest)
+
+  if args.jobs > 1:
+    pool = multiprocessing.Pool(
+        args.jobs, initializer=jobs.warm_up, initargs=(job_types,))
+    results = pool.imap_unordered(
+        _run_job, [(job, cache, args.force) for job in manifest])
+  else:
+    pool = None
+    jobs.warm_up(job_types)
+    results = (_run_job((job, cache, args.force)) for job in manifest)
+
+  counts = {}
+  try:
+    for result in results:
+      counts[result["status"]] = counts.get(result["status"], 0) + 1
+      print(json.dumps(result, sort_keys=True))
+      sys.stdout.flush()
+  finally:
+    if pool is not None:
+      pool.terminate()
+      pool.join()
+
+  print(
+      "{} converted, {} up to date, {} failed.".format(
+          counts.get("ok", 0), counts.get("skipped", 0),
+          counts.get("error", 0)),
+      file=sys.stderr)
+  return 1 if counts.get("error") else 0
+
+
+def _run_job(args):
+  return jobs.run_job(*args)
+
+
+def daemon_command(args):
+  from onnx_hub import daemon
+  logging.basicConfig(level=logging.INFO)
+  daemon.serve(
+      args.socket, args.jobs, cache=_make_cache(args), force=args.force)
+  return 0
+
+
+def submit_command(args):
+  from onnx_hub import daemon
+  failed = False
+  for result in daemon.submit(args.socket, jobs.load_manifest(args.manifest)):
+    failed = failed or result["status"] == "error"
+    print(json.dumps(result, sort_keys=True))
+    sys.stdout.flush()
+  return 1 if failed else 0
+
+
+def _make_cache(args):
+  if not args.cache_dir:
+    return None
+  from onnx_hub.cache import ConversionCache
+  return ConversionCache(args.cache_dir, max_size=args.cache_size)
+
+
+def _add_conversion_args(parser):
+  parser.add_argument(
+      "-j",
+      "--jobs",
+      type=int,
+      default=multiprocessing.cpu_count(),
+      help="Number of worker processes. Default is the number of CPUs.")
+  parser.add_argument(
+      "--force",
+      action="store_true",
+      help="Convert models even if their outputs are up to date.")
+  parser.add_argument(
+      "--cache-dir", help="Directory of a shared conversion cache.")
+  parser.add_argument(
+      "--cache-size",
+      type=int,
+      default=1 << 30,
+      help="Maximum size of the conversion cache in bytes.")
+
+
+def make_parser():
+  parser = argparse.ArgumentParser(
+      prog="onnx-hub", description="Convert models from and to ONNX.")
+  subparsers = parser.add_subparsers(dest="command")
+
+  convert = subparsers.add_parser(
+      "convert",
+      help="Convert the models listed in a manifest.",
+      description="Convert the models listed in a JSON manifest in a "
+      "process pool, printing one JSON result per model as it finishes. "
+      "Models whose output is newer than their inputs and was converted "
+      "with the same options are skipped, so an interrupted run can "
+      "simply be restarted. Manifest entries are described in "
+      "onnx_hub.jobs.")
+  convert.add_argument("manifest", help="Path of the JSON manifest.")
+  _add_conversion_args(convert)
+  convert.add_argument(
+      "--profile",
+      action="store_true",
+      help="Add the time and peak memory of every conversion phase and "
+      "layer type to the results.")
+  convert.add_argument(
+      "--trace-dir",
+      help="Directory to write a Chrome trace of every conversion to, "
+      "named after its output. Implies --profile.")
+  convert.set_defaults(func=convert_command)
+
+  daemon = subparsers.add_parser(
+      "daemon",
+      help="Serve conversion jobs over a Unix domain socket.",
+      description="Run a conversion daemon whose worker processes keep the "
+      "converters imported between jobs. Jobs are JSON lines, c.f. "
+      "onnx_hub.daemon.")
+  daemon.add_argument("socket", help="Path of the Unix domain socket.")
+  _add_conversion_args(daemon)
+  daemon.set_defaults(func=daemon_command)
+
+  submit = subparsers.add_parser(
+      "submit",
+      help="Send the models listed in a manifest to a running daemon.")
+  submit.add_argument("socket", help="Path of the daemon's socket.")
+  submit.add_argument("manifest", help="Path of the JSON manifest.")
+  submit.set_defaults(func=submit_command)
+  return parser
+
+
+def main(argv=None):
+  parser = make_parser()
+  args = parser.parse_args(argv)
+  if not getattr(args, "func", None):
+    parser.print_help()
+    return 2
+  return args.func(args)
@@ -0,0 +1,148 @@
+""" Long-lived conversion daemon listening on a Unix domain socket.
+
+Worker processes import the converters once at startup, so jobs do not pay
+for importing TensorFlow, onnx_tf or the Caffe protos. Clients send jobs
+as JSON lines, c.f. onnx_hub.jobs, and get one JSON result line back per
+job, in order. `{"type": "ping"}` can be sent to check the daemon is up.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+
+try:
+  import socketserver
+except ImportError:
+  import SocketServer as socketserver
+
+from onnx_hub import jobs
+
+logger = logging.getLogger(__name__)
+
+
+class ConversionServer(socketserver.ThreadingMixIn,
+                       socketserver.UnixStreamServer):
+  """ Serves conversion jobs from a pool of warm worker processes.
+  Each connection is handled in its own thread, and its jobs run in the
+  shared pool.
+
+  Jobs read and write any path the daemon user can, so the socket is only
+  accessible to that user, whatever the umask.
+  """
+
+  daemon_threads = True
+
+  def __init__(self, socket_path, processes=None, cache=None, force=False):
+    _remove_stale_socket(socket_path)
+    socketserver.UnixStreamServer.__init__(self, socket_path,
+                                           _ConversionHandler)
+    self.socket_path = socket_path
+    self.cache = cache
+    self.force = force
+    self.pool = multiprocessing.Pool(
+        processes,
+        initializer=_init_worker,
+        initargs=(sorted(jobs.JOB_INPUTS),))
+
+  def server_bind(self):
+    socketserver.UnixStreamServer.server_bind(self)
+    # Before server_activate starts listening, so no other user can
+    # connect in between.
+    os.chmod(self.server_address, 0o600)
+
+  def run_job(self, job):
+    if job.get("type") == "ping":
+      return {"type": "ping", "status": "ok"}
+    start = time.time()
+    result = self.pool.apply(jobs.run_job, (job, self.cache, self.force))
+    # Time spent queued for a worker plus the conversion itself.
+    result["total_seconds"] = round(time.time() - start, 3)
+    return result
+
+  def server_close(self):
+    socketserver.UnixStreamServer.server_close(self)
+    self.pool.terminate()
+    self.pool.join()
+    if os.path.exists(self.socket_path):
+      os.remove(self.socket_path)
+
+
+class _ConversionHandler(socketserver.StreamRequestHandler):
+
+  def handle(self):
+    for line in iter(self.rfile.readline, b""):
+      if not line.strip():
+        continue
+      try:
+        job = json.loads(line.decode("utf-8"))
+        result = self.server.run_job(job)
+      except Exception as e:
+        result = {"status": "error", "error": "{}: {}".format(
+            type(e).__name__, e)}
+      logger.info("Job {} {} in {}s.".format(
+          result.get("id"), result["status"], result.get("seconds", 0)))
+      self.wfile.write((json.dumps(result, sort_keys=True) +
+                        "\n").encode("utf-8"))
+      self.wfile.flush()
+
+
+def serve(socket_path, processes=None, cache=None, force=False):
+  """ Run a conversion daemon until interrupted.
+
+  :param socket_path: Path of the Unix domain socket to listen on.
+  :param processes: Number of worker processes. Default is the CPU count.
+  :param cache: Optional ConversionCache used by the workers.
+  :param force: Convert even if outputs are up to date.
+  """
+  server = ConversionServer(socket_path, processes, cache, force)
+  signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+  logger.info("Listening on {}.".format(socket_path))
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    server.server_close()
+
+
+def submit(socket_path, job_list):
+  """ Send jobs to a running daemon.
+
+  :param socket_path: Path of the daemon's Unix domain socket.
+  :param job_list: Iterable of job dicts.
+  :return: Generator of result dicts, in the order of job_list.
+  """
+  sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  sock.connect(socket_path)
+  try:
+    rfile = sock.makefile("rb")
+    for job in job_list:
+      sock.sendall((json.dumps(job) + "\n").encode("utf-8"))
+      yield json.loads(rfile.readline().decode("utf-8"))
+  finally:
+    sock.close()
+
+
+def _init_worker(job_types):
+  # Interrupts are handled by the server, which terminates the pool.
+  signal.signal(signal.SIGINT, signal.SIG_IGN)
+  jobs.warm_up(job_types)
+
+
+def _remove_stale_socket(socket_path):
+  if not os.path.exists(socket_path):
+    return
+  sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  try:
+    sock.connect(socket_path)
+  except socket.error:
+    os.remove(socket_path)
+  else:
+    raise RuntimeError("A daemon is already listening on {}.".format(
+        socket_path))
+  finally:
+    sock.close()
@@ -0,0 +1,116 @@
+""" Converter inputs given as paths, buffers or file-like objects.
+
+Inputs are exposed as read-only buffers without copying them where
+possible. Paths and regular files are memory-mapped, in-memory streams
+such as io.BytesIO are viewed through their buffer, and bytes-like
+objects (bytes, bytearray, memoryview, mmap) are used as they are.
+Other file-like objects, e.g. sockets or upload streams, are read once.
+
+On Python 2, str inputs are paths. Wrap bytes in a bytearray, memoryview
+or io.BytesIO to pass them as data.
+"""
+import mmap
+import os
+import sys
+
+if sys.version_info[0] >= 3:
+  _PATH_TYPES = (str,)
+else:
+  _PATH_TYPES = (basestring,)
+
+
+def is_path(source):
+  return isinstance(source, _PATH_TYPES) or hasattr(source, "__fspath__")
+
+
+class InputBuffer(object):
+  """ Read-only buffer over a converter input.
+  The buffer stays valid until `close`. Objects passed in, e.g. open
+  files, are not closed.
+  """
+
+  def __init__(self, source):
+    """
+    :param source: Path, bytes-like object or binary file-like object.
+    """
+    self._file = None
+    # Maps and views made here, released on close.
+    self._owned = []
+    if is_path(source):
+      self._file = open(_fspath(source), "rb")
+      # mmap refuses empty files.
+      self.buffer = self._own(_try_map_file(self._file)) or b""
+    elif hasattr(source, "getbuffer"):
+      view = self._own(source.getbuffer())
+      self.buffer = self._own(view[source.tell():])
+    elif hasattr(source, "read"):
+      self.buffer = self._own(_try_map_file(source)) or source.read()
+    else:
+      self.buffer = source
+    if sys.version_info[0] < 3 and isinstance(self.buffer, bytearray):
+      # Python 2 bytearrays index as ints, unlike str, mmap and memoryview.
+      self.buffer = memoryview(self.buffer)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close()
+
+  def __len__(self):
+    return len(self.buffer)
+
+  def tobytes(self):
+    """ Get the contents as bytes. This copies unless they already are. """
+    if isinstance(self.buffer, bytes):
+      return self.buffer
+    if isinstance(self.buffer, memoryview):
+      return self.buffer.tobytes()
+    return bytes(self.buffer[:])
+
+  def close(self):
+    # Views first, as they pin what they view.
+    for obj in reversed(self._owned):
+      try:
+        if isinstance(obj, mmap.mmap):
+          obj.close()
+        elif hasattr(obj, "release"):
+          obj.release()
+      except BufferError:
+        # Arrays still view the buffer. It is released once the last of
+        # them is.
+        pass
+    self._owned = []
+    if self._file is not None:
+      self._file.close()
+
+  def _own(self, obj):
+    if obj is not None:
+      self._owned.append(obj)
+    return obj
+
+
+def _fspath(source):
+  if hasattr(source, "__fspath__"):
+    return source.__fspath__()
+  return source
+
+
+def _try_map_file(f):
+  """ Memory-map a file object from its current position to its end.
+  Return None if it is not a regular file or is empty.
+  """
+  try:
+    fileno = f.fileno()
+    pos = f.tell()
+  except (AttributeError, IOError, OSError, ValueError):
+    return None
+  # mmap offsets must be page aligned, so only whole files are mapped.
+  if pos != 0:
+    return None
+  try:
+    if os.fstat(fileno).st_size == 0:
+      return None
+    return mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+  except (EnvironmentError, ValueError):
+    return None
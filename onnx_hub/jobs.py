@@ -0,0 +1,227 @@
+""" Conversion jobs shared by the batch CLI and the conversion daemon.
+
+A job is a dict with a `type` and the paths it needs:
+
+  {"type": "caffe2onnx", "weights": ..., "model": ..., "output": ...}
+  {"type": "tf2onnx", "input": ..., "output": ...}
+  {"type": "onnx2tf", "input": ..., "output": ...}
+
+Caffe jobs may also set `external_data` (bool), `memory_budget` (bytes),
+`dynamic_batch` (bool), `opt_level` (0 to 3) and `outputs` (list of blob
+names, detected by default).
+Any job may set `profile` (bool) to add a per-phase profile to its result,
+and `trace` (path) to also write it as a Chrome trace, c.f.
+onnx_hub.profiler. An optional `id` names the job in results and defaults
+to its output.
+
+The options of a job are stored next to its output once converted, c.f.
+options_path, so changing any of them converts the job again.
+"""
+import json
+import logging
+import os
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+# Job keys that do not change the output of a conversion.
+_REPORT_KEYS = ("id", "profile", "trace")
+
+# Input path keys of every job type.
+JOB_INPUTS = {
+    "caffe2onnx": ("weights", "model"),
+    "tf2onnx": ("input",),
+    "onnx2tf": ("input",),
+}
+
+
+def check_job(job):
+  """ Check a job has a known type and all the paths it needs.
+  Raise ValueError if not.
+
+  :param job: Job dict.
+  """
+  job_type = job.get("type")
+  if job_type not in JOB_INPUTS:
+    raise ValueError("Unknown job type {}, expected one of {}.".format(
+        job_type, ", ".join(sorted(JOB_INPUTS))))
+  for key in JOB_INPUTS[job_type] + ("output",):
+    if not job.get(key):
+      raise ValueError("{} job is missing `{}`.".format(job_type, key))
+
+
+def load_manifest(path):
+  """ Load a list of jobs from a JSON manifest.
+  Relative paths are resolved against the manifest's directory.
+
+  :param path: Manifest path.
+  :return: List of job dicts.
+  """
+  with open(path) as f:
+    jobs = json.load(f)
+  if not isinstance(jobs, list):
+    raise ValueError("Manifest must hold a list of jobs.")
+  base_dir = os.path.dirname(os.path.abspath(path))
+  for job in jobs:
+    check_job(job)
+    for key in JOB_INPUTS[job["type"]] + ("output",):
+      job[key] = os.path.join(base_dir, job[key])
+    job.setdefault("id", job["output"])
+  return jobs
+
+
+def options_path(job):
+  """ Get the path of the options a job output was converted with. """
+  return os.path.abspath(job["output"]) + ".options.json"
+
+
+def job_options(job):
+  """ Get the options of a job that its output depends on, i.e. all its
+  keys except those only naming or profiling it.
+
+  :param job: Job dict.
+  :return: Dict.
+  """
+  return dict((key, value) for key, value in job.items()
+              if key not in _REPORT_KEYS)
+
+
+def is_up_to_date(job):
+  """ Whether the output of a job is newer than all of its inputs and was
+  converted with the same options. Outputs are only ever renamed into
+  place once complete, and their options are written after them, so a
+  job interrupted by a crash is never considered up to date.
+  """
+  output = job["output"]
+  if not os.path.exists(output):
+    return False
+  try:
+    with open(options_path(job)) as f:
+      options = json.load(f)
+  except (IOError, OSError, ValueError):
+    return False
+  if options != job_options(job):
+    return False
+  output_mtime = os.path.getmtime(output)
+  return all(
+      os.path.getmtime(job[key]) <= output_mtime
+      for key in JOB_INPUTS[job["type"]])
+
+
+def warm_up(job_types):
+  """ Import the converters of the given job types ahead of the first job.
+  Converters that fail to import are skipped, and their jobs report the
+  error when they run.
+
+  :param job_types: Iterable of job types.
+  """
+  for job_type in job_types:
+    try:
+      _warm_up(job_type)
+    except ImportError as e:
+      logger.warning("Can not warm up {} converter: {}".format(job_type, e))
+
+
+def _warm_up(job_type):
+  if job_type == "caffe2onnx":
+    from onnx import defs
+    from onnx_hub.caffe import caffe2onnx
+    from onnx_hub.caffe import caffe_helper
+    caffe_helper.get_all_caffe2onnx_handlers(
+        {defs.ONNX_DOMAIN: defs.onnx_opset_version()})
+  elif job_type == "tf2onnx":
+    from onnx_hub.tf import tf2onnx
+  elif job_type == "onnx2tf":
+    from onnx_hub.tf import onnx2tf
+
+
+def run_job(job, cache=None, force=False):
+  """ Run a job, catching its errors.
+
+  :param job: Job dict.
+  :param cache: Optional ConversionCache used by the converters.
+  :param force: Convert even if the output is up to date.
+  :return: Result dict with id, type, output, status ("ok", "skipped" or
+    "error"), seconds, on errors, error, and for profiled jobs, profile,
+    c.f. Profiler.report.
+  """
+  start = time.time()
+  result = {
+      "id": job.get("id", job.get("output")),
+      "type": job.get("type"),
+      "output": job.get("output"),
+  }
+  profiler = None
+  if job.get("profile") or job.get("trace"):
+    from onnx_hub.profiler import Profiler
+    profiler = Profiler()
+  try:
+    check_job(job)
+    if not force and is_up_to_date(job):
+      result["status"] = "skipped"
+    else:
+      _convert(job, cache, profiler)
+      _write_atomic(options_path(job), json.dumps(
+          job_options(job), sort_keys=True).encode("utf-8"))
+      result["status"] = "ok"
+      if profiler is not None:
+        result["profile"] = profiler.report()
+        if job.get("trace"):
+          profiler.export_chrome_trace(job["trace"])
+  except Exception as e:
+    result["status"] = "error"
+    result["error"] = "{}: {}".format(type(e).__name__, e)
+  result["seconds"] = round(time.time() - start, 3)
+  return result
+
+
+def _convert(job, cache, profiler=None):
+  output = os.path.abspath(job["output"])
+  output_dir = os.path.dirname(output)
+  if not os.path.isdir(output_dir):
+    os.makedirs(output_dir)
+
+  if job["type"] == "caffe2onnx":
+    from onnx_hub.caffe import caffe2onnx
+    if job.get("external_data"):
+      from onnx_hub.caffe.external_data import ExternalDataWriter
+      with ExternalDataWriter(output_dir,
+                              os.path.basename(output) + ".data") as writer:
+        model = caffe2onnx.load(
+            job["weights"],
+            job["model"],
+            external_data=writer,
+            memory_budget=job.get("memory_budget"),
+            dynamic_batch=bool(job.get("dynamic_batch")),
+            opt_level=job.get("opt_level", 0),
+            output=job.get("outputs"),
+            profiler=profiler)
+    else:
+      model = caffe2onnx.load(
+          job["weights"], job["model"], cache=cache,
+          dynamic_batch=bool(job.get("dynamic_batch")),
+          opt_level=job.get("opt_level", 0), output=job.get("outputs"),
+          profiler=profiler)
+    _write_atomic(output, model.SerializeToString())
+  elif job["type"] == "tf2onnx":
+    from onnx_hub.tf import tf2onnx
+    model = tf2onnx.load(job["input"], cache=cache, profiler=profiler)
+    _write_atomic(output, model.SerializeToString())
+  elif job["type"] == "onnx2tf":
+    from onnx_hub.tf import onnx2tf
+    tmp_output = output + ".tmp"
+    onnx2tf.load(job["input"], tmp_output, profiler=profiler)
+    os.rename(tmp_output, output)
+
+
+def _write_atomic(path, data):
+  fd, tmp_path = tempfile.mkstemp(
+      dir=os.path.dirname(path), prefix=os.path.basename(path), suffix=".tmp")
+  try:
+    with os.fdopen(fd, "wb") as f:
+      f.write(data)
+    os.rename(tmp_path, path)
+  except BaseException:
+    os.remove(tmp_path)
+    raise
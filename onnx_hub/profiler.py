@@ -0,0 +1,316 @@
+""" Per-phase profiling of conversions.
+
+Converters take an optional Profiler and time their phases with it:
+
+  profiler = Profiler()
+  onnx_model = caffe2onnx.load(weights, prototxt, profiler=profiler)
+  print(profiler.format_report())
+  profiler.export_chrome_trace("conversion.json")
+
+Every phase records its wall time, CPU time and peak memory. Phases nest,
+e.g. `handle` runs inside `convert_graph`, so the times of nested phases
+add up to less than or equal to the time of the phase containing them.
+
+How peak memory is measured depends on the interpreter:
+
+- Python 3.9 and later: the peak allocated above what was in use when the
+  phase started, with tracemalloc.
+- Python 3.4 to 3.8: the same, but tracemalloc can only restart its peak
+  by clearing its traces, so memory allocated before the phase and freed
+  during it is not subtracted, which makes the peak an upper bound. The
+  traces of other tracemalloc users are cleared too.
+- Python 2: how much the maximum resident set size of the process grew
+  during the phase, with resource.getrusage. This is 0 for phases staying
+  below an earlier maximum, and it includes memory not allocated by
+  Python, e.g. mapped caffemodel pages.
+- Without tracemalloc and resource, e.g. Python 2 on Windows: None.
+
+Memory is process wide: phases running at the same time in other
+threads, e.g. conversions in the thread pool of onnx_hub.aio, share its
+peak. Peaks are then never lost, but they include what the other threads
+allocate, so they are only meaningful for one conversion at a time. Use
+Profiler(memory=False) to only time concurrent conversions.
+"""
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+  import tracemalloc
+except ImportError:
+  tracemalloc = None
+try:
+  import resource
+except ImportError:
+  resource = None
+
+_wall_time = getattr(time, "perf_counter", time.time)
+_cpu_time = time.process_time if hasattr(time, "process_time") else time.clock
+
+# Guards the memory tracking state shared by all profilers below.
+_tracing_lock = threading.Lock()
+# Number of phases tracking memory, which keep tracemalloc tracing.
+_tracing_phases = 0
+# Whether the profilers started tracemalloc, and so should stop it.
+_started_tracing = False
+# Memory frames of the phases of all profilers being run.
+_open_frames = []
+# Bytes in use forgotten by tracemalloc.clear_traces, c.f. _reset_peak.
+_cleared_memory = 0
+
+
+class Profiler(object):
+  """ Records the phases of one conversion.
+  A profiler is meant for one conversion at a time. Phases entered from
+  other threads are recorded on their own thread in the trace.
+  """
+
+  def __init__(self, memory=True):
+    """
+    :param memory: Track peak memory, c.f. the module docstring. With
+      tracemalloc, this slows down allocations, so the other measurements
+      are more accurate without.
+    """
+    self.memory = memory and (tracemalloc is not None or resource is not None)
+    self.events = []
+    self._stack = []
+    self._origin = _wall_time()
+
+  @contextlib.contextmanager
+  def phase(self, name, op=None):
+    """ Time a phase.
+
+    :param name: Phase name, e.g. `parse_prototxt`.
+    :param op: Optional layer type the phase handles. Phases with an op
+      are also broken down per op in the report.
+    """
+    frame = {"base": 0, "peak": 0}
+    if self.memory:
+      with _tracing_lock:
+        _start_tracing()
+        _update_peaks()
+        frame["base"] = frame["peak"] = _reset_peak()
+        _open_frames.append(frame)
+    self._stack.append(frame)
+    wall_start = _wall_time()
+    cpu_start = _cpu_time()
+    try:
+      yield
+    finally:
+      cpu = _cpu_time() - cpu_start
+      wall = _wall_time() - wall_start
+      peak_memory = None
+      if self.memory:
+        with _tracing_lock:
+          _update_peaks()
+          _remove_frame(_open_frames, frame)
+          _stop_tracing()
+        peak_memory = frame["peak"] - frame["base"]
+      _remove_frame(self._stack, frame)
+      for outer in self._stack:
+        outer["peak"] = max(outer["peak"], frame["peak"])
+      self.events.append({
+          "name": name,
+          "op": op,
+          "start": wall_start - self._origin,
+          "wall_time": wall,
+          "cpu_time": cpu,
+          "peak_memory": peak_memory,
+          "thread": threading.current_thread().ident,
+      })
+
+  def report(self):
+    """ Summarize the recorded phases.
+
+    :return: Dict with `phases`, a list of per-phase totals in the order
+      the phases were first entered, and `handlers`, a dict of per-op
+      totals of the phases given an op. Totals have count, wall_time and
+      cpu_time in seconds, and peak_memory in bytes or None.
+    """
+    phases = []
+    phases_by_name = {}
+    handlers = {}
+    for event in sorted(self.events, key=lambda e: e["start"]):
+      if event["name"] not in phases_by_name:
+        phases_by_name[event["name"]] = _Totals(event["name"])
+        phases.append(phases_by_name[event["name"]])
+      phases_by_name[event["name"]].add(event)
+      if event["op"] is not None:
+        handlers.setdefault(event["op"], _Totals(event["op"])).add(event)
+    return {
+        "phases": [totals.to_dict() for totals in phases],
+        "handlers": dict(
+            (op, totals.to_dict()) for op, totals in handlers.items()),
+    }
+
+  def format_report(self):
+    """ Format the report as a table.
+
+    :return: String.
+    """
+    report = self.report()
+    lines = []
+    header = "{:<24} {:>6} {:>10} {:>10} {:>12}".format(
+        "", "count", "wall (ms)", "cpu (ms)", "peak (KiB)")
+    for title, rows in [("phase", report["phases"]),
+                        ("handler", sorted(report["handlers"].values(),
+                                           key=lambda r: -r["wall_time"]))]:
+      if not rows:
+        continue
+      lines.append(title + header[len(title):])
+      for row in rows:
+        peak = row["peak_memory"]
+        lines.append("{:<24} {:>6} {:>10.2f} {:>10.2f} {:>12}".format(
+            row["name"], row["count"], row["wall_time"] * 1000,
+            row["cpu_time"] * 1000,
+            "-" if peak is None else "{:.1f}".format(peak / 1024.)))
+    return "\n".join(lines)
+
+  def export_chrome_trace(self, path):
+    """ Write the phases as a Chrome trace, c.f. chrome://tracing.
+
+    :param path: Output JSON path.
+    """
+    trace_events = []
+    for event in self.events:
+      args = {"cpu_ms": event["cpu_time"] * 1000}
+      if event["op"] is not None:
+        args["op"] = event["op"]
+      if event["peak_memory"] is not None:
+        args["peak_memory"] = event["peak_memory"]
+      trace_events.append({
+          "name": event["name"] if event["op"] is None else "{} {}".format(
+              event["name"], event["op"]),
+          "cat": event["name"],
+          "ph": "X",
+          "ts": event["start"] * 1e6,
+          "dur": event["wall_time"] * 1e6,
+          "pid": os.getpid(),
+          "tid": event["thread"],
+          "args": args,
+      })
+    with open(path, "w") as f:
+      json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f)
+
+
+def _start_tracing():
+  global _tracing_phases, _started_tracing, _cleared_memory
+  if tracemalloc is None:
+    return
+  if _tracing_phases == 0:
+    _cleared_memory = 0
+    if not tracemalloc.is_tracing():
+      tracemalloc.start()
+      _started_tracing = True
+  _tracing_phases += 1
+
+
+def _stop_tracing():
+  global _tracing_phases, _started_tracing
+  if tracemalloc is None:
+    return
+  _tracing_phases -= 1
+  if _tracing_phases == 0 and _started_tracing:
+    tracemalloc.stop()
+    _started_tracing = False
+
+
+def _reset_peak():
+  """ Start measuring a new peak.
+
+  :return: Memory in use, on the scale of _peak_memory.
+  """
+  global _cleared_memory
+  if tracemalloc is None:
+    return _max_rss()
+  if not hasattr(tracemalloc, "reset_peak"):
+    # Before Python 3.9, only clearing the traces resets the peak. The
+    # blocks in use are forgotten, so their size is kept aside to keep
+    # memory on one scale across phases.
+    _cleared_memory += tracemalloc.get_traced_memory()[0]
+    tracemalloc.clear_traces()
+  else:
+    tracemalloc.reset_peak()
+  return _cleared_memory + tracemalloc.get_traced_memory()[0]
+
+
+def _peak_memory():
+  if tracemalloc is None:
+    return _max_rss()
+  return _cleared_memory + tracemalloc.get_traced_memory()[1]
+
+
+def _max_rss():
+  max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  # Bytes on macOS, KiB elsewhere.
+  return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def _remove_frame(frames, frame):
+  # By identity, since frames with the same memory compare equal.
+  for idx, other in enumerate(frames):
+    if other is frame:
+      del frames[idx]
+      return
+
+
+def _update_peaks():
+  # The peak is reset by every phase, of this profiler or of another one,
+  # so fold it into all open phases before it is lost.
+  peak = _peak_memory()
+  for frame in _open_frames:
+    frame["peak"] = max(frame["peak"], peak)
+
+
+class _NullProfiler(object):
+  """ Profiler doing nothing, used when none is given. """
+
+  def phase(self, name, op=None):
+    return _NULL_PHASE
+
+
+class _NullPhase(object):
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    return False
+
+
+NULL_PROFILER = _NullProfiler()
+_NULL_PHASE = _NullPhase()
+
+
+def get_profiler(profiler):
+  """ Get profiler, or a profiler doing nothing if it is None. """
+  return NULL_PROFILER if profiler is None else profiler
+
+
+class _Totals(object):
+
+  def __init__(self, name):
+    self.name = name
+    self.count = 0
+    self.wall_time = 0.
+    self.cpu_time = 0.
+    self.peak_memory = None
+
+  def add(self, event):
+    self.count += 1
+    self.wall_time += event["wall_time"]
+    self.cpu_time += event["cpu_time"]
+    if event["peak_memory"] is not None:
+      self.peak_memory = max(self.peak_memory or 0, event["peak_memory"])
+
+  def to_dict(self):
+    return {
+        "name": self.name,
+        "count": self.count,
+        "wall_time": self.wall_time,
+        "cpu_time": self.cpu_time,
+        "peak_memory": self.peak_memory,
+    }
@@ -2,7 +2,28 @@ import onnx
 
 from onnx_tf.backend import prepare
 
-def load(input_path, output_path):
-    onnx_model = onnx.load(input_path)  # load onnx model
-    tf_rep = prepare(onnx_model)  # prepare tf representation
-    tf_rep.export_graph(output_path)  # export the model
+from onnx_hub.inputs import InputBuffer
+from onnx_hub.inputs import is_path
+from onnx_hub.profiler import get_profiler
+
+def load(input_path, output_path, profiler=None):
+    """Converts an ONNX model to a TensorFlow graph.
+
+    :param input_path: The ONNX model, as a path, bytes-like object or
+      binary file-like object, c.f. onnx_hub.inputs.
+    :param output_path: Path to export the TensorFlow graph to.
+    :param profiler: Optional Profiler to time the conversion phases with,
+      c.f. onnx_hub.profiler.
+    """
+    profiler = get_profiler(profiler)
+    with profiler.phase("parse_onnx"):
+        if is_path(input_path):
+            onnx_model = onnx.load(input_path)  # load onnx model
+        else:
+            onnx_model = onnx.ModelProto()
+            with InputBuffer(input_path) as model_input:
+                onnx_model.ParseFromString(model_input.buffer)
+    with profiler.phase("prepare"):
+        tf_rep = prepare(onnx_model)  # prepare tf representation
+    with profiler.phase("export_graph"):
+        tf_rep.export_graph(output_path)  # export the model
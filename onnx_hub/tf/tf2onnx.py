@@ -1,15 +1,47 @@
 from tensorflow.core.framework import graph_pb2
+from onnx import defs
 
 from onnx_tf.common import get_output_node_names
 from onnx_tf.frontend import tensorflow_graph_to_onnx_model
 
-def load(input_path):
+from onnx_hub.inputs import InputBuffer
+from onnx_hub.profiler import get_profiler
+
+def load(input_path, cache=None, profiler=None):
+    """Converts a frozen TensorFlow GraphDef to an ONNX model.
+
+    :param input_path: The GraphDef, as a path, bytes-like object or
+      binary file-like object, c.f. onnx_hub.inputs.
+    :param cache: Optional ConversionCache. The result is looked up by the
+      contents of the input and stored after conversion.
+    :param profiler: Optional Profiler to time the conversion phases with,
+      c.f. onnx_hub.profiler.
+
+    :returns: ONNX Model Proto object.
+    """
+    profiler = get_profiler(profiler)
     graph_def = graph_pb2.GraphDef()
-    with open(input_path, "rb") as f:   # load tf graph def
-        graph_def.ParseFromString(f.read())
+    with InputBuffer(input_path) as graph_def_input:
+        cache_key = None
+        if cache is not None:
+            with profiler.phase("cache_lookup"):
+                cache_key = cache.key([graph_def_input.buffer],
+                                      converter="tf2onnx",
+                                      opset=defs.onnx_opset_version())
+                model = cache.get_model(cache_key)
+            if model is not None:
+                return model
+
+        # load tf graph def straight from the mapped file
+        with profiler.phase("parse_graph_def"):
+            graph_def.ParseFromString(graph_def_input.buffer)
     output = get_output_node_names(graph_def)  # get output node names
 
     # convert tf graph to onnx model
-    model = tensorflow_graph_to_onnx_model(graph_def, output)
+    with profiler.phase("convert_graph"):
+        model = tensorflow_graph_to_onnx_model(graph_def, output)
 
+    if cache_key is not None:
+        with profiler.phase("cache_store"):
+            cache.put_model(cache_key, model)
     return model
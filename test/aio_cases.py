@@ -0,0 +1,47 @@
+# Coroutines of aio_test.py. They are Python 3 syntax, so they live apart
+# from the script, which Python 2 must be able to compile.
+import asyncio
+import io
+
+import onnx_hub.caffe.caffe2onnx
+from onnx_hub import aio
+
+weights_path = "onnx_hub/external/models/caffe/lenet/lenet_iter_10000.caffemodel"
+model_path = "onnx_hub/external/models/caffe/lenet/lenet_workaround.prototxt"
+
+
+async def convert():
+  expected = onnx_hub.caffe.caffe2onnx.load(weights_path, model_path)
+  converter = aio.AsyncConverter(max_in_flight=2)
+  with open(weights_path, "rb") as f:
+    weights = f.read()
+  with open(model_path, "rb") as model_file:
+    tasks = [
+        asyncio.ensure_future(converter.caffe2onnx(weights, model_path)),
+        asyncio.ensure_future(
+            converter.caffe2onnx(io.BytesIO(weights), model_file)),
+        asyncio.ensure_future(converter.caffe2onnx(weights_path, model_path)),
+    ]
+    # Cancelled conversions raise CancelledError whether they started or
+    # not.
+    await asyncio.sleep(0)
+    tasks[2].cancel()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+  converter.shutdown()
+
+  if results[0] != expected or results[1] != expected:
+    raise RuntimeError("Async conversion mismatch!")
+  if not isinstance(results[2], asyncio.CancelledError):
+    raise RuntimeError("Conversion was not cancelled!")
+  if converter.in_flight != 0:
+    raise RuntimeError("Conversions left in flight!")
+
+
+async def wait_for_slot(converter):
+  # The converter is made outside the loop, and the second conversion
+  # waits for the slot of the first.
+  results = await asyncio.gather(
+      converter.caffe2onnx(weights_path, model_path),
+      converter.caffe2onnx(weights_path, model_path))
+  if results[0] != results[1]:
+    raise RuntimeError("Async conversion mismatch!")
@@ -0,0 +1,27 @@
+import sys
+
+if sys.version_info < (3, 5):
+  print("Asyncio API test skipped on Python {}.".format(sys.version.split()[0]))
+  sys.exit(0)
+
+import asyncio
+
+import aio_cases
+from onnx_hub import aio
+
+
+def run(coroutine):
+  if hasattr(asyncio, "run"):
+    asyncio.run(coroutine)
+  else:
+    asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+run(aio_cases.convert())
+
+converter = aio.AsyncConverter(max_in_flight=1)
+run(aio_cases.wait_for_slot(converter))
+# A second loop gets a semaphore of its own.
+run(aio_cases.wait_for_slot(converter))
+converter.shutdown()
+print("Asyncio API test success.")
@@ -0,0 +1,85 @@
+import io
+import struct
+import sys
+import tempfile
+
+import numpy as np
+
+from onnx_hub.caffe.blob_decoder import blob_to_array
+from onnx_hub.caffe.blob_decoder import decode_blob
+from onnx_hub.caffe.caffe_helper import merge_caffe_model
+from onnx_hub.caffe.caffemodel_reader import CaffeModelReader
+from onnx_hub.caffe.proto import caffe_pb2
+
+values = np.arange(24, dtype="f4") / 7
+
+# packed float data with shape
+blob = caffe_pb2.BlobProto()
+blob.shape.dim.extend([2, 3, 4])
+blob.data.extend(values)
+decoded = decode_blob(blob.SerializeToString())
+if decoded.shape != (2, 3, 4) or not np.array_equal(decoded.flatten(), values):
+  raise RuntimeError("Packed data decode error!")
+if not np.array_equal(blob_to_array(blob), decoded):
+  raise RuntimeError("Parsed packed data decode error!")
+
+# double data with legacy dims
+blob = caffe_pb2.BlobProto()
+blob.num, blob.channels, blob.height, blob.width = 1, 2, 3, 4
+blob.double_data.extend(values.astype("f8"))
+decoded = decode_blob(blob.SerializeToString())
+if decoded.dtype != np.float32 or decoded.shape != (1, 2, 3, 4):
+  raise RuntimeError("Double data decode error!")
+parsed = blob_to_array(blob)
+if parsed.dtype != np.float32 or not np.array_equal(parsed, decoded):
+  raise RuntimeError("Parsed double data decode error!")
+
+# unpacked float data, tag 0x2d is field 5 with wire type fixed32
+unpacked = b"".join(b"\x2d" + struct.pack("<f", v) for v in values[:5])
+decoded = decode_blob(unpacked)
+if not np.array_equal(decoded, values[:5]):
+  raise RuntimeError("Unpacked data decode error!")
+
+# lazy reader over a caffemodel file
+net = caffe_pb2.NetParameter()
+for name, num_blobs in [("conv1", 2), ("relu1", 0), ("ip1", 1)]:
+  layer = net.layer.add()
+  layer.name = name
+  for _ in range(num_blobs):
+    blob = layer.blobs.add()
+    blob.shape.dim.extend([4, 6])
+    blob.data.extend(values)
+with tempfile.NamedTemporaryFile(suffix=".caffemodel") as f:
+  f.write(net.SerializeToString())
+  f.flush()
+  with CaffeModelReader(f.name) as reader:
+    if reader.get_layer("ip1").num_blobs != 1:
+      raise RuntimeError("Layer index error!")
+    if [layer.name for layer in reader] != ["conv1", "relu1", "ip1"]:
+      raise RuntimeError("Layer order error!")
+    if not np.array_equal(reader.get_layer("conv1").blobs[1].flatten(), values):
+      raise RuntimeError("Blob decode error!")
+    if reader.get_layer("missing") is not None:
+      raise RuntimeError("Missing layer error!")
+
+# in-memory inputs are read in place
+serialized = net.SerializeToString()
+sources = [bytearray(serialized), io.BytesIO(serialized)]
+# Python 2 str inputs are paths, c.f. onnx_hub.inputs.
+if sys.version_info[0] >= 3:
+  sources.append(serialized)
+for source in sources:
+  with CaffeModelReader(source) as reader:
+    if [layer.name for layer in reader] != ["conv1", "relu1", "ip1"]:
+      raise RuntimeError("In-memory layer order error!")
+    if not np.array_equal(reader.get_layer("ip1").blobs[0].flatten(), values):
+      raise RuntimeError("In-memory blob decode error!")
+# merging looks layers up through the lazy index, so the records after the
+# layers looked up are never read, even if they are truncated
+prototxt = caffe_pb2.NetParameter()
+prototxt.layer.add(name="conv1")
+with CaffeModelReader(bytearray(serialized + b"\x0a\xff")) as reader:
+  merged = merge_caffe_model(reader, prototxt)
+  if merged.get("conv1").num_blobs != 2:
+    raise RuntimeError("Merged layer error!")
+print("Caffemodel reader test success.")
@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+import time
+
+from onnx import helper
+from onnx import TensorProto
+
+from onnx_hub.cache import ConversionCache
+
+tmp_dir = tempfile.mkdtemp()
+try:
+  input_path = os.path.join(tmp_dir, "input.bin")
+  with open(input_path, "wb") as f:
+    f.write(b"weights")
+  cache = ConversionCache(os.path.join(tmp_dir, "cache"), max_size=250)
+
+  key = cache.key([input_path], converter="test", opset=9)
+  if key != cache.key([input_path], opset=9, converter="test"):
+    raise RuntimeError("Key is not stable!")
+  if key == cache.key([input_path], converter="test", opset=8):
+    raise RuntimeError("Key ignores options!")
+  if cache.get(key) is not None:
+    raise RuntimeError("Unexpected cache hit!")
+
+  graph = helper.make_graph(
+      [helper.make_node("Relu", ["x"], ["y"])], "graph",
+      [helper.make_tensor_value_info("x", TensorProto.FLOAT, [1])],
+      [helper.make_tensor_value_info("y", TensorProto.FLOAT, [1])])
+  model = helper.make_model(graph)
+  cache.put_model(key, model)
+  if cache.get_model(key) != model:
+    raise RuntimeError("Cached model mismatch!")
+
+  # Each entry is 100 bytes, so only two of them fit.
+  keys = ["{:064x}".format(i) for i in range(3)]
+  for k in keys[:2]:
+    cache.put(k, b"x" * 100)
+  # Age both entries so the lookup below makes keys[0] the most recent.
+  for k in keys[:2]:
+    os.utime(cache._path(k), (time.time() - 60, time.time() - 60))
+  cache.get(keys[0])
+  cache.put(keys[2], b"x" * 100)
+  if cache.get(keys[1]) is not None or cache.get(key) is not None:
+    raise RuntimeError("LRU entries were not evicted!")
+  if cache.get(keys[0]) is None or cache.get(keys[2]) is None:
+    raise RuntimeError("Recent entries were evicted!")
+
+  cache.put(keys[0], b"topology", suffix=".netparam")
+  if (cache.get(keys[0]) != b"x" * 100 or
+      cache.get(keys[0], suffix=".netparam") != b"topology"):
+    raise RuntimeError("Entries with different suffixes are mixed up!")
+  cache.clear()
+  if os.listdir(cache.cache_dir):
+    raise RuntimeError("Entries are left after clear!")
+finally:
+  shutil.rmtree(tmp_dir)
+print("Conversion cache test success.")
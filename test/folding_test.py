@@ -0,0 +1,51 @@
+import numpy as np
+from google.protobuf import text_format
+
+from onnx_hub.caffe import folding
+from onnx_hub.caffe.proto import caffe_pb2
+
+net = caffe_pb2.NetParameter()
+text_format.Merge("""
+layer { name: "conv" type: "Convolution" bottom: "data" top: "conv" }
+layer { name: "bn" type: "BatchNorm" bottom: "conv" top: "conv" }
+layer { name: "scale" type: "Scale" bottom: "conv" top: "conv" }
+layer { name: "relu" type: "ReLU" bottom: "conv" top: "relu" }
+layer { name: "conv2" type: "Convolution" bottom: "relu" top: "conv2" }
+layer { name: "pool" type: "Pooling" bottom: "conv2" top: "pool" }
+layer { name: "bn2" type: "BatchNorm" bottom: "conv2" top: "bn2" }
+""", net)
+folds = folding.plan_folds(net.layer, lambda name: True)
+if [layer.name for layer in folds.get("conv", [])] != ["bn", "scale"]:
+  raise RuntimeError("BatchNorm and Scale are not folded into conv!")
+# The pool also reads conv2, so bn2 can not be folded into it.
+if "conv2" in folds:
+  raise RuntimeError("Folded a layer whose input is read elsewhere!")
+
+rng = np.random.RandomState(0)
+weights = rng.randn(4, 3, 3, 3).astype("f4")
+bias = rng.randn(4).astype("f4")
+mean, var = rng.randn(4).astype("f4"), rng.rand(4).astype("f4") + 0.5
+gamma, beta = rng.randn(4).astype("f4"), rng.randn(4).astype("f4")
+# Caffe stores the statistics scaled by a moving average factor.
+bn_blobs = [mean * 2, var * 2, np.array([2], "f4")]
+layers = dict((layer.name, layer) for layer in net.layer)
+
+
+class Blobs(object):
+
+  def __init__(self, blobs):
+    self.blobs = blobs
+
+
+folded_weights, folded_bias = folding.fold_consts(
+    layers["conv"], [weights, bias],
+    [(layers["bn"], Blobs(bn_blobs)), (layers["scale"], Blobs([gamma, beta]))])
+
+x = rng.randn(27).astype("f8")
+eps = layers["bn"].batch_norm_param.eps
+expected = ((weights.reshape(4, -1).dot(x) + bias - mean) /
+            np.sqrt(var + eps) * gamma + beta)
+actual = folded_weights.reshape(4, -1).dot(x) + folded_bias
+if not np.allclose(actual, expected, atol=1e-4):
+  raise RuntimeError("Folded weights mismatch!")
+print("Folding test success.")
@@ -0,0 +1,47 @@
+import numpy as np
+from onnx import helper
+
+from onnx_hub.caffe.ir_wrapper import IRGraph
+from onnx_hub.caffe.passes.pass_manager import PassManager
+
+graph = IRGraph()
+graph.add_placeholder("x")
+graph.add_const("W", np.ones((4, 3, 3, 3), "f4"))
+graph.add_const("B", np.ones(4, "f4"))
+graph.add_const("A", np.full((1, 4, 1, 1), 2, "f4"))
+graph.add_const("S0", np.array([1, 4, -1], "i8"))
+graph.add_const("S1", np.array([1, -1], "i8"))
+graph.add_const("unused", np.zeros(8, "f4"))
+for node in [
+    helper.make_node("Conv", ["x", "W", "B"], ["conv"]),
+    helper.make_node("Dropout", ["conv"], ["drop"]),
+    helper.make_node("Add", ["drop", "A"], ["add"]),
+    helper.make_node("Relu", ["add"], ["relu"]),
+    helper.make_node("Reshape", ["relu", "S0"], ["flat0"]),
+    helper.make_node("Reshape", ["flat0", "S1"], ["flat"]),
+    helper.make_node("Relu", ["conv"], ["dead"]),
+]:
+  graph.add_node_proto(node)
+  for name in node.output:
+    graph.add_var(name)
+graph.set_output(["flat"])
+
+pass_manager = PassManager.from_opt_level(3)
+pass_manager.run(graph)
+
+op_types = [node.op_type for node in graph.node_protos]
+if op_types != ["Conv", "Relu", "Reshape"]:
+  raise RuntimeError("Wrong nodes {}!".format(op_types))
+if graph.node_protos[0].output[0] != "add":
+  raise RuntimeError("Add is not fused into Conv!")
+bias = graph.consts[graph.node_protos[0].input[2]]
+if not np.array_equal(bias, np.full(4, 3, "f4")):
+  raise RuntimeError("Wrong fused bias {}!".format(bias))
+if "unused" in graph.const_names or "S0" in graph.const_names:
+  raise RuntimeError("Unused consts are not removed!")
+
+report = dict((row["name"], row) for row in pass_manager.report())
+if report["eliminate_dead_nodes"]["node_delta"] != -2:
+  raise RuntimeError("Wrong report {}!".format(report))
+
+print("Graph passes test success.")
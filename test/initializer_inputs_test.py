@@ -0,0 +1,37 @@
+import os
+import shutil
+import tempfile
+
+import onnx
+
+from onnx_hub.cache import ConversionCache
+from onnx_hub.caffe import caffe2onnx
+from snapshots import PROTOTXT, snapshot
+
+tmp_dir = tempfile.mkdtemp()
+try:
+  cache = ConversionCache(os.path.join(tmp_dir, "cache"))
+  # Python 2 str inputs are paths, so in-memory inputs are bytearrays.
+  weights = bytearray(snapshot(0).SerializeToString())
+  prototxt = bytearray(PROTOTXT.encode("utf-8"))
+  for initializers_as_inputs in [True, False]:
+    # The model converted with the other value is cached already, so a
+    # key ignoring the option would return it.
+    onnx_model = caffe2onnx.load(weights, prototxt, cache=cache,
+                                 initializers_as_inputs=initializers_as_inputs)
+    onnx.checker.check_model(onnx_model)
+    graph = onnx_model.graph
+    initializers = set(tensor.name for tensor in graph.initializer)
+    if initializers != set(["conv_0", "conv_1", "ip_0", "ip_1"]):
+      raise RuntimeError("Wrong initializers {}!".format(sorted(initializers)))
+    inputs = [value_info.name for value_info in graph.input]
+    expected = ["data"]
+    if initializers_as_inputs:
+      expected += [tensor.name for tensor in graph.initializer]
+    if sorted(inputs) != sorted(expected):
+      raise RuntimeError(
+          "Inputs {} with initializers_as_inputs={}, expected {}!".format(
+              inputs, initializers_as_inputs, expected))
+finally:
+  shutil.rmtree(tmp_dir)
+print("Initializer inputs test success.")
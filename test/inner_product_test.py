@@ -0,0 +1,97 @@
+import numpy as np
+from google.protobuf import text_format
+from onnx import helper
+from onnx import numpy_helper
+
+from onnx_hub.caffe import caffe_helper
+from onnx_hub.caffe.proto import caffe_pb2
+
+PROTOTXT = """
+layer {{ name: "data" type: "Input" top: "data"
+  input_param {{ shape: {{ dim: 2 dim: 6 }} }} }}
+layer {{ name: "ip" type: "InnerProduct" bottom: "data" top: "ip"
+  inner_product_param {{ num_output: 4 {param} }} }}
+"""
+BATCH_NORM = """
+layer { name: "bn" type: "BatchNorm" bottom: "ip" top: "ip" }
+layer { name: "scale" type: "Scale" bottom: "ip" top: "ip"
+  scale_param { bias_term: true } }
+"""
+
+rng = np.random.RandomState(0)
+x = rng.randn(2, 6).astype("f4")
+weights = rng.randn(4, 6).astype("f4")
+bias = rng.randn(4).astype("f4")
+mean, var = rng.randn(4).astype("f4"), rng.rand(4).astype("f4") + 0.5
+gamma, beta = rng.randn(4).astype("f4"), rng.randn(4).astype("f4")
+
+
+def add_blob(layer, value, legacy=False):
+  blob = layer.blobs.add()
+  if legacy:
+    # num, channels, height and width of the 2D weights.
+    blob.num, blob.channels = 1, 1
+    blob.height, blob.width = value.shape
+  else:
+    blob.shape.dim.extend(value.shape)
+  blob.data.extend(value.ravel())
+
+
+def convert(param, ip_blobs, batch_norm=False, legacy=False):
+  model = caffe_pb2.NetParameter()
+  text_format.Merge(PROTOTXT.format(param=param), model)
+  caffe_model = caffe_pb2.NetParameter()
+  ip = caffe_model.layer.add(name="ip")
+  add_blob(ip, ip_blobs[0], legacy)
+  for blob in ip_blobs[1:]:
+    add_blob(ip, blob)
+  if batch_norm:
+    text_format.Merge(BATCH_NORM, model)
+    # Caffe stores the statistics scaled by a moving average factor.
+    bn = caffe_model.layer.add(name="bn")
+    for blob in [mean * 2, var * 2, np.array([2], "f4")]:
+      add_blob(bn, blob)
+    scale = caffe_model.layer.add(name="scale")
+    for blob in [gamma, beta]:
+      add_blob(scale, blob)
+  return caffe_helper.caffe_model_to_onnx_model(caffe_model, model, None)
+
+
+def run_gemm(onnx_model):
+  nodes = onnx_model.graph.node
+  if [node.op_type for node in nodes] != ["Gemm"]:
+    raise RuntimeError("Not a single Gemm: {}!".format(
+        [node.op_type for node in nodes]))
+  consts = dict((tensor.name, numpy_helper.to_array(tensor))
+                for tensor in onnx_model.graph.initializer)
+  attrs = dict((attr.name, helper.get_attribute_value(attr))
+               for attr in nodes[0].attribute)
+  b, c = consts[nodes[0].input[1]], consts[nodes[0].input[2]]
+  if b.ndim != 2 or c.shape != (4,):
+    raise RuntimeError("Gemm consts of shapes {} and {}!".format(
+        b.shape, c.shape))
+  return attrs.get("transB", 0), x.dot(b.T if attrs.get("transB") else b) + c
+
+
+eps = caffe_pb2.BatchNormParameter().eps
+expected = x.dot(weights.T) + bias
+expected_bn = (expected - mean) / np.sqrt(var + eps) * gamma + beta
+cases = [
+    ("", [weights, bias], False, False, 1, expected),
+    ("transpose: true", [weights.T.copy(), bias], False, False, 0, expected),
+    ("", [weights, bias], True, False, 1, expected_bn),
+    ("transpose: true", [weights.T.copy(), bias], True, False, 0,
+     expected_bn),
+    ("bias_term: false", [weights], False, False, 1, x.dot(weights.T)),
+    ("bias_term: false", [weights], False, True, 1, x.dot(weights.T)),
+    ("transpose: true", [weights.T.copy(), bias], False, True, 0, expected),
+]
+for param, ip_blobs, batch_norm, legacy, trans_b, case_expected in cases:
+  actual_trans_b, actual = run_gemm(
+      convert(param, ip_blobs, batch_norm, legacy))
+  if actual_trans_b != trans_b:
+    raise RuntimeError("transB is {} for {!r}!".format(actual_trans_b, param))
+  if not np.allclose(actual, case_expected, atol=1e-4):
+    raise RuntimeError("Gemm mismatch for {!r}, batch_norm={}, "
+                       "legacy={}!".format(param, batch_norm, legacy))
+print("Inner product test success.")
@@ -0,0 +1,66 @@
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from onnx_hub import jobs
+from onnx_hub.caffe.proto import caffe_pb2
+
+PROTOTXT = """
+layer { name: "data" type: "Input" top: "data"
+  input_param { shape: { dim: 1 dim: 4 } } }
+layer { name: "ip" type: "InnerProduct" bottom: "data" top: "ip"
+  inner_product_param { num_output: 2 } }
+layer { name: "prob" type: "Softmax" bottom: "ip" top: "prob" }
+"""
+
+tmp_dir = tempfile.mkdtemp()
+try:
+  with open(os.path.join(tmp_dir, "net.prototxt"), "w") as f:
+    f.write(PROTOTXT)
+  weights = caffe_pb2.NetParameter()
+  layer = weights.layer.add(name="ip", type="InnerProduct")
+  for shape in [(2, 4), (2,)]:
+    blob = layer.blobs.add()
+    blob.shape.dim.extend(shape)
+    blob.data.extend(np.full(shape, 0.5).ravel())
+  with open(os.path.join(tmp_dir, "net.caffemodel"), "wb") as f:
+    f.write(weights.SerializeToString())
+
+  manifest = [
+      {"type": "caffe2onnx", "weights": "net.caffemodel",
+       "model": "net.prototxt", "output": "out/net.onnx", "id": "net"},
+      {"type": "caffe2onnx", "weights": "missing.caffemodel",
+       "model": "net.prototxt", "output": "out/missing.onnx",
+       "id": "missing"},
+  ]
+  manifest_path = os.path.join(tmp_dir, "manifest.json")
+
+  def run(manifest):
+    with open(manifest_path, "w") as f:
+      json.dump(manifest, f)
+    return dict((result["id"], result["status"])
+                for result in (jobs.run_job(job)
+                               for job in jobs.load_manifest(manifest_path)))
+
+  statuses = run(manifest)
+  if statuses != {"net": "ok", "missing": "error"}:
+    raise RuntimeError("Wrong first run {}!".format(statuses))
+  statuses = run(manifest)
+  if statuses != {"net": "skipped", "missing": "error"}:
+    raise RuntimeError("Up to date job is converted again: {}!".format(
+        statuses))
+
+  manifest[0]["dynamic_batch"] = True
+  statuses = run(manifest)
+  if statuses["net"] != "ok":
+    raise RuntimeError("Job with new options is skipped!")
+  manifest[0]["profile"] = True
+  statuses = run(manifest)
+  if statuses["net"] != "skipped":
+    raise RuntimeError("Profiling changes the options of a job!")
+finally:
+  shutil.rmtree(tmp_dir)
+print("Jobs test success.")
@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import onnx
+from onnx import TensorProto
+from onnx import numpy_helper
+
+from onnx_hub.caffe import caffe2onnx
+from onnx_hub.caffe import caffe_helper
+from onnx_hub.caffe.external_data import ExternalDataWriter
+from snapshots import PROTOTXT, SHAPES, model, snapshot
+
+
+def caffemodel(seed, shapes=SHAPES):
+  # Python 2 str inputs are paths, so in-memory inputs are bytearrays.
+  return bytearray(snapshot(seed, shapes).SerializeToString())
+
+
+def check_initializers(path, seed):
+  expected = caffe_helper.caffe_model_to_onnx_model(snapshot(seed), model,
+                                                    "prob")
+  loaded = dict((tensor.name, numpy_helper.to_array(tensor))
+                for tensor in onnx.load(path).graph.initializer)
+  for tensor in expected.graph.initializer:
+    if not np.array_equal(loaded[tensor.name],
+                          numpy_helper.to_array(tensor)):
+      raise RuntimeError("Initializer {} of {} is not from snapshot {}!".format(
+          tensor.name, path, seed))
+
+
+tmp_dir = tempfile.mkdtemp()
+try:
+  onnx_path = os.path.join(tmp_dir, "model.onnx")
+  prototxt = bytearray(PROTOTXT.encode("utf-8"))
+  with ExternalDataWriter(tmp_dir, "model.data", alignment=64,
+                          size_threshold=256) as writer:
+    onnx_model = caffe_helper.caffe_model_to_onnx_model(
+        snapshot(0), model, "prob", external_data=writer)
+  locations = [tensor.data_location for tensor in onnx_model.graph.initializer]
+  if (TensorProto.EXTERNAL not in locations or
+      TensorProto.DEFAULT not in locations):
+    raise RuntimeError("Initializers are not partly external!")
+  with open(onnx_path, "wb") as f:
+    f.write(onnx_model.SerializeToString())
+  data_size = os.path.getsize(os.path.join(tmp_dir, "model.data"))
+
+  caffe2onnx.patch(onnx_path, caffemodel(1), prototxt)
+  check_initializers(onnx_path, 1)
+  if os.path.getsize(os.path.join(tmp_dir, "model.data")) != data_size:
+    raise RuntimeError("External data is not patched in place!")
+
+  output_dir = os.path.join(tmp_dir, "patched")
+  os.makedirs(output_dir)
+  output_path = os.path.join(output_dir, "model.onnx")
+  with ExternalDataWriter(output_dir, "model.data") as writer:
+    caffe2onnx.patch(onnx_path, caffemodel(2), prototxt,
+                     output_path=output_path, external_data=writer)
+  check_initializers(output_path, 2)
+  check_initializers(onnx_path, 1)
+
+  # Mismatches in the first and the last layer, and a missing last layer,
+  # are all found before any weight is patched.
+  for mismatch in [dict(SHAPES, conv=[(16, 2, 5, 5), (16,)]),
+                   dict(SHAPES, ip=[(2, 576), (3,)]),
+                   {"conv": SHAPES["conv"]}]:
+    try:
+      caffe2onnx.patch(onnx_path, caffemodel(3, mismatch), prototxt)
+      raise RuntimeError("Weights {} are not rejected!".format(mismatch))
+    except ValueError:
+      pass
+    check_initializers(onnx_path, 1)
+
+  optimized_path = os.path.join(tmp_dir, "optimized.onnx")
+  with open(optimized_path, "wb") as f:
+    f.write(caffe_helper.caffe_model_to_onnx_model(
+        snapshot(0), model, "prob", opt_level=2).SerializeToString())
+  try:
+    caffe2onnx.patch(optimized_path, caffemodel(1), prototxt)
+    raise RuntimeError("Optimized model is not rejected!")
+  except ValueError:
+    pass
+finally:
+  shutil.rmtree(tmp_dir)
+print("Patch test success.")
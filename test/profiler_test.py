@@ -0,0 +1,70 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+from onnx_hub.profiler import Profiler
+
+profiler = Profiler()
+with profiler.phase("convert_graph"):
+  for op in ["Convolution", "ReLU", "Convolution"]:
+    with profiler.phase("handle", op=op):
+      data = [0] * 100000
+  del data
+
+report = profiler.report()
+if [phase["name"] for phase in report["phases"]] != ["convert_graph", "handle"]:
+  raise RuntimeError("Phase order error!")
+if report["handlers"]["Convolution"]["count"] != 2:
+  raise RuntimeError("Handler breakdown error!")
+outer, inner = report["phases"]
+if inner["wall_time"] > outer["wall_time"]:
+  raise RuntimeError("Nested phase took longer than its parent!")
+if profiler.memory and outer["peak_memory"] < inner["peak_memory"]:
+  raise RuntimeError("Nested peak memory is not accounted for!")
+# tracemalloc measures the allocations of the phase itself, where the
+# maximum RSS used on Python 2 may not grow.
+has_tracemalloc = sys.version_info >= (3, 4)
+if has_tracemalloc and inner["peak_memory"] < 800000:
+  raise RuntimeError("Peak memory {} is not measured!".format(
+      inner["peak_memory"]))
+
+# Profilers running at the same time share tracemalloc, which stays on
+# until the last of their phases ends.
+if has_tracemalloc:
+  import tracemalloc
+  barrier = threading.Barrier(2)
+  peaks = []
+
+  def convert():
+    thread_profiler = Profiler()
+    with thread_profiler.phase("convert_graph"):
+      barrier.wait()
+      data = [0] * 100000
+      barrier.wait()
+      del data
+    peaks.append(thread_profiler.report()["phases"][0]["peak_memory"])
+
+  threads = [threading.Thread(target=convert) for _ in range(2)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  if tracemalloc.is_tracing():
+    raise RuntimeError("Tracing is left on!")
+  if len(peaks) != 2 or min(peaks) < 800000:
+    raise RuntimeError("Peak memory of a concurrent phase is lost: {}!".format(
+        peaks))
+
+tmp_dir = tempfile.mkdtemp()
+try:
+  trace_path = os.path.join(tmp_dir, "trace.json")
+  profiler.export_chrome_trace(trace_path)
+  with open(trace_path) as f:
+    if len(json.load(f)["traceEvents"]) != 4:
+      raise RuntimeError("Chrome trace error!")
+finally:
+  shutil.rmtree(tmp_dir)
+print("Profiler test success.")
@@ -0,0 +1,80 @@
+from google.protobuf import text_format
+
+from onnx_hub.caffe import pruning
+from onnx_hub.caffe.proto import caffe_pb2
+
+net = caffe_pb2.NetParameter()
+text_format.Merge("""
+layer { name: "train_data" type: "Data" top: "data" top: "label"
+  include { phase: TRAIN } }
+layer { name: "data" type: "Input" top: "data"
+  input_param { shape: { dim: 1 dim: 8 } } include { phase: TEST } }
+layer { name: "ip1" type: "InnerProduct" bottom: "data" top: "ip1" }
+layer { name: "drop" type: "Dropout" bottom: "ip1" top: "drop" }
+layer { name: "relu" type: "ReLU" bottom: "drop" top: "drop" }
+layer { name: "ip2" type: "InnerProduct" bottom: "drop" top: "ip2" }
+layer { name: "deploy" type: "ReLU" bottom: "ip2" top: "ip2"
+  include { stage: "deploy" } }
+layer { name: "label_ip" type: "InnerProduct" bottom: "label" top: "l" }
+layer { name: "loss" type: "SoftmaxWithLoss" bottom: "ip2" bottom: "label"
+  top: "loss" }
+layer { name: "accuracy" type: "Accuracy" bottom: "ip2" bottom: "label"
+  top: "accuracy" exclude { phase: TRAIN } }
+""", net)
+
+layers, aliases = pruning.inference_layers(net)
+names = [layer.name for layer in layers]
+if names != ["data", "ip1", "relu", "ip2"]:
+  raise RuntimeError("Wrong layers {}!".format(names))
+relu = layers[2]
+if list(relu.bottom) != ["ip1"] or list(relu.top) != ["drop"]:
+  raise RuntimeError("Dropout is not rewired: {} -> {}!".format(
+      list(relu.bottom), list(relu.top)))
+if list(net.layer[4].bottom) != ["drop"]:
+  raise RuntimeError("The prototxt layers are modified!")
+
+net.state.stage.append("deploy")
+names = [layer.name for layer in pruning.inference_layers(net)[0]]
+if "deploy" not in names:
+  raise RuntimeError("Stage rule is not met: {}!".format(names))
+
+net = caffe_pb2.NetParameter()
+text_format.Merge("""
+input: "data"
+layer { name: "ip" type: "InnerProduct" bottom: "data" top: "ip" }
+layer { name: "drop" type: "Dropout" bottom: "ip" top: "drop" }
+layer { name: "relu" type: "ReLU" bottom: "ip" top: "ip" }
+""", net)
+
+layers, aliases = pruning.inference_layers(net)
+if list(layers[1].top) != ["ip_relu"]:
+  raise RuntimeError("In-place top is not renamed: {}!".format(
+      list(layers[1].top)))
+resolved = pruning.resolve_outputs(["drop", "ip"], aliases)
+if resolved != [("ip", "drop"), ("ip_relu", "ip")]:
+  raise RuntimeError("Wrong resolved outputs {}!".format(resolved))
+
+net = caffe_pb2.NetParameter()
+text_format.Merge("""
+input: "data"
+layer { name: "ip" type: "InnerProduct" bottom: "data" top: "ip" }
+layer { name: "relu" type: "ReLU" bottom: "ip" top: "ip" }
+layer { name: "head1" type: "InnerProduct" bottom: "ip" top: "head1" }
+layer { name: "head2" type: "InnerProduct" bottom: "ip" top: "head2" }
+layer { name: "prob2" type: "Softmax" bottom: "head2" top: "prob2" }
+""", net)
+
+outputs = pruning.detect_outputs(net.layer, net.input)
+if outputs != ["head1", "prob2"]:
+  raise RuntimeError("Wrong outputs {}!".format(outputs))
+names = [layer.name
+         for layer in pruning.reachable_layers(net.layer, ["head1"])]
+if names != ["ip", "relu", "head1"]:
+  raise RuntimeError("Wrong reachable layers {}!".format(names))
+try:
+  pruning.reachable_layers(net.layer, ["head3"], net.input)
+  raise RuntimeError("Unknown output is not rejected!")
+except ValueError:
+  pass
+
+print("Pruning test success.")
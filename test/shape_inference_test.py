@@ -0,0 +1,42 @@
+from google.protobuf import text_format
+
+from onnx_hub.caffe import shape_inference
+from onnx_hub.caffe.proto import caffe_pb2
+
+net = caffe_pb2.NetParameter()
+text_format.Merge("""
+layer { name: "data" type: "Input" top: "data"
+  input_param { shape: { dim: 1 dim: 3 dim: 32 dim: 32 } } }
+layer { name: "conv" type: "Convolution" bottom: "data" top: "conv"
+  convolution_param { num_output: 8 kernel_size: 3 pad: 1 stride: 2 } }
+layer { name: "relu" type: "ReLU" bottom: "conv" top: "conv" }
+layer { name: "pool" type: "Pooling" bottom: "conv" top: "pool"
+  pooling_param { pool: MAX kernel_size: 2 stride: 2 } }
+layer { name: "flat" type: "Reshape" bottom: "pool" top: "flat"
+  reshape_param { shape { dim: 0 dim: -1 } } }
+layer { name: "ip" type: "InnerProduct" bottom: "flat" top: "ip"
+  inner_product_param { num_output: 10 } }
+layer { name: "custom" type: "Custom" bottom: "ip" top: "custom" }
+layer { name: "prob" type: "Softmax" bottom: "custom" top: "prob" }
+""", net)
+
+shapes = shape_inference.infer_shapes(net)
+expected = {
+    "data": [1, 3, 32, 32],
+    "conv": [1, 8, 16, 16],
+    "pool": [1, 8, 8, 8],
+    "flat": [1, 512],
+    "ip": [1, 10],
+}
+if shapes != expected:
+  raise RuntimeError("Wrong shapes {}!".format(shapes))
+
+shapes = shape_inference.infer_shapes(net, dynamic_batch=True)
+if shapes["flat"] != [shape_inference.BATCH_DIM, 512]:
+  raise RuntimeError("Batch dim is not dynamic: {}!".format(shapes["flat"]))
+
+shapes = shape_inference.infer_shapes(net, input_shapes={"data": [4, 3, 8, 8]})
+if shapes["ip"] != [4, 10]:
+  raise RuntimeError("Input shape is not overridden: {}!".format(shapes["ip"]))
+
+print("Shape inference test success.")
@@ -0,0 +1,40 @@
+import numpy as np
+from onnx import numpy_helper
+
+from onnx_hub.caffe import caffe2onnx
+from onnx_hub.caffe import caffe_helper
+from snapshots import PROTOTXT, SHAPES, model, snapshot
+
+
+def initializers(onnx_model):
+  return dict((tensor.name, numpy_helper.to_array(tensor))
+              for tensor in onnx_model.graph.initializer)
+
+
+# Python 2 str inputs are paths, so in-memory inputs are bytearrays.
+onnx_models = list(caffe2onnx.load_snapshots(
+    [bytearray(snapshot(seed).SerializeToString()) for seed in range(2)],
+    bytearray(PROTOTXT.encode("utf-8"))))
+converted = initializers(onnx_models[1])
+expected = initializers(
+    caffe_helper.caffe_model_to_onnx_model(snapshot(1), model, "prob"))
+if sorted(converted) != sorted(expected):
+  raise RuntimeError("Initializer names mismatch: {} vs {}!".format(
+      sorted(converted), sorted(expected)))
+for name, value in expected.items():
+  if not np.array_equal(converted[name], value):
+    raise RuntimeError("Initializer {} mismatch!".format(name))
+
+extra = dict(SHAPES, conv=SHAPES["conv"] + [(16,)])
+missing = {"conv": SHAPES["conv"]}
+converter = caffe_helper.SnapshotConverter(model, "prob")
+converter.convert(snapshot(0))
+for shapes in [extra, missing]:
+  try:
+    converter.convert(snapshot(2, shapes))
+    raise RuntimeError("Snapshot with weights {} is not rejected!".format(
+        sorted(shapes)))
+  except ValueError:
+    pass
+
+print("Snapshot test success.")
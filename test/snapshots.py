@@ -0,0 +1,37 @@
+# Caffemodel snapshots of one small net, shared by snapshot_test.py and
+# patch_test.py.
+import numpy as np
+from google.protobuf import text_format
+
+from onnx_hub.caffe.proto import caffe_pb2
+
+PROTOTXT = """
+layer { name: "data" type: "Input" top: "data"
+  input_param { shape: { dim: 1 dim: 2 dim: 8 dim: 8 } } }
+layer { name: "conv" type: "Convolution" bottom: "data" top: "conv"
+  convolution_param { num_output: 16 kernel_size: 3 } }
+layer { name: "ip" type: "InnerProduct" bottom: "conv" top: "ip"
+  inner_product_param { num_output: 2 } }
+layer { name: "prob" type: "Softmax" bottom: "ip" top: "prob" }
+"""
+SHAPES = {"conv": [(16, 2, 3, 3), (16,)], "ip": [(2, 576), (2,)]}
+model = caffe_pb2.NetParameter()
+text_format.Merge(PROTOTXT, model)
+
+
+def snapshot(seed, shapes=SHAPES):
+  """ Make a caffemodel of the net with random weights.
+
+  :param seed: Seed of the weights.
+  :param shapes: Dict of layer name to the shapes of its blobs.
+  :return: NetParameter.
+  """
+  rng = np.random.RandomState(seed)
+  weights = caffe_pb2.NetParameter()
+  for name, blob_shapes in sorted(shapes.items()):
+    layer = weights.layer.add(name=name)
+    for shape in blob_shapes:
+      blob = layer.blobs.add()
+      blob.shape.dim.extend(shape)
+      blob.data.extend(rng.rand(*shape).ravel())
+  return weights